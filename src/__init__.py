@@ -1 +1,7 @@
-from .sqlite_tool import SQLiteTool
+# 图形界面按需导入，命令行模式（python -m src）不会加载 tkinter
+def __getattr__(name):
+    if name == "SQLiteTool":
+        from .sqlite_tool import SQLiteTool
+
+        return SQLiteTool
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,8 @@
+"""python -m src 进入命令行模式，见 src/cli.py"""
+
+import sys
+
+from src.cli import main
+
+if __name__ == "__main__":
+    sys.exit(main())
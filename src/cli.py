@@ -0,0 +1,355 @@
+"""
+SQLite3 工具命令行入口
+不依赖图形界面，可在没有显示器的服务器上执行导出、导入、备份、SQL语句和统计：
+    python -m src export-csv sample.db -o out
+    python -m src exec sample.db "SELECT * FROM users" > users.csv
+不会导入 tkinter 或 src.gui
+"""
+
+import argparse
+import csv
+import json
+import os
+import sqlite3
+import sys
+from typing import Optional, List
+
+from src.utils import (
+    SQLiteUtils,
+    PERFORMANCE_PROFILES,
+    export_db_to_csv,
+    export_db_to_xlsx,
+    import_csv,
+)
+from src.utils.export_utils import EXPORT_BATCH_SIZE
+from src.utils.script_runner import split_statements, is_read_only
+from src.utils.sql_helpers import cursor_batches
+from src.utils.sqlite_utils import connect_readonly, quote_identifier
+
+
+def _log(message: str):
+    """提示信息写到标准错误，标准输出只留给数据"""
+    print(message, file=sys.stderr)
+
+
+def _require_file(path: str):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"数据库文件不存在: {path}")
+
+
+def _report(stats, what: str):
+    _log(
+        f"{what}: {stats['tables']} 个表，共 {stats['rows']} 行，"
+        f"耗时 {stats['seconds']:.2f} 秒，{stats['rows_per_second']:.0f} 行/秒"
+    )
+
+
+def write_rows(columns: List[str], batches, out, output_format: str = "csv") -> int:
+    """把分批的结果行写到 out（csv、tsv 或每行一个JSON对象的 jsonl），返回行数"""
+    count = 0
+    if output_format == "jsonl":
+        for rows in batches:
+            for row in rows:
+                out.write(
+                    json.dumps(
+                        dict(zip(columns, row)), ensure_ascii=False, default=repr
+                    )
+                )
+                out.write("\n")
+            count += len(rows)
+        return count
+    delimiter = "\t" if output_format == "tsv" else ","
+    writer = csv.writer(out, delimiter=delimiter, lineterminator="\n")
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        count += len(rows)
+    return count
+
+
+def _open(path: str, readonly: bool = False, profile: Optional[str] = None):
+    """
+    打开数据库。只读操作用只读连接，不会修改文件；
+    只有指定了 --profile 时才应用性能配置（包括切换日志模式）
+    """
+    logic = SQLiteUtils()
+    logic.open_database_file(path, readonly=readonly)
+    if profile:
+        logic.apply_profile(profile)
+    return logic
+
+
+def _columns(cursor: sqlite3.Cursor) -> List[str]:
+    return [description[0] for description in cursor.description]
+
+
+def cmd_export_csv(args) -> int:
+    _require_file(args.database)
+    if args.output == "-":
+        # 单表流式写到标准输出，便于接管道
+        if not args.table:
+            raise ValueError("输出到标准输出时需要用 --table 指定表")
+        conn = connect_readonly(args.database)
+        try:
+            cursor = conn.execute(f"SELECT * FROM {quote_identifier(args.table)}")
+            rows = write_rows(
+                _columns(cursor),
+                cursor_batches(cursor, args.batch_size),
+                sys.stdout,
+            )
+        finally:
+            conn.close()
+        _log(f"已导出 {args.table}: {rows} 行")
+        return 0
+    stats = export_db_to_csv(
+        args.database, args.output, batch_size=args.batch_size, workers=args.workers
+    )
+    _report(stats, "已导出为CSV")
+    return 0
+
+
+def cmd_export_xlsx(args) -> int:
+    _require_file(args.database)
+    stats = export_db_to_xlsx(
+        args.database, args.output, workers=args.workers, batch_size=args.batch_size
+    )
+    _report(stats, "已导出为XLSX")
+    return 0
+
+
+def cmd_exec(args) -> int:
+    _require_file(args.database)
+    if args.file:
+        with open(args.file, "r", encoding="utf-8") as f:
+            sql = f.read()
+    elif args.sql == "-" or args.sql is None:
+        sql = sys.stdin.read()
+    else:
+        sql = args.sql
+    statements = split_statements(sql)
+    if not statements:
+        raise ValueError("没有要执行的SQL语句")
+
+    readonly = not args.profile and all(map(is_read_only, statements))
+    logic = _open(args.database, readonly, args.profile)
+    try:
+        if len(statements) > 1:
+            if args.params:
+                raise ValueError("多条语句不支持 --param")
+            result = logic.execute_script(sql, fast=args.fast)
+            for entry in result["statements"]:
+                affected = entry["rows_affected"]
+                _log(
+                    f"{entry['seconds'] * 1000:.2f} 毫秒  "
+                    f"影响 {affected if affected is not None else '-'} 行  "
+                    f"{' '.join(entry['sql'].split())[:80]}"
+                )
+            if "columns" in result:
+                write_rows(result["columns"], [result["rows"]], sys.stdout, args.format)
+            return 0
+
+        cursor = logic.conn.cursor()
+        cursor.execute(statements[0], tuple(args.params or ()))
+        if cursor.description:
+            rows = write_rows(
+                _columns(cursor),
+                cursor_batches(cursor, args.batch_size),
+                sys.stdout,
+                args.format,
+            )
+            # INSERT ... RETURNING 等既返回行又写入的语句在读完结果后提交
+            if logic.conn.in_transaction:
+                logic.conn.commit()
+            _log(f"返回 {rows} 行")
+        else:
+            logic.conn.commit()
+            _log(f"执行成功，影响 {cursor.rowcount} 行")
+        return 0
+    finally:
+        logic.close()
+
+
+def cmd_backup(args) -> int:
+    _require_file(args.database)
+    logic = _open(args.database, readonly=True)
+
+    def progress(status, remaining, total):
+        if args.verbose and total:
+            _log(f"已复制 {total - remaining}/{total} 页")
+
+    try:
+        logic.export_database(args.target, progress=progress)
+    finally:
+        logic.close()
+    _log(f"已备份到: {args.target}")
+    return 0
+
+
+def cmd_import(args) -> int:
+    # 与图形界面一致，数据库文件不存在时新建
+    logic = _open(args.database, profile=args.profile)
+    try:
+        for file_path in args.files:
+            stats = import_csv(
+                logic.conn,
+                file_path,
+                args.table,
+                delimiter=args.delimiter,
+                encoding=args.encoding,
+                fast=not args.safe,
+            )
+            _log(
+                f"已导入 {stats['rows']} 行到表 {stats['table']}，"
+                f"{stats['rows_per_second']:.0f} 行/秒"
+            )
+    finally:
+        logic.close()
+    return 0
+
+
+def database_stats(logic: SQLiteUtils, exact: bool = True) -> dict:
+    """数据库文件和各表的统计信息"""
+    conn = logic.conn
+
+    def pragma(name):
+        return conn.execute(f"PRAGMA {name}").fetchone()[0]
+
+    tables = []
+    for table in logic.get_tables():
+        tables.append(
+            {
+                "name": table,
+                "rows": logic.count_rows(table) if exact else None,
+                "columns": len(logic.get_table_structure(table)),
+                "indexes": [index["name"] for index in logic.get_indexes(table)],
+            }
+        )
+    return {
+        "path": os.path.abspath(logic.current_db_path),
+        "file_bytes": os.path.getsize(logic.current_db_path),
+        "sqlite_version": sqlite3.sqlite_version,
+        "page_size": pragma("page_size"),
+        "page_count": pragma("page_count"),
+        "freelist_count": pragma("freelist_count"),
+        "journal_mode": pragma("journal_mode"),
+        "tables": tables,
+    }
+
+
+def cmd_stats(args) -> int:
+    _require_file(args.database)
+    logic = _open(args.database, readonly=True)
+    try:
+        stats = database_stats(logic, exact=not args.no_count)
+    finally:
+        logic.close()
+    if args.json:
+        json.dump(stats, sys.stdout, ensure_ascii=False, indent=2)
+        sys.stdout.write("\n")
+        return 0
+    print(f"文件: {stats['path']}")
+    print(f"大小: {stats['file_bytes'] / 1024:.1f} KB")
+    print(f"SQLite版本: {stats['sqlite_version']}")
+    print(
+        f"页大小: {stats['page_size']}，页数: {stats['page_count']}，"
+        f"空闲页: {stats['freelist_count']}，日志模式: {stats['journal_mode']}"
+    )
+    for table in stats["tables"]:
+        rows = table["rows"] if table["rows"] is not None else "-"
+        print(
+            f"  {table['name']}: {rows} 行，{table['columns']} 列，"
+            f"{len(table['indexes'])} 个索引"
+        )
+    return 0
+
+
+def _add_profile_argument(parser: argparse.ArgumentParser):
+    parser.add_argument(
+        "--profile",
+        choices=list(PERFORMANCE_PROFILES),
+        help="应用性能配置（read-heavy 会把数据库持久切换为 WAL 模式）",
+    )
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m src", description="SQLite3 工具命令行（无需图形界面）"
+    )
+    subparsers = parser.add_subparsers(dest="command", metavar="命令")
+    subparsers.required = True
+
+    p = subparsers.add_parser("export-csv", help="把所有表导出为CSV文件")
+    p.add_argument("database", help="数据库文件")
+    p.add_argument(
+        "-o",
+        "--output",
+        help="输出文件夹（默认为数据库名），为 - 时把一个表写到标准输出",
+    )
+    p.add_argument("-t", "--table", help="输出到标准输出时要导出的表")
+    p.add_argument("--workers", type=int, default=1, help="并行导出的进程数")
+    p.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    p.set_defaults(func=cmd_export_csv)
+
+    p = subparsers.add_parser("export-xlsx", help="把所有表导出到一个xlsx文件")
+    p.add_argument("database", help="数据库文件")
+    p.add_argument("-o", "--output", help="输出文件（默认为数据库名.xlsx）")
+    p.add_argument("--workers", type=int, default=1, help="并行读取的进程数")
+    p.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    p.set_defaults(func=cmd_export_xlsx)
+
+    p = subparsers.add_parser("exec", help="执行SQL语句，查询结果写到标准输出")
+    p.add_argument("database", help="数据库文件")
+    p.add_argument("sql", nargs="?", help="SQL语句，省略或为 - 时从标准输入读取")
+    p.add_argument("-f", "--file", help="从文件读取SQL脚本")
+    p.add_argument(
+        "-p",
+        "--param",
+        dest="params",
+        action="append",
+        help="语句参数（按 ? 的顺序，可重复）",
+    )
+    p.add_argument(
+        "--format", choices=("csv", "tsv", "jsonl"), default="csv", help="输出格式"
+    )
+    p.add_argument(
+        "--fast", action="store_true", help="多条语句用 executescript 一次执行"
+    )
+    p.add_argument("--batch-size", type=int, default=EXPORT_BATCH_SIZE)
+    _add_profile_argument(p)
+    p.set_defaults(func=cmd_exec)
+
+    p = subparsers.add_parser("backup", help="用在线备份API复制数据库")
+    p.add_argument("database", help="数据库文件")
+    p.add_argument("target", help="备份文件")
+    p.add_argument("-v", "--verbose", action="store_true", help="显示复制进度")
+    p.set_defaults(func=cmd_backup)
+
+    p = subparsers.add_parser("import", help="把CSV/TSV文件导入数据库")
+    p.add_argument("database", help="数据库文件（不存在时新建）")
+    p.add_argument("files", nargs="+", help="CSV/TSV文件")
+    p.add_argument("-t", "--table", help="目标表名（默认为文件名）")
+    p.add_argument("-d", "--delimiter", help="分隔符（默认自动识别）")
+    p.add_argument("--encoding", default="utf-8-sig", help="文件编码")
+    p.add_argument("--safe", action="store_true", help="导入期间不关闭同步写入和日志")
+    _add_profile_argument(p)
+    p.set_defaults(func=cmd_import)
+
+    p = subparsers.add_parser("stats", help="显示数据库和各表的统计信息")
+    p.add_argument("database", help="数据库文件")
+    p.add_argument("--json", action="store_true", help="以JSON格式输出")
+    p.add_argument("--no-count", action="store_true", help="不统计各表的行数")
+    p.set_defaults(func=cmd_stats)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except BrokenPipeError:
+        # 下游（如 head）提前关闭了管道
+        sys.stderr.close()
+        return 0
+    except Exception as e:
+        _log(f"错误: {e}")
+        return 1
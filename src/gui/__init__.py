@@ -1,3 +1,6 @@
 from .query_tab import QueryTab
 from .sql_tab import SQLTab
 from .structure_tab import StructureTab
+from .virtual_grid import VirtualGrid
+from .profile_tab import ProfileTab
+from .search_tab import SearchTab
@@ -0,0 +1,156 @@
+"""
+性能分析标签页组件
+记录工具执行的每条语句的耗时、虚拟机步数、读取行数以及读取与渲染耗时
+"""
+
+import tkinter as tk
+from tkinter import ttk, messagebox, filedialog
+from src.utils import Profiler
+
+
+class ProfileTab:
+    # 记录期间自动刷新列表的间隔（毫秒）
+    REFRESH_INTERVAL_MS = 1000
+
+    def __init__(self, parent_notebook, logic, update_status_callback=None):
+        self.logic = logic
+        self.parent_notebook = parent_notebook
+        self.update_status_callback = update_status_callback
+        self.profiler = Profiler()
+        # 记录编号 -> 列表中显示的值，只更新有变化的条目
+        self.shown = {}
+
+        # 创建标签页框架
+        self.frame = ttk.Frame(parent_notebook)
+        parent_notebook.add(self.frame, text="性能分析")
+
+        self.setup_ui()
+
+    def setup_ui(self):
+        """设置用户界面"""
+        button_frame = ttk.Frame(self.frame)
+        button_frame.pack(fill=tk.X, pady=(0, 10))
+
+        self.enabled_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            button_frame,
+            text="记录语句",
+            variable=self.enabled_var,
+            command=self.toggle_profiling,
+        ).pack(side=tk.LEFT)
+        ttk.Button(button_frame, text="刷新", command=self.refresh).pack(
+            side=tk.LEFT, padx=(10, 0)
+        )
+        ttk.Button(button_frame, text="清空", command=self.clear).pack(
+            side=tk.LEFT, padx=(10, 0)
+        )
+        ttk.Button(button_frame, text="导出JSON", command=self.export_json).pack(
+            side=tk.LEFT, padx=(10, 0)
+        )
+        self.summary_label = ttk.Label(button_frame, text="")
+        self.summary_label.pack(side=tk.RIGHT)
+
+        columns = (
+            "序号",
+            "连接",
+            "语句",
+            "耗时(毫秒)",
+            "虚拟机步数",
+            "读取行数",
+            "读取(毫秒)",
+            "渲染(毫秒)",
+        )
+        widths = (50, 70, 420, 80, 90, 70, 80, 80)
+        tree_frame = ttk.Frame(self.frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.log_tree = ttk.Treeview(tree_frame, columns=columns, show="headings")
+        for col, width in zip(columns, widths):
+            self.log_tree.heading(col, text=col)
+            self.log_tree.column(col, width=width, stretch=(col == "语句"))
+        self.log_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        v_scroll = ttk.Scrollbar(
+            tree_frame, orient=tk.VERTICAL, command=self.log_tree.yview
+        )
+        v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.log_tree.configure(yscrollcommand=v_scroll.set)
+
+    def toggle_profiling(self):
+        """开始或停止记录，主连接和后台连接都会安装跟踪回调"""
+        if self.enabled_var.get():
+            self.logic.set_profiler(self.profiler)
+            self.schedule_refresh()
+            if self.update_status_callback:
+                self.update_status_callback("已开始记录语句")
+        else:
+            self.logic.set_profiler(None)
+            self.refresh()
+            if self.update_status_callback:
+                self.update_status_callback("已停止记录语句")
+
+    def schedule_refresh(self):
+        if not self.enabled_var.get():
+            return
+        self.refresh()
+        self.frame.after(self.REFRESH_INTERVAL_MS, self.schedule_refresh)
+
+    def refresh(self):
+        """更新列表：新记录追加在末尾，已显示的记录更新其统计值"""
+        entries = self.profiler.entries()
+        for entry in entries:
+            item = str(entry["id"])
+            values = (
+                entry["id"],
+                entry["connection"],
+                " ".join(entry["sql"].split())[:300],
+                (
+                    f"{entry['wall_seconds'] * 1000:.2f}"
+                    if entry["wall_seconds"] is not None
+                    else "-"
+                ),
+                entry["vm_steps"],
+                entry["rows"],
+                f"{entry['fetch_seconds'] * 1000:.2f}",
+                f"{entry['render_seconds'] * 1000:.2f}",
+            )
+            if item not in self.shown:
+                self.log_tree.insert("", tk.END, iid=item, values=values)
+            elif self.shown[item] != values:
+                self.log_tree.item(item, values=values)
+            self.shown[item] = values
+        # 超出记录上限被丢弃的旧记录
+        kept = {str(entry["id"]) for entry in entries}
+        for item in set(self.shown) - kept:
+            self.log_tree.delete(item)
+            del self.shown[item]
+
+        fetch = sum(entry["fetch_seconds"] for entry in entries)
+        render = sum(entry["render_seconds"] for entry in entries)
+        self.summary_label.config(
+            text=f"共 {len(entries)} 条语句，读取 {fetch * 1000:.1f} 毫秒，"
+            f"渲染 {render * 1000:.1f} 毫秒"
+        )
+
+    def clear(self):
+        self.profiler.clear()
+        self.shown = {}
+        for item in self.log_tree.get_children():
+            self.log_tree.delete(item)
+        self.summary_label.config(text="")
+
+    def export_json(self):
+        """导出记录为JSON文件"""
+        file_path = filedialog.asksaveasfilename(
+            title="导出性能记录",
+            defaultextension=".json",
+            filetypes=[("JSON文件", "*.json"), ("所有文件", "*.*")],
+        )
+        if not file_path:
+            return
+        try:
+            self.profiler.export_json(file_path)
+            if self.update_status_callback:
+                self.update_status_callback(f"性能记录已导出到: {file_path}")
+        except Exception as e:
+            messagebox.showerror("错误", f"导出性能记录失败: {str(e)}")
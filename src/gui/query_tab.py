@@ -3,8 +3,12 @@
 提供数据查询、添加、修改、删除记录的功能
 """
 
+import sqlite3
 import tkinter as tk
 from tkinter import ttk, messagebox
+from src.utils import open_async_source, ChangeBuffer
+from src.utils import TableQuery, FILTER_OPERATORS, NO_VALUE_OPERATORS
+from .virtual_grid import VirtualGrid
 
 
 class QueryTab:
@@ -12,6 +16,25 @@ class QueryTab:
         self.logic = logic
         self.parent_notebook = parent_notebook
         self.update_status_callback = update_status_callback
+        # 正在后台执行的查询任务编号
+        self.running_task = None
+        self.count_reported = False
+        # 结果表格中显示的表，修改和删除按该表的 rowid/主键定位记录
+        self.result_table = None
+        # 结果表对应的待提交修改，批量编辑模式下累积，提交时在一个事务中执行
+        self.changes = None
+        # 正在后台提交修改的任务编号，提交完成前不接受新的修改
+        self.commit_task = None
+        # 结果表格对应的查询条件（TableQuery）
+        self.result_query = None
+        # 所选表的列名、要显示的列（None 表示全部）、筛选条件行和排序 (列名, 是否降序)
+        self.table_columns = []
+        self.visible_columns = None
+        self.filter_rows = []
+        self.order_by = []
+        # 下一次查询完成后要定位的行的键，以及等待总行数到达后再定位的行号
+        self.jump_key = None
+        self.jump_index = None
 
         # 创建标签页框架
         self.frame = ttk.Frame(parent_notebook)
@@ -38,9 +61,14 @@ class QueryTab:
         self.query_table_combo.bind("<<ComboboxSelected>>", self.on_query_table_change)
 
         # 查询按钮
-        ttk.Button(table_frame, text="查询", command=self.execute_query).pack(
-            side=tk.RIGHT
+        self.cancel_button = ttk.Button(
+            table_frame, text="取消", command=self.cancel_query, state=tk.DISABLED
+        )
+        self.cancel_button.pack(side=tk.RIGHT)
+        self.query_button = ttk.Button(
+            table_frame, text="查询", command=self.execute_query
         )
+        self.query_button.pack(side=tk.RIGHT, padx=(0, 5))
         ttk.Button(table_frame, text="添加记录", command=self.add_record).pack(
             side=tk.RIGHT, padx=(0, 5)
         )
@@ -51,27 +79,54 @@ class QueryTab:
             side=tk.RIGHT, padx=(0, 5)
         )
 
-        # 查询结果
-        ttk.Label(self.frame, text="查询结果").pack(anchor=tk.W)
+        # 筛选条件和显示列
+        filter_bar = ttk.Frame(condition_frame)
+        filter_bar.pack(fill=tk.X, padx=10, pady=(0, 5))
 
-        result_frame = ttk.Frame(self.frame)
-        result_frame.pack(fill=tk.BOTH, expand=True, pady=(5, 0))
+        ttk.Button(filter_bar, text="添加条件", command=self.add_filter_row).pack(
+            side=tk.LEFT
+        )
+        ttk.Button(filter_bar, text="清除条件", command=self.clear_filters).pack(
+            side=tk.LEFT, padx=(5, 0)
+        )
+        ttk.Button(filter_bar, text="选择列", command=self.choose_columns).pack(
+            side=tk.LEFT, padx=(5, 0)
+        )
+        self.columns_label = ttk.Label(filter_bar, text="")
+        self.columns_label.pack(side=tk.LEFT, padx=(10, 0))
 
-        self.result_tree = ttk.Treeview(result_frame)
-        self.result_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.filters_frame = ttk.Frame(condition_frame)
+        self.filters_frame.pack(fill=tk.X, padx=10)
 
-        # 结果滚动条
-        result_v_scroll = ttk.Scrollbar(
-            result_frame, orient=tk.VERTICAL, command=self.result_tree.yview
-        )
-        result_v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
-        self.result_tree.configure(yscrollcommand=result_v_scroll.set)
+        self.sql_label = ttk.Label(condition_frame, text="", foreground="#666666")
+        self.sql_label.pack(fill=tk.X, padx=10, pady=(0, 5))
+
+        # 批量编辑
+        edit_frame = ttk.Frame(condition_frame)
+        edit_frame.pack(fill=tk.X, padx=10, pady=(0, 5))
 
-        result_h_scroll = ttk.Scrollbar(
-            self.frame, orient=tk.HORIZONTAL, command=self.result_tree.xview
+        self.batch_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(edit_frame, text="批量编辑", variable=self.batch_var).pack(
+            side=tk.LEFT
+        )
+        self.pending_label = ttk.Label(edit_frame, text="")
+        self.pending_label.pack(side=tk.LEFT, padx=(10, 0))
+        ttk.Button(edit_frame, text="放弃更改", command=self.discard_changes).pack(
+            side=tk.RIGHT
         )
-        result_h_scroll.pack(fill=tk.X)
-        self.result_tree.configure(xscrollcommand=result_h_scroll.set)
+        ttk.Button(edit_frame, text="提交更改", command=self.commit_changes).pack(
+            side=tk.RIGHT, padx=(0, 5)
+        )
+
+        # 查询结果
+        ttk.Label(self.frame, text="查询结果").pack(anchor=tk.W)
+
+        self.result_grid = VirtualGrid(self.frame)
+        self.result_grid.frame.pack(fill=tk.BOTH, expand=True, pady=(5, 0))
+        self.result_grid.decorate = self.decorate_row
+        self.result_grid.extra_rows = self.pending_insert_rows
+        self.result_grid.on_heading = self.on_heading
+        self.result_tree = self.result_grid.tree
 
     def set_conn(self, conn):
         """设置数据库连接"""
@@ -80,43 +135,300 @@ class QueryTab:
     def refresh_tables(self, tables):
         """刷新表列表"""
         self.query_table_combo["values"] = tables
+        table_name = self.query_table_var.get()
+        if table_name and table_name not in tables:
+            self.query_table_var.set("")
+            self.on_query_table_change(None)
 
     def on_query_table_change(self, event):
-        """表选择变化事件"""
-        pass  # 可以在这里添加表变化时的逻辑
+        """表选择变化时重置筛选条件、显示列和排序"""
+        table_name = self.query_table_var.get()
+        self.table_columns = (
+            [col["name"] for col in self.logic.get_table_structure(table_name)]
+            if table_name
+            else []
+        )
+        self.visible_columns = None
+        self.order_by = []
+        self.clear_filters()
+        self.update_columns_label()
+
+    def add_filter_row(self):
+        """添加一行筛选条件：列、运算符和值"""
+        if not self.table_columns:
+            messagebox.showwarning("警告", "请选择一个表")
+            return
+        frame = ttk.Frame(self.filters_frame)
+        frame.pack(fill=tk.X, pady=2)
+
+        column_var = tk.StringVar(value=self.table_columns[0])
+        ttk.Combobox(
+            frame,
+            textvariable=column_var,
+            values=self.table_columns,
+            state="readonly",
+            width=20,
+        ).pack(side=tk.LEFT)
+        operator_var = tk.StringVar(value="=")
+        operator_combo = ttk.Combobox(
+            frame,
+            textvariable=operator_var,
+            values=list(FILTER_OPERATORS),
+            state="readonly",
+            width=8,
+        )
+        operator_combo.pack(side=tk.LEFT, padx=(5, 0))
+        value_entry = ttk.Entry(frame, width=30)
+        value_entry.pack(side=tk.LEFT, padx=(5, 0))
+        value_entry.bind("<Return>", lambda event: self.execute_query())
+
+        def on_operator_change(event):
+            no_value = operator_var.get() in NO_VALUE_OPERATORS
+            value_entry.config(state=tk.DISABLED if no_value else tk.NORMAL)
+
+        operator_combo.bind("<<ComboboxSelected>>", on_operator_change)
+
+        filter_row = {
+            "frame": frame,
+            "column": column_var,
+            "operator": operator_var,
+            "value": value_entry,
+        }
+        ttk.Button(
+            frame, text="删除", command=lambda: self.remove_filter_row(filter_row)
+        ).pack(side=tk.LEFT, padx=(5, 0))
+        self.filter_rows.append(filter_row)
+        value_entry.focus_set()
+
+    def remove_filter_row(self, filter_row):
+        filter_row["frame"].destroy()
+        self.filter_rows.remove(filter_row)
+
+    def clear_filters(self):
+        for filter_row in self.filter_rows:
+            filter_row["frame"].destroy()
+        self.filter_rows = []
+
+    def choose_columns(self):
+        """选择要显示的列，只有选中的列从数据库中读取"""
+        if not self.table_columns:
+            messagebox.showwarning("警告", "请选择一个表")
+            return
+        root = self.frame.winfo_toplevel()
+        dialog = tk.Toplevel(root)
+        dialog.title(f"选择列 - {self.query_table_var.get()}")
+        dialog.transient(root)
+        dialog.grab_set()
+
+        shown = set(self.visible_columns or self.table_columns)
+        variables = {}
+        list_frame = ttk.Frame(dialog)
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        for name in self.table_columns:
+            variables[name] = tk.BooleanVar(value=name in shown)
+            ttk.Checkbutton(list_frame, text=name, variable=variables[name]).pack(
+                anchor=tk.W
+            )
+
+        def set_all(value):
+            for variable in variables.values():
+                variable.set(value)
+
+        def apply():
+            selected = [name for name in self.table_columns if variables[name].get()]
+            if not selected:
+                messagebox.showwarning("警告", "请至少选择一列", parent=dialog)
+                return
+            self.visible_columns = (
+                None if len(selected) == len(self.table_columns) else selected
+            )
+            self.update_columns_label()
+            dialog.destroy()
+
+        button_frame = ttk.Frame(dialog)
+        button_frame.pack(pady=(0, 10))
+        ttk.Button(button_frame, text="全选", command=lambda: set_all(True)).pack(
+            side=tk.LEFT, padx=5
+        )
+        ttk.Button(button_frame, text="全不选", command=lambda: set_all(False)).pack(
+            side=tk.LEFT, padx=5
+        )
+        ttk.Button(button_frame, text="确定", command=apply).pack(side=tk.LEFT, padx=5)
+
+    def update_columns_label(self):
+        if not self.table_columns:
+            text = ""
+        elif self.visible_columns is None:
+            text = "显示全部列"
+        else:
+            text = f"显示 {len(self.visible_columns)}/{len(self.table_columns)} 列"
+        self.columns_label.config(text=text)
+
+    def build_query(self, table_name):
+        """把界面上的显示列、筛选条件和排序组合为 TableQuery"""
+        filters = []
+        for filter_row in self.filter_rows:
+            operator = filter_row["operator"].get()
+            value = filter_row["value"].get()
+            # 需要输入值却没有填写的条件忽略
+            if operator not in NO_VALUE_OPERATORS and value == "":
+                continue
+            filters.append((filter_row["column"].get(), operator, value))
+        return TableQuery(table_name, self.visible_columns, filters, self.order_by)
+
+    def on_heading(self, column):
+        """点击列标题排序：升序 -> 降序 -> 取消"""
+        if self.running_task is not None or not self.result_table:
+            return
+        previous = self.order_by
+        if previous and previous[0][0] == column:
+            self.order_by = [] if previous[0][1] else [(column, True)]
+        else:
+            self.order_by = [(column, False)]
+        if not self.execute_query():
+            self.order_by = previous
 
     def execute_query(self):
-        """执行查询"""
+        """
+        在后台线程执行查询，显示列、筛选条件和排序编译为参数化的 SELECT，
+        由 SQLite 完成筛选排序。开始执行时返回 True。
+        """
         table_name = self.query_table_var.get()
         if not table_name:
             messagebox.showwarning("警告", "请选择一个表")
-            return
+            return False
+        if self.running_task is not None or self.is_committing():
+            return False
+        if self.changes and not messagebox.askyesno(
+            "确认", f"有未提交的修改（{self.changes.summary()}），确定放弃吗？"
+        ):
+            return False
         try:
-            for item in self.result_tree.get_children():
-                self.result_tree.delete(item)
-            data = self.logic.execute_query(table_name)
-            column_names = data["columns"]
-            self.result_tree["columns"] = column_names
-            self.result_tree["show"] = "headings"
-            for col in column_names:
-                self.result_tree.heading(col, text=col)
-                self.result_tree.column(col, width=100)
-            for row in data["rows"]:
-                self.result_tree.insert("", tk.END, values=row)
-
-            # 通知主窗口更新状态
-            if self.update_status_callback:
-                self.update_status_callback(
-                    f"查询完成，返回 {len(data['rows'])} 条记录"
-                )
+            query = self.build_query(table_name)
+            self.result_grid.clear()
+            self.changes = None
+            self.update_pending_label()
+            self.result_table = table_name
+            self.result_query = query
+            jump_key, self.jump_key = self.jump_key, None
+            self.jump_index = None
+            sql, params = query.to_sql()
+            self.sql_label.config(text=sql + (f"  参数: {params}" if params else ""))
+
+            def open_remote(logic):
+                source = logic.open_table_source(table_name, query)
+                if jump_key is None:
+                    return source
+                # 在后台线程中一并算出要定位的行号
+                return {
+                    "columns": source.columns,
+                    "source": source,
+                    "position": logic.get_row_position(table_name, jump_key),
+                }
+
+            worker = self.logic.get_worker()
+            self.running_task = open_async_source(
+                worker, open_remote, self.on_query_done, self.on_query_error
+            )
+            self.set_running(True)
+            return True
         except Exception as e:
             messagebox.showerror("错误", f"查询失败: {str(e)}")
+            return False
+
+    def on_query_done(self, result):
+        """后台查询完成"""
+        self.set_running(False)
+        source = result["source"]
+        source.on_ready = lambda: self.on_source_ready(source)
+        self.changes = ChangeBuffer(self.result_table, result["columns"])
+        self.result_grid.set_source(result["columns"], source)
+        self.result_grid.set_sort_marks(self.result_query.order_by)
+        self.report_count(source)
+        if "position" in result:
+            if result["position"] is None:
+                messagebox.showwarning("警告", "该记录已不存在，请更新检索索引")
+            else:
+                self.jump_index = result["position"]
+                self.show_jump(source)
+
+    def on_query_error(self, error):
+        self.set_running(False)
+        if isinstance(error, sqlite3.OperationalError) and "interrupted" in str(error):
+            if self.update_status_callback:
+                self.update_status_callback("查询已取消")
+            return
+        messagebox.showerror("错误", f"查询失败: {str(error)}")
+
+    def on_source_ready(self, source):
+        """后台读取的数据页或总行数到达"""
+        self.result_grid.refresh()
+        if source.count_known and not self.count_reported:
+            self.report_count(source)
+            self.show_jump(source)
+
+    def show_row(self, table_name, key):
+        """显示整张表并定位到键为 key 的行（全文检索结果跳转），开始查询时返回 True"""
+        if self.running_task is not None:
+            return False
+        self.parent_notebook.select(self.frame)
+        self.query_table_var.set(table_name)
+        # 行号按整表的键顺序计算，因此清除筛选条件、显示列和排序
+        self.on_query_table_change(None)
+        self.jump_key = tuple(key)
+        if not self.execute_query():
+            self.jump_key = None
+            return False
+        return True
+
+    def show_jump(self, source):
+        """选中要定位的行；总行数未知时行号可能超出可滚动范围，总行数到达后再定位一次"""
+        if self.jump_index is None:
+            return
+        self.result_grid.show_index(self.jump_index)
+        if source.count_known:
+            self.jump_index = None
+
+    def report_count(self, source):
+        self.count_reported = source.count_known
+        if not self.update_status_callback:
+            return
+        # 通知主窗口更新状态
+        if source.count_known:
+            self.update_status_callback(f"查询完成，返回 {source.row_count()} 条记录")
+        elif self.result_query.filters:
+            self.update_status_callback("查询完成，正在统计记录数...")
+        else:
+            # 没有筛选条件时先显示估算的行数（读取几页即可得到）
+            rows = self.logic.get_table_statistics(self.result_table)["rows"]
+            estimate = f"约 {rows} 条记录，" if rows is not None else ""
+            self.update_status_callback(f"查询完成，{estimate}正在统计记录数...")
+
+    def cancel_query(self):
+        """取消正在执行的查询"""
+        if self.running_task is not None and self.logic.worker is not None:
+            self.logic.worker.cancel(self.running_task)
+
+    def set_running(self, running):
+        if not running:
+            self.running_task = None
+        self.query_button.config(state=tk.DISABLED if running else tk.NORMAL)
+        self.cancel_button.config(state=tk.NORMAL if running else tk.DISABLED)
+
+    def is_committing(self):
+        """有修改正在后台提交时提示并返回 True"""
+        if self.commit_task is None:
+            return False
+        messagebox.showwarning("警告", "正在提交修改，请稍候")
+        return True
 
     def add_record(self):
         """添加记录"""
         if not hasattr(self, "conn") or not self.conn:
             messagebox.showwarning("警告", "请先打开一个数据库")
             return
+        if self.is_committing():
+            return
 
         table_name = self.query_table_var.get()
         if not table_name:
@@ -126,87 +438,168 @@ class QueryTab:
         # 打开添加记录对话框
         self.open_record_dialog(table_name, "add")
 
-    def modify_record(self):
-        """修改记录"""
+    def selected_items(self, action):
+        """返回选中的 (行号, 键, 原始值)，没有选中或无法按键定位时提示并返回空列表"""
         if not hasattr(self, "conn") or not self.conn:
             messagebox.showwarning("警告", "请先打开一个数据库")
-            return
+            return []
+        if self.is_committing():
+            return []
+
+        items = self.result_grid.selected_items()
+        if not items:
+            messagebox.showwarning("警告", f"请选择要{action}的记录")
+            return []
+        if any(key is None for _, key, _ in items):
+            messagebox.showerror("错误", "该表没有 rowid 或主键，无法定位记录")
+            return []
+        return items
 
-        selection = self.result_tree.selection()
-        if not selection:
-            messagebox.showwarning("警告", "请选择要修改的记录")
-            return
-
-        table_name = self.query_table_var.get()
-        if not table_name:
-            messagebox.showwarning("警告", "请选择一个表")
+    def modify_record(self):
+        """修改记录，选中多行时把修改的字段应用到所有选中行"""
+        items = self.selected_items("修改")
+        if not items:
             return
 
-        # 获取选中的记录数据
-        selected_item = self.result_tree.item(selection[0])
-        values = selected_item["values"]
-
-        # 打开修改记录对话框
-        self.open_record_dialog(table_name, "modify", values)
+        # 打开修改记录对话框，以第一行的值作为初始值
+        _, key, row = items[0]
+        values = dict(zip(self.changes.columns, row))
+        if self.result_query.columns:
+            # 只显示了部分列，其余列的当前值按键读取
+            full_row = self.logic.get_rows_by_key(self.result_table, [key]).get(key)
+            if full_row is not None:
+                values = dict(zip(self.table_columns, full_row), **values)
+        self.open_record_dialog(self.result_table, "modify", values, items)
 
     def delete_record(self):
-        """删除记录"""
-        if not hasattr(self, "conn") or not self.conn:
-            messagebox.showwarning("警告", "请先打开一个数据库")
+        """删除选中的记录"""
+        items = self.selected_items("删除")
+        if not items:
             return
 
-        selection = self.result_tree.selection()
-        if not selection:
-            messagebox.showwarning("警告", "请选择要删除的记录")
+        if not messagebox.askyesno("确认", f"确定要删除选中的 {len(items)} 条记录吗？"):
             return
 
-        if not messagebox.askyesno("确认", "确定要删除选中的记录吗？"):
+        for index, key, _ in items:
+            self.changes.add_delete(key, index)
+        self.on_changes_queued()
+
+    def decorate_row(self, index, key, row):
+        """在结果表格中叠加显示待提交的修改"""
+        if self.changes is None:
+            return row, ()
+        return self.changes.patch(key, row)
+
+    def pending_insert_rows(self):
+        """待添加的记录，标记后显示在结果表格末尾"""
+        if self.changes is None:
+            return []
+        return [
+            (tuple(values.get(name) for name in self.changes.columns), ("inserted",))
+            for values in self.changes.inserts
+        ]
+
+    def update_pending_label(self):
+        text = self.changes.summary() if self.changes else ""
+        self.pending_label.config(text=text)
+
+    def on_changes_queued(self):
+        """修改加入缓冲区后：批量编辑模式下只刷新显示，否则立即提交"""
+        if not self.batch_var.get():
+            self.commit_changes()
             return
+        self.update_pending_label()
+        self.result_grid.refresh()
 
-        table_name = self.query_table_var.get()
-        if not table_name:
-            messagebox.showwarning("警告", "请选择一个表")
+    def commit_changes(self):
+        """在后台线程中以一个事务提交缓冲区中的修改，只重新读取受影响的行"""
+        changes = self.changes
+        if not changes or self.is_committing():
             return
-
         try:
-            # 获取选中的记录数据
-            selected_item = self.result_tree.item(selection[0])
-            values = selected_item["values"]
-
-            # 获取表的主键列
-            cursor = self.conn.cursor()
-            cursor.execute(f"PRAGMA table_info({table_name})")
-            columns = cursor.fetchall()
-
-            # 构建删除语句（使用所有列作为条件）
-            column_names = [col[1] for col in columns]
-            where_conditions = []
-            params = []
-
-            for i, (col_name, value) in enumerate(zip(column_names, values)):
-                if value is not None:
-                    where_conditions.append(f"{col_name} = ?")
-                    params.append(value)
-                else:
-                    where_conditions.append(f"{col_name} IS NULL")
-
-            where_clause = " AND ".join(where_conditions)
-            delete_sql = f"DELETE FROM {table_name} WHERE {where_clause}"
-
-            cursor.execute(delete_sql, params)
-            self.conn.commit()
-
-            # 刷新查询结果
-            self.execute_query()
-
-            # 通知主窗口更新状态
-            if self.update_status_callback:
-                self.update_status_callback("记录删除成功")
-
+            first_index, reread = self.plan_refresh(changes)
+            self.commit_task = self.logic.submit_changes(
+                changes,
+                reread,
+                lambda result: self.on_commit_done(changes, first_index, result),
+                self.on_commit_error,
+            )
         except Exception as e:
-            messagebox.showerror("错误", f"删除记录失败: {str(e)}")
+            self.on_commit_error(e)
+            return
+        if self.update_status_callback:
+            self.update_status_callback("正在提交修改...")
+
+    def on_commit_done(self, changes, first_index, result):
+        """后台提交完成：刷新受影响的行并清空缓冲区"""
+        self.commit_task = None
+        self.refresh_changed_rows(first_index, result["rows"])
+        changes.clear()
+        self.update_pending_label()
+        self.result_grid.refresh()
+
+        # 通知主窗口更新状态
+        counts = result["counts"]
+        if self.update_status_callback:
+            self.update_status_callback(
+                f"已提交：修改 {counts['updated']} 条，删除 {counts['deleted']} 条，"
+                f"添加 {counts['inserted']} 条"
+            )
 
-    def open_record_dialog(self, table_name, mode, values=None):
+    def on_commit_error(self, error):
+        """提交失败时整体已回滚；非批量模式下失败的修改不保留"""
+        self.commit_task = None
+        messagebox.showerror("错误", f"提交修改失败: {str(error)}")
+        if not self.batch_var.get():
+            self.discard_changes()
+
+    def plan_refresh(self, changes):
+        """
+        提交前决定如何刷新结果，返回 (开始重新读取的行号, 是否按键重新读取修改过的行)：
+        只修改了非主键列的行按键重新读取后原地替换；
+        删除的行之后的页、或有添加及主键修改时的全部页，在显示时重新读取。
+        """
+        # 修改了主键或筛选排序用到的列时，行的位置或是否满足条件可能改变
+        moved = set(self.logic.get_primary_key(changes.table_name))
+        if self.result_query is not None:
+            moved |= self.result_query.referenced_columns()
+        key_changed = any(
+            name in moved for values in changes.updates.values() for name in values
+        )
+        if changes.inserts or key_changed:
+            first_index = 0
+        else:
+            first_index = changes.first_index(changes.deletes)
+        return first_index, bool(changes.updates) and not key_changed
+
+    def refresh_changed_rows(self, first_index, rows):
+        """提交后原地替换重新读取的行，并让 first_index 所在页之后的页在显示时重新读取"""
+        source = self.result_grid.source
+        if source is None:
+            return
+        if rows:
+            source.replace_rows(rows)
+        if first_index is not None:
+            # 行号发生变化，原来的选中行已不对应
+            self.result_grid.clear_selection()
+            source.invalidate(first_index // source.page_size)
+
+    def on_record_added(self, result):
+        if self.update_status_callback:
+            self.update_status_callback("记录添加成功")
+
+    def on_add_error(self, error):
+        messagebox.showerror("错误", f"添加记录失败: {str(error)}")
+
+    def discard_changes(self):
+        """放弃未提交的修改"""
+        if not self.changes or self.is_committing():
+            return
+        self.changes.clear()
+        self.update_pending_label()
+        self.result_grid.refresh()
+
+    def open_record_dialog(self, table_name, mode, values=None, items=None):
         """打开记录编辑对话框"""
         if not hasattr(self, "conn") or not self.conn:
             return
@@ -215,22 +608,24 @@ class QueryTab:
         root = self.frame.winfo_toplevel()
 
         dialog = tk.Toplevel(root)
-        dialog.title(f"{'添加' if mode == 'add' else '修改'}记录 - {table_name}")
+        title = f"{'添加' if mode == 'add' else '修改'}记录 - {table_name}"
+        if items and len(items) > 1:
+            title += f"（{len(items)} 条）"
+        dialog.title(title)
         dialog.geometry("400x300")
         dialog.transient(root)
         dialog.grab_set()
 
-        # 获取表结构
-        cursor = self.conn.cursor()
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        columns = cursor.fetchall()
+        # 获取表结构（来自结构目录缓存）
+        columns = self.logic.get_table_structure(table_name)
 
         # 创建输入字段
         entries = {}
+        initial = {}
         row = 0
 
         for col in columns:
-            cid, col_name, data_type, not_null, default_value, pk = col
+            col_name, data_type = col["name"], col["data_type"]
 
             ttk.Label(dialog, text=f"{col_name} ({data_type})").grid(
                 row=row, column=0, sticky=tk.W, padx=5, pady=2
@@ -240,10 +635,12 @@ class QueryTab:
             entry.grid(row=row, column=1, padx=5, pady=2)
 
             # 如果是修改模式，填入当前值
-            if mode == "modify" and values and row < len(values):
-                entry.insert(0, str(values[row]) if values[row] is not None else "")
+            if mode == "modify" and values and col_name in values:
+                value = values[col_name]
+                entry.insert(0, str(value) if value is not None else "")
 
             entries[col_name] = entry
+            initial[col_name] = entry.get().strip()
             row += 1
 
         # 按钮框架
@@ -255,70 +652,36 @@ class QueryTab:
                 messagebox.showerror("错误", "数据库连接已断开")
                 return
 
-            try:
-                # 获取输入值
-                input_values = {}
-                for col_name, entry in entries.items():
-                    value = entry.get().strip()
-                    input_values[col_name] = value if value else None
-
-                cursor = self.conn.cursor()
-
-                if mode == "add":
-                    # 插入新记录
-                    columns_str = ", ".join(input_values.keys())
-                    placeholders = ", ".join(["?" for _ in input_values])
-                    sql = f"INSERT INTO {table_name} ({columns_str}) VALUES ({placeholders})"
-                    cursor.execute(sql, list(input_values.values()))
-
-                else:  # modify
-                    # 更新记录
-                    set_clauses = []
-                    params = []
-
-                    for col_name, value in input_values.items():
-                        set_clauses.append(f"{col_name} = ?")
-                        params.append(value)
-
-                    # 构建WHERE条件（使用原始值）
-                    cursor.execute(f"PRAGMA table_info({table_name})")
-                    table_columns = cursor.fetchall()
-
-                    where_conditions = []
-                    where_params = []
-
-                    for i, col in enumerate(table_columns):
-                        col_name = col[1]
-                        if values and i < len(values):
-                            original_value = values[i]
-                            if original_value is not None:
-                                where_conditions.append(f"{col_name} = ?")
-                                where_params.append(original_value)
-                            else:
-                                where_conditions.append(f"{col_name} IS NULL")
-
-                    where_clause = " AND ".join(where_conditions)
-                    set_clause = ", ".join(set_clauses)
-                    sql = f"UPDATE {table_name} SET {set_clause} WHERE {where_clause}"
-
-                    cursor.execute(sql, params + where_params)
-
-                self.conn.commit()
-                dialog.destroy()
-
-                # 刷新查询结果
-                self.execute_query()
-
-                # 通知主窗口更新状态
-                if self.update_status_callback:
-                    self.update_status_callback(
-                        f"记录{'添加' if mode == 'add' else '修改'}成功"
-                    )
-
-            except Exception as e:
-                messagebox.showerror(
-                    "错误", f"{'添加' if mode == 'add' else '修改'}记录失败: {str(e)}"
-                )
+            # 获取输入值，修改模式下只取改动过的字段，未改动的值保持原类型
+            input_values = {}
+            for col_name, entry in entries.items():
+                value = entry.get().strip()
+                if mode == "modify" and value == initial[col_name]:
+                    continue
+                input_values[col_name] = value if value else None
+
+            if mode == "add":
+                if self.changes is not None and table_name == self.result_table:
+                    self.changes.add_insert(input_values)
+                else:
+                    # 不是结果表格中的表，直接提交
+                    changes = ChangeBuffer(table_name, list(entries))
+                    changes.add_insert(input_values)
+                    try:
+                        self.logic.submit_changes(
+                            changes, False, self.on_record_added, self.on_add_error
+                        )
+                    except Exception as e:
+                        self.on_add_error(e)
+                        return
+                    dialog.destroy()
+                    return
+            elif input_values:
+                for index, key, _ in items:
+                    self.changes.add_update(key, index, input_values)
+
+            dialog.destroy()
+            self.on_changes_queued()
 
         ttk.Button(button_frame, text="保存", command=save_record).pack(
             side=tk.LEFT, padx=5
@@ -0,0 +1,263 @@
+"""
+全文检索标签页组件
+在附属的 FTS5 索引中检索所有已编入索引的表，双击结果跳转到数据查询标签页中的对应行
+"""
+
+import time
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+
+class SearchTab:
+    # 停止输入多久后自动检索（毫秒）
+    SEARCH_DELAY_MS = 300
+    # 最多显示的结果数
+    RESULT_LIMIT = 200
+
+    def __init__(
+        self,
+        parent_notebook,
+        logic,
+        update_status_callback=None,
+        open_row_callback=None,
+    ):
+        self.logic = logic
+        self.parent_notebook = parent_notebook
+        self.update_status_callback = update_status_callback
+        # 双击结果时调用 open_row_callback(表名, 键)
+        self.open_row_callback = open_row_callback
+        self.tables = []
+        # 结果列表中每一项对应的 (表名, 键)
+        self.results = []
+        # 等待执行的自动检索（after 编号）
+        self.pending_search = None
+        # 正在后台同步索引的任务编号；表列表每次刷新后递增代数，旧任务的结果被忽略
+        self.index_task = None
+        self.index_generation = 0
+
+        # 创建标签页框架
+        self.frame = ttk.Frame(parent_notebook)
+        parent_notebook.add(self.frame, text="全文检索")
+
+        self.setup_ui()
+
+    def setup_ui(self):
+        """设置用户界面"""
+        search_frame = ttk.Frame(self.frame)
+        search_frame.pack(fill=tk.X, pady=(0, 10))
+
+        ttk.Label(search_frame, text="检索:").pack(side=tk.LEFT)
+        self.search_var = tk.StringVar()
+        search_entry = ttk.Entry(search_frame, textvariable=self.search_var, width=40)
+        search_entry.pack(side=tk.LEFT, padx=(10, 0))
+        search_entry.bind("<Return>", lambda event: self.search())
+        search_entry.bind("<KeyRelease>", self.schedule_search)
+        ttk.Button(search_frame, text="检索", command=self.search).pack(
+            side=tk.LEFT, padx=(5, 0)
+        )
+        ttk.Button(search_frame, text="选择索引表", command=self.choose_tables).pack(
+            side=tk.LEFT, padx=(10, 0)
+        )
+        ttk.Button(
+            search_frame, text="更新索引", command=lambda: self.update_index(None)
+        ).pack(side=tk.LEFT, padx=(5, 0))
+        self.index_label = ttk.Label(search_frame, text="")
+        self.index_label.pack(side=tk.RIGHT)
+
+        columns = ("表", "键", "匹配内容")
+        widths = (120, 120, 600)
+        tree_frame = ttk.Frame(self.frame)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.result_tree = ttk.Treeview(tree_frame, columns=columns, show="headings")
+        for col, width in zip(columns, widths):
+            self.result_tree.heading(col, text=col)
+            self.result_tree.column(col, width=width, stretch=(col == "匹配内容"))
+        self.result_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        self.result_tree.bind("<Double-1>", self.open_selected)
+        self.result_tree.bind("<Return>", self.open_selected)
+
+        v_scroll = ttk.Scrollbar(
+            tree_frame, orient=tk.VERTICAL, command=self.result_tree.yview
+        )
+        v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.result_tree.configure(yscrollcommand=v_scroll.set)
+
+        ttk.Label(
+            self.frame,
+            text="多个词以空格分隔，须同时出现；双击结果跳转到数据查询中的对应行",
+            foreground="#666666",
+        ).pack(anchor=tk.W, pady=(5, 0))
+
+    def refresh_tables(self, tables):
+        """数据库或表结构变化后更新表列表和索引状态"""
+        self.tables = [name for name in tables if not name.startswith("sqlite_")]
+        self.index_task = None
+        self.index_generation += 1
+        self.clear_results()
+        self.update_index_label()
+
+    def update_index_label(self, text=None):
+        if text is None:
+            if not self.logic.has_search_index():
+                text = "未建立索引"
+            else:
+                indexed = self.logic.get_search_index().indexed_tables()
+                text = f"已编入索引: {len(indexed)} 个表" if indexed else "未建立索引"
+        self.index_label.config(text=text)
+
+    def clear_results(self):
+        self.results = []
+        for item in self.result_tree.get_children():
+            self.result_tree.delete(item)
+
+    def schedule_search(self, event=None):
+        """输入停顿后自动检索，连续输入时只检索一次"""
+        if event is not None and event.keysym == "Return":
+            return
+        if self.pending_search is not None:
+            self.frame.after_cancel(self.pending_search)
+        self.pending_search = self.frame.after(
+            self.SEARCH_DELAY_MS, lambda: self.search(quiet=True)
+        )
+
+    def search(self, quiet=False):
+        """
+        在索引中检索（只查询附属索引，耗时为毫秒级，因此直接在界面线程执行）。
+        数据在上次同步后有变化时在后台增量更新索引，完成后重新检索
+        """
+        if self.pending_search is not None:
+            self.frame.after_cancel(self.pending_search)
+            self.pending_search = None
+        text = self.search_var.get().strip()
+        if not text:
+            self.clear_results()
+            return
+        if not self.logic.conn:
+            if not quiet:
+                messagebox.showwarning("警告", "请先打开一个数据库")
+            return
+        if not self.logic.has_search_index():
+            if not quiet:
+                messagebox.showwarning("警告", "请先点击“选择索引表”建立索引")
+            return
+        try:
+            started = time.perf_counter()
+            results = self.logic.search(text, self.RESULT_LIMIT)
+            elapsed = time.perf_counter() - started
+        except Exception as e:
+            if not quiet:
+                messagebox.showerror("错误", f"检索失败: {str(e)}")
+            return
+        self.clear_results()
+        for result in results:
+            key = result["key"]
+            self.results.append((result["table"], key))
+            self.result_tree.insert(
+                "",
+                tk.END,
+                values=(
+                    result["table"],
+                    key[0] if len(key) == 1 else ", ".join(map(str, key)),
+                    result["snippet"],
+                ),
+            )
+        if self.update_status_callback:
+            more = "（只显示前面的结果）" if len(results) >= self.RESULT_LIMIT else ""
+            self.update_status_callback(
+                f"找到 {len(results)} 条结果{more}，耗时 {elapsed * 1000:.1f} 毫秒"
+            )
+        if self.index_task is None and self.logic.search_index_stale():
+            self.update_index(None)
+
+    def choose_tables(self):
+        """选择要编入索引的表，只有文本列被编入索引"""
+        if not self.logic.conn:
+            messagebox.showwarning("警告", "请先打开一个数据库")
+            return
+        if self.index_task is not None:
+            messagebox.showinfo("提示", "索引正在更新，请稍后再试")
+            return
+        indexed = set()
+        if self.logic.has_search_index():
+            indexed = set(self.logic.get_search_index().indexed_tables())
+
+        root = self.frame.winfo_toplevel()
+        dialog = tk.Toplevel(root)
+        dialog.title("选择索引表")
+        dialog.transient(root)
+        dialog.grab_set()
+
+        variables = {}
+        list_frame = ttk.Frame(dialog)
+        list_frame.pack(fill=tk.BOTH, expand=True, padx=10, pady=10)
+        for name in self.tables:
+            columns = self.logic.searchable_columns(name)
+            variables[name] = tk.BooleanVar(value=name in indexed)
+            ttk.Checkbutton(
+                list_frame,
+                text=f"{name}（{', '.join(columns) or '没有文本列'}）",
+                variable=variables[name],
+                state=tk.NORMAL if columns else tk.DISABLED,
+            ).pack(anchor=tk.W)
+
+        def apply():
+            selected = [name for name in self.tables if variables[name].get()]
+            removed = [name for name in indexed if name not in selected]
+            dialog.destroy()
+            self.update_index(selected, removed)
+
+        ttk.Button(dialog, text="确定", command=apply).pack(pady=(0, 10))
+
+    def update_index(self, tables, remove=()):
+        """在后台增量同步索引，tables 为 None 时同步已编入索引的表"""
+        if not self.logic.conn:
+            messagebox.showwarning("警告", "请先打开一个数据库")
+            return
+        if self.index_task is not None:
+            return
+        generation = self.index_generation
+        try:
+            self.index_task = self.logic.update_search_index(
+                tables,
+                lambda result: self.on_index_updated(generation, result),
+                lambda error: self.on_index_error(generation, error),
+                remove=remove,
+            )
+        except Exception as e:
+            messagebox.showerror("错误", f"更新索引失败: {str(e)}")
+            return
+        self.update_index_label("正在更新索引...")
+
+    def on_index_updated(self, generation, result):
+        if generation != self.index_generation:
+            return
+        self.index_task = None
+        self.update_index_label()
+        changed = {
+            name: sum(counts[kind] for counts in result.values())
+            for name, kind in (
+                ("新增", "added"),
+                ("更新", "updated"),
+                ("删除", "removed"),
+            )
+        }
+        if self.update_status_callback:
+            summary = "，".join(f"{name} {rows} 行" for name, rows in changed.items())
+            self.update_status_callback(f"索引已更新: {summary}")
+        if any(changed.values()) and self.search_var.get().strip():
+            self.search(quiet=True)
+
+    def on_index_error(self, generation, error):
+        if generation != self.index_generation:
+            return
+        self.index_task = None
+        self.update_index_label()
+        messagebox.showerror("错误", f"更新索引失败: {str(error)}")
+
+    def open_selected(self, event=None):
+        item = self.result_tree.focus()
+        if not item or self.open_row_callback is None:
+            return
+        table_name, key = self.results[self.result_tree.index(item)]
+        self.open_row_callback(table_name, key)
@@ -3,8 +3,13 @@ SQL执行标签页组件
 提供SQL语句执行功能
 """
 
+import sqlite3
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox
+from src.utils import open_async_source, ListRowSource, split_statements, ScriptError
+from src.utils.row_source import is_wrappable_query
+from .virtual_grid import VirtualGrid
 
 
 class SQLTab:
@@ -15,6 +20,13 @@ class SQLTab:
         self.parent_notebook = parent_notebook
         self.update_status_callback = update_status_callback
         self.refresh_callback = refresh_callback
+        # 正在后台执行的任务编号
+        self.running_task = None
+        self.count_reported = False
+        self.started_at = 0.0
+        self.statement_count = 0
+        # 单条查询语句在执行日志中的条目，总行数统计完成后补上返回行数
+        self.log_item = None
 
         # 创建标签页框架
         self.frame = ttk.Frame(parent_notebook)
@@ -43,76 +55,334 @@ class SQLTab:
         button_frame = ttk.Frame(self.frame)
         button_frame.pack(fill=tk.X, pady=(0, 10))
 
-        ttk.Button(button_frame, text="执行SQL", command=self.execute_sql).pack(
-            side=tk.LEFT
+        self.execute_button = ttk.Button(
+            button_frame, text="执行SQL", command=self.execute_sql
         )
+        self.execute_button.pack(side=tk.LEFT)
+        self.cancel_button = ttk.Button(
+            button_frame, text="取消", command=self.cancel_sql, state=tk.DISABLED
+        )
+        self.cancel_button.pack(side=tk.LEFT, padx=(10, 0))
+        self.analyze_button = ttk.Button(
+            button_frame, text="分析", command=self.analyze_sql
+        )
+        self.analyze_button.pack(side=tk.LEFT, padx=(10, 0))
         ttk.Button(
             button_frame, text="清空", command=lambda: self.sql_text.delete(1.0, tk.END)
         ).pack(side=tk.LEFT, padx=(10, 0))
+        self.fast_script_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            button_frame,
+            text="脚本快速执行（executescript，不记录单条语句）",
+            variable=self.fast_script_var,
+        ).pack(side=tk.LEFT, padx=(10, 0))
+        self.cache_var = tk.BooleanVar(value=False)
+        ttk.Checkbutton(
+            button_frame, text="缓存查询结果", variable=self.cache_var
+        ).pack(side=tk.LEFT, padx=(10, 0))
 
-        # SQL执行结果
-        ttk.Label(self.frame, text="执行结果").pack(anchor=tk.W)
-
-        sql_result_frame = ttk.Frame(self.frame)
-        sql_result_frame.pack(fill=tk.BOTH, expand=True)
+        # 执行日志：每条语句的耗时和行数
+        ttk.Label(self.frame, text="执行日志").pack(anchor=tk.W)
 
-        self.sql_result_tree = ttk.Treeview(sql_result_frame)
-        self.sql_result_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+        log_frame = ttk.Frame(self.frame)
+        log_frame.pack(fill=tk.X, pady=(5, 10))
 
-        sql_result_v_scroll = ttk.Scrollbar(
-            sql_result_frame, orient=tk.VERTICAL, command=self.sql_result_tree.yview
+        log_columns = ("序号", "语句", "耗时(毫秒)", "影响行数", "返回行数")
+        self.log_tree = ttk.Treeview(
+            log_frame, columns=log_columns, show="headings", height=5
         )
-        sql_result_v_scroll.pack(side=tk.RIGHT, fill=tk.Y)
-        self.sql_result_tree.configure(yscrollcommand=sql_result_v_scroll.set)
+        for col, width in zip(log_columns, (50, 500, 90, 80, 80)):
+            self.log_tree.heading(col, text=col)
+            self.log_tree.column(col, width=width, stretch=(col == "语句"))
+        self.log_tree.pack(side=tk.LEFT, fill=tk.X, expand=True)
 
-        sql_result_h_scroll = ttk.Scrollbar(
-            self.frame, orient=tk.HORIZONTAL, command=self.sql_result_tree.xview
+        log_scroll = ttk.Scrollbar(
+            log_frame, orient=tk.VERTICAL, command=self.log_tree.yview
         )
-        sql_result_h_scroll.pack(fill=tk.X)
-        self.sql_result_tree.configure(xscrollcommand=sql_result_h_scroll.set)
+        log_scroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.log_tree.configure(yscrollcommand=log_scroll.set)
+
+        # SQL执行结果
+        ttk.Label(self.frame, text="执行结果").pack(anchor=tk.W)
+
+        self.sql_result_grid = VirtualGrid(self.frame)
+        self.sql_result_grid.frame.pack(fill=tk.BOTH, expand=True)
+        self.sql_result_tree = self.sql_result_grid.tree
 
     def execute_sql(self):
-        """执行SQL语句"""
+        """在后台线程执行SQL语句"""
         sql = self.sql_text.get(1.0, tk.END).strip()
         if not sql:
             messagebox.showwarning("警告", "请输入SQL语句")
             return
+        if self.running_task is not None:
+            messagebox.showwarning("警告", "上一条语句仍在执行")
+            return
         try:
             # 清空之前的结果
-            for item in self.sql_result_tree.get_children():
-                self.sql_result_tree.delete(item)
-
-            result = self.logic.execute_sql(sql)
-
-            if "columns" in result:
-                # 查询结果，显示数据
-                column_names = result["columns"]
-                self.sql_result_tree["columns"] = column_names
-                self.sql_result_tree["show"] = "headings"
-                for col in column_names:
-                    self.sql_result_tree.heading(col, text=col)
-                    self.sql_result_tree.column(col, width=100)
-                for row in result["rows"]:
-                    self.sql_result_tree.insert("", tk.END, values=row)
-
-                # 通知主窗口更新状态
-                if self.update_status_callback:
-                    self.update_status_callback(
-                        f"查询完成，返回 {len(result['rows'])} 条记录"
-                    )
+            self.sql_result_grid.clear()
+            self.clear_log()
+            worker = self.logic.get_worker()
+            self.started_at = time.perf_counter()
+            self.statement_count = len(split_statements(sql))
+            if self.statement_count > 1:
+                # 多条语句作为脚本在一个事务中执行
+                fast = self.fast_script_var.get()
+                self.running_task = worker.submit(
+                    lambda logic: logic.execute_script(sql, fast),
+                    self.on_script_done,
+                    self.on_sql_error,
+                    track=True,
+                )
+            elif self.cache_var.get() and is_wrappable_query(sql):
+                # 查询结果完整读入并缓存，数据库未变化时再次执行直接返回缓存
+                self.running_task = worker.submit(
+                    lambda logic: logic.execute_sql(sql, use_cache=True),
+                    self.on_cached_done,
+                    self.on_sql_error,
+                    track=True,
+                )
             else:
-                # 非查询语句，显示影响行数
-                if self.update_status_callback:
-                    self.update_status_callback(
-                        f"SQL执行成功，影响 {result.get('affected_rows', 0)} 行"
-                    )
+                self.running_task = open_async_source(
+                    worker,
+                    lambda logic: logic.open_sql_source(sql),
+                    self.on_sql_done,
+                    self.on_sql_error,
+                )
+            self.set_running(True)
+        except Exception as e:
+            messagebox.showerror("错误", f"SQL执行失败: {str(e)}")
+
+    def on_sql_done(self, result):
+        """后台执行完成"""
+        self.set_running(False)
+        sql = self.sql_text.get(1.0, tk.END).strip()
+        seconds = time.perf_counter() - self.started_at
+        if "columns" in result:
+            # 查询结果，按需分页显示
+            source = result["source"]
+            source.on_ready = lambda: self.on_source_ready(source)
+            self.sql_result_grid.set_source(result["columns"], source)
+            self.log_item = self.add_log_entry(
+                1, {"sql": sql, "seconds": seconds, "rows_affected": None}
+            )
+            self.report_count(source)
+        else:
+            # 非查询语句，显示影响行数
+            self.add_log_entry(
+                1,
+                {
+                    "sql": sql,
+                    "seconds": seconds,
+                    "rows_affected": result.get("affected_rows"),
+                },
+            )
+            if self.update_status_callback:
+                self.update_status_callback(
+                    f"SQL执行成功，影响 {result.get('affected_rows', 0)} 行"
+                )
+
+            # 如果有refresh_callback，调用它刷新数据库结构
+            if self.refresh_callback:
+                self.refresh_callback()
+
+    def on_cached_done(self, result):
+        """启用缓存的查询完成"""
+        self.set_running(False)
+        sql = self.sql_text.get(1.0, tk.END).strip()
+        cached = result.get("cached", False)
+        if "columns" in result:
+            self.show_rows(result["columns"], result["rows"])
+        self.add_log_entry(
+            1,
+            {
+                "sql": ("（缓存）" if cached else "") + sql,
+                "seconds": time.perf_counter() - self.started_at,
+                "rows_affected": result.get("affected_rows"),
+                "rows_returned": len(result.get("rows", ())),
+            },
+        )
+        if self.update_status_callback:
+            self.update_status_callback(
+                f"查询完成，返回 {len(result.get('rows', ()))} 条记录"
+                + ("（来自缓存）" if cached else "")
+            )
+        if "columns" not in result and self.refresh_callback:
+            self.refresh_callback()
+
+    def on_script_done(self, result):
+        """脚本执行完成，逐条记录耗时和行数，最后一条查询语句的结果显示在表格中"""
+        self.set_running(False)
+        for index, entry in enumerate(result["statements"], 1):
+            self.add_log_entry(index, entry)
+        if "columns" in result:
+            self.show_rows(result["columns"], result["rows"])
+        if self.update_status_callback:
+            self.update_status_callback(
+                f"脚本执行成功，共 {self.statement_count} 条语句，"
+                f"耗时 {result['seconds']:.3f} 秒"
+            )
+        if self.refresh_callback:
+            self.refresh_callback()
+
+    def show_rows(self, columns, rows):
+        """显示已全部读取的结果"""
+        source = ListRowSource(columns, rows)
+        source.profiler = self.logic.profiler
+        self.sql_result_grid.set_source(columns, source)
+
+    def clear_log(self):
+        self.log_item = None
+        for item in self.log_tree.get_children():
+            self.log_tree.delete(item)
+
+    def add_log_entry(self, index, entry):
+        """在执行日志中添加一条语句的记录"""
+        statement = " ".join(entry["sql"].split())
+        if len(statement) > 200:
+            statement = statement[:200] + "..."
 
-                # 如果有refresh_callback，调用它刷新数据库结构
-                if self.refresh_callback:
-                    self.refresh_callback()
+        def count(value):
+            return "" if value is None else value
 
+        return self.log_tree.insert(
+            "",
+            tk.END,
+            values=(
+                index,
+                statement,
+                f"{entry['seconds'] * 1000:.2f}",
+                count(entry.get("rows_affected")),
+                count(entry.get("rows_returned")),
+            ),
+        )
+
+    def analyze_sql(self):
+        """在后台线程分析查询计划"""
+        sql = self.sql_text.get(1.0, tk.END).strip()
+        if not sql:
+            messagebox.showwarning("警告", "请输入SQL语句")
+            return
+        try:
+            worker = self.logic.get_worker()
         except Exception as e:
-            messagebox.showerror("错误", f"SQL执行失败: {str(e)}")
+            messagebox.showerror("错误", f"分析失败: {str(e)}")
+            return
+        self.analyze_button.config(state=tk.DISABLED)
+
+        def done(result):
+            self.analyze_button.config(state=tk.NORMAL)
+            self.show_query_plan(sql, result)
+
+        def failed(error):
+            self.analyze_button.config(state=tk.NORMAL)
+            messagebox.showerror("错误", f"分析失败: {str(error)}")
+
+        worker.submit(
+            lambda logic: logic.analyze_query(sql, use_expert=True), done, failed
+        )
+
+    def show_query_plan(self, sql, result):
+        """在对话框中显示查询计划树和推荐索引"""
+        root = self.frame.winfo_toplevel()
+        dialog = tk.Toplevel(root)
+        dialog.title("查询计划")
+        dialog.geometry("700x500")
+        dialog.transient(root)
+
+        ttk.Label(
+            dialog, text="查询计划（红色：全表扫描，橙色：临时B树/自动索引）"
+        ).pack(anchor=tk.W, padx=10, pady=(10, 0))
+        plan_tree = ttk.Treeview(dialog, columns=("提示",), height=10)
+        plan_tree.heading("#0", text="步骤")
+        plan_tree.heading("提示", text="提示")
+        plan_tree.column("#0", width=520)
+        plan_tree.column("提示", width=120)
+        plan_tree.tag_configure("full_scan", foreground="#cc0000")
+        plan_tree.tag_configure("temp_btree", foreground="#cc6600")
+        plan_tree.tag_configure("auto_index", foreground="#cc6600")
+        plan_tree.pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        hints = {
+            "full_scan": "全表扫描",
+            "temp_btree": "临时B树",
+            "auto_index": "自动索引",
+        }
+        items = {0: ""}
+        for node in result["plan"]:
+            warning = node["warning"]
+            items[node["id"]] = plan_tree.insert(
+                items.get(node["parent"], ""),
+                tk.END,
+                text=node["detail"],
+                values=(hints.get(warning, ""),),
+                tags=(warning,) if warning else (),
+                open=True,
+            )
+
+        ttk.Label(dialog, text="索引建议").pack(anchor=tk.W, padx=10)
+        advice = tk.Text(dialog, height=8)
+        advice.pack(fill=tk.BOTH, expand=True, padx=10, pady=(5, 10))
+        lines = []
+        for suggestion in result["suggestions"]:
+            checked = "已验证会被使用" if suggestion["verified"] else "未能验证"
+            lines.append(f"-- {suggestion['reason']}（{checked}）")
+            lines.append(suggestion["sql"] + ";")
+        if not lines:
+            lines.append("-- 没有可推荐的索引")
+        if result["expert"]:
+            lines.append("")
+            lines.append("-- sqlite3 .expert 的建议:")
+            lines.append(result["expert"])
+        advice.insert(tk.END, "\n".join(lines))
+
+    def on_sql_error(self, error):
+        self.set_running(False)
+        if isinstance(error, ScriptError):
+            # 记录失败前已执行的语句，修改已全部回滚
+            for index, entry in enumerate(error.results, 1):
+                self.add_log_entry(index, entry)
+            self.add_log_entry(
+                error.index + 1, {"sql": "失败: " + error.statement, "seconds": 0.0}
+            )
+            error = error.__cause__ if "interrupted" in str(error) else error
+        if isinstance(error, sqlite3.OperationalError) and "interrupted" in str(error):
+            if self.update_status_callback:
+                self.update_status_callback("SQL执行已取消")
+            return
+        messagebox.showerror("错误", f"SQL执行失败: {str(error)}")
+
+    def on_source_ready(self, source):
+        """后台读取的数据页或总行数到达"""
+        self.sql_result_grid.refresh()
+        if not self.count_reported:
+            # 总数未知时随读到的行数更新状态栏
+            self.report_count(source)
+
+    def report_count(self, source):
+        self.count_reported = source.count_known
+        if source.count_known and self.log_item is not None:
+            self.log_tree.set(self.log_item, "返回行数", source.row_count())
+        if not self.update_status_callback:
+            return
+        if source.count_known:
+            self.update_status_callback(f"查询完成，返回 {source.row_count()} 条记录")
+        else:
+            # 不预先统计总数，滚动到末尾时继续读取
+            self.update_status_callback(
+                f"查询完成，已读取 {source.loaded_rows} 条记录，向下滚动继续读取"
+            )
+
+    def cancel_sql(self):
+        """取消正在执行的语句"""
+        if self.running_task is not None and self.logic.worker is not None:
+            self.logic.worker.cancel(self.running_task)
+
+    def set_running(self, running):
+        if not running:
+            self.running_task = None
+        self.execute_button.config(state=tk.DISABLED if running else tk.NORMAL)
+        self.cancel_button.config(state=tk.NORMAL if running else tk.DISABLED)
 
     def clear_sql(self):
         """清空SQL文本"""
@@ -1,16 +1,31 @@
 """
 数据库结构标签页组件
-显示数据库中的表列表、表结构和数据预览
+显示数据库中的表列表、表结构、数据预览和各列的数据概况
 """
 
+import time
 import tkinter as tk
 from tkinter import ttk, messagebox
+from src.utils.table_stats import format_size
 
 
 class StructureTab:
+    # 估算行数不超过此数的表，选中后自动统计数据概况
+    AUTO_PROFILE_ROWS = 100000
+
     def __init__(self, parent_notebook, logic):
         self.logic = logic
         self.parent_notebook = parent_notebook
+        # 正在后台统计的任务编号；表列表每次重新填充后递增代数，旧任务的结果被忽略
+        self.stats_task = None
+        self.stats_generation = 0
+        # 数据概况对应的表，以及正在后台统计数据概况的任务编号和表
+        self.profile_table = None
+        self.profile_task = None
+        self.profile_task_table = None
+        # 表列表的排序列和是否降序
+        self.sort_column = None
+        self.sort_descending = False
 
         # 创建标签页框架
         self.frame = ttk.Frame(parent_notebook)
@@ -24,12 +39,30 @@ class StructureTab:
         left_frame = ttk.Frame(self.frame)
         left_frame.pack(side=tk.LEFT, fill=tk.Y, padx=(0, 10))
 
-        ttk.Label(left_frame, text="表列表").pack(anchor=tk.W)
+        header_frame = ttk.Frame(left_frame)
+        header_frame.pack(fill=tk.X)
+        ttk.Label(header_frame, text="表列表").pack(side=tk.LEFT)
+        ttk.Button(header_frame, text="刷新统计", command=self.refresh_statistics).pack(
+            side=tk.RIGHT
+        )
 
-        # 表列表框
-        self.tables_listbox = tk.Listbox(left_frame, width=20)
-        self.tables_listbox.pack(fill=tk.Y, expand=True, pady=(5, 0))
-        self.tables_listbox.bind("<<ListboxSelect>>", self.on_table_select)
+        # 表列表：行数在精确统计完成前显示估算值（带 ≈），大小包含索引
+        self.tables_tree = ttk.Treeview(
+            left_frame, columns=("行数", "大小"), show="tree headings", height=20
+        )
+        self.tables_tree.heading(
+            "#0", text="表名", command=lambda: self.sort_tables("#0")
+        )
+        self.tables_tree.column("#0", width=150)
+        for col in ("行数", "大小"):
+            self.tables_tree.heading(
+                col, text=col, command=lambda name=col: self.sort_tables(name)
+            )
+            self.tables_tree.column(col, width=80, anchor=tk.E)
+        self.tables_tree.pack(fill=tk.Y, expand=True, pady=(5, 0))
+        self.tables_tree.bind("<<TreeviewSelect>>", self.on_table_select)
+        # 表名 -> (行数, 大小)，用于排序
+        self.table_values = {}
 
         # 右侧：表结构和数据
         right_frame = ttk.Frame(self.frame)
@@ -50,11 +83,16 @@ class StructureTab:
 
         self.structure_tree.pack(fill=tk.X, pady=(5, 10))
 
-        # 表数据预览
-        ttk.Label(right_frame, text="数据预览").pack(anchor=tk.W)
+        # 数据预览和数据概况
+        detail_notebook = ttk.Notebook(right_frame)
+        detail_notebook.pack(fill=tk.BOTH, expand=True)
+        preview_frame = ttk.Frame(detail_notebook)
+        detail_notebook.add(preview_frame, text="数据预览")
+        profile_frame = ttk.Frame(detail_notebook)
+        detail_notebook.add(profile_frame, text="数据概况")
 
         # 数据预览框架
-        data_frame = ttk.Frame(right_frame)
+        data_frame = ttk.Frame(preview_frame)
         data_frame.pack(fill=tk.BOTH, expand=True, pady=(5, 0))
 
         # 数据树形视图（动态列）
@@ -69,24 +107,153 @@ class StructureTab:
         self.data_tree.configure(yscrollcommand=v_scrollbar.set)
 
         h_scrollbar = ttk.Scrollbar(
-            right_frame, orient=tk.HORIZONTAL, command=self.data_tree.xview
+            preview_frame, orient=tk.HORIZONTAL, command=self.data_tree.xview
         )
         h_scrollbar.pack(fill=tk.X)
         self.data_tree.configure(xscrollcommand=h_scrollbar.set)
 
+        self.setup_profile(profile_frame)
+
+    def setup_profile(self, parent):
+        """数据概况：一次扫描整张表得到的各列空值、不同值、取值范围、常见值和长度分布"""
+        bar = ttk.Frame(parent)
+        bar.pack(fill=tk.X, pady=5)
+        self.profile_button = ttk.Button(
+            bar, text="分析数据", command=lambda: self.refresh_profile(None)
+        )
+        self.profile_button.pack(side=tk.LEFT)
+        self.profile_label = ttk.Label(bar, text="")
+        self.profile_label.pack(side=tk.LEFT, padx=(10, 0))
+
+        columns = (
+            "列名",
+            "空值",
+            "不同值",
+            "最小值",
+            "最大值",
+            "常见值",
+            "长度分布",
+            "存储类型",
+        )
+        widths = (100, 90, 80, 120, 120, 220, 160, 120)
+        tree_frame = ttk.Frame(parent)
+        tree_frame.pack(fill=tk.BOTH, expand=True)
+        self.profile_tree = ttk.Treeview(tree_frame, columns=columns, show="headings")
+        for col, width in zip(columns, widths):
+            self.profile_tree.heading(col, text=col)
+            self.profile_tree.column(col, width=width, stretch=False)
+        self.profile_tree.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        v_scrollbar = ttk.Scrollbar(
+            tree_frame, orient=tk.VERTICAL, command=self.profile_tree.yview
+        )
+        v_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.profile_tree.configure(yscrollcommand=v_scrollbar.set)
+        h_scrollbar = ttk.Scrollbar(
+            parent, orient=tk.HORIZONTAL, command=self.profile_tree.xview
+        )
+        h_scrollbar.pack(fill=tk.X)
+        self.profile_tree.configure(xscrollcommand=h_scrollbar.set)
+
     def refresh_tables(self, tables):
-        """刷新表列表"""
-        self.tables_listbox.delete(0, tk.END)
+        """刷新表列表，先显示估算的行数，再在后台统计精确行数和大小"""
+        for item in self.tables_tree.get_children():
+            self.tables_tree.delete(item)
+        self.table_values = {}
+        self.stats_task = None
+        self.profile_task = None
+        self.stats_generation += 1
+        self.show_profile(None)
         for table_name in tables:
-            self.tables_listbox.insert(tk.END, table_name)
+            self.tables_tree.insert("", tk.END, iid=table_name, text=table_name)
+            stats = self.logic.get_table_statistics(table_name)
+            self.show_statistics(table_name, stats)
+        self.sort_tables(None)
+        self.refresh_statistics(only_missing=True)
+
+    def show_statistics(self, table_name, stats):
+        rows = stats["rows"]
+        if rows is None:
+            rows_text = ""
+        elif stats.get("exact", True):
+            rows_text = f"{rows:,}"
+        else:
+            rows_text = f"≈{rows:,}"
+        self.table_values[table_name] = (rows, stats["bytes"])
+        self.tables_tree.item(
+            table_name, values=(rows_text, format_size(stats["bytes"]))
+        )
+
+    def refresh_statistics(self, only_missing=False):
+        """
+        在后台统计各表的精确行数和大小，数据未变化时使用缓存。
+        only_missing 为 True 时，所有表都已有当前数据版本的统计结果就不再统计
+        """
+        tables = list(self.tables_tree.get_children())
+        if not tables or not self.logic.current_db_path or self.stats_task is not None:
+            return
+        if only_missing and all(
+            stats["exact"] and stats["bytes"] is not None
+            for stats in map(self.logic.get_table_statistics, tables)
+        ):
+            return
+        generation = self.stats_generation
+        self.stats_task = self.logic.refresh_table_statistics(
+            tables,
+            lambda stats: self.on_statistics(generation, stats),
+            lambda error: self.on_statistics_error(generation, error),
+        )
+
+    def on_statistics(self, generation, stats):
+        if generation != self.stats_generation:
+            return
+        self.stats_task = None
+        for table_name, values in stats.items():
+            if self.tables_tree.exists(table_name):
+                self.show_statistics(table_name, values)
+        self.sort_tables(None)
+
+    def on_statistics_error(self, generation, error):
+        if generation != self.stats_generation:
+            return
+        self.stats_task = None
+        messagebox.showerror("错误", f"统计表信息失败: {str(error)}")
+
+    def sort_tables(self, column):
+        """按表名、行数或大小排序；再次点击同一列切换升序和降序，column 为 None 时保持当前排序"""
+        if column is not None:
+            if column == self.sort_column:
+                self.sort_descending = not self.sort_descending
+            else:
+                self.sort_column = column
+                # 行数和大小默认从大到小，便于找出大表
+                self.sort_descending = column != "#0"
+        if self.sort_column is None:
+            return
+        index = {"行数": 0, "大小": 1}.get(self.sort_column)
+
+        def sort_key(table_name):
+            if index is None:
+                return table_name.lower()
+            value = self.table_values.get(table_name, (None, None))[index]
+            return value if value is not None else -1
+
+        tables = sorted(
+            self.tables_tree.get_children(),
+            key=sort_key,
+            reverse=self.sort_descending,
+        )
+        for position, table_name in enumerate(tables):
+            self.tables_tree.move(table_name, "", position)
 
     def on_table_select(self, event):
         """表选择事件处理"""
-        selection = self.tables_listbox.curselection()
+        selection = self.tables_tree.selection()
         if selection:
-            table_name = self.tables_listbox.get(selection[0])
+            table_name = selection[0]
             self.show_table_structure(table_name)
             self.show_table_data(table_name)
+            self.show_profile(table_name)
 
     def show_table_structure(self, table_name):
         """显示表结构"""
@@ -120,7 +287,113 @@ class StructureTab:
             for col in column_names:
                 self.data_tree.heading(col, text=col)
                 self.data_tree.column(col, width=100)
+            started = time.perf_counter()
             for row in data["rows"]:
                 self.data_tree.insert("", tk.END, values=row)
+            if self.logic.profiler is not None:
+                self.logic.profiler.add_render(
+                    len(data["rows"]), time.perf_counter() - started
+                )
         except Exception as e:
             messagebox.showerror("错误", f"显示表数据失败: {str(e)}")
+
+    def show_profile(self, table_name):
+        """
+        显示表的数据概况：数据未变化时使用缓存；没有缓存时，
+        小表自动在后台统计，大表等待点击“分析数据”
+        """
+        self.profile_table = table_name
+        for item in self.profile_tree.get_children():
+            self.profile_tree.delete(item)
+        if table_name is None:
+            self.profile_label.config(text="")
+            return
+        profile = self.logic.get_column_profile(table_name)
+        if profile is not None:
+            self.fill_profile(profile)
+            return
+        rows = self.logic.get_table_statistics(table_name)["rows"]
+        if rows is not None and rows <= self.AUTO_PROFILE_ROWS:
+            self.refresh_profile(table_name)
+        else:
+            size = f"约 {rows:,} 行，" if rows is not None else ""
+            self.profile_label.config(text=f"{size}点击“分析数据”扫描整张表统计各列")
+
+    def refresh_profile(self, table_name):
+        """在后台扫描表统计数据概况，table_name 为 None 时使用当前选中的表"""
+        table_name = table_name or self.profile_table
+        if not table_name or not self.logic.current_db_path:
+            messagebox.showwarning("警告", "请选择一个表")
+            return
+        if self.profile_task is not None:
+            if self.profile_task_table == table_name:
+                return
+            # 之前选中的表还在统计，中断它（已排队未开始的任务完成后结果会被忽略）
+            self.logic.get_stats_worker().cancel(self.profile_task)
+        generation = self.stats_generation
+        self.profile_task_table = table_name
+        self.profile_task = self.logic.refresh_column_profile(
+            table_name,
+            lambda profile: self.on_profile(generation, table_name, profile),
+            lambda error: self.on_profile_error(generation, table_name, error),
+        )
+        self.profile_label.config(text="正在分析数据...")
+
+    def on_profile(self, generation, table_name, profile):
+        if generation != self.stats_generation:
+            return
+        if table_name == self.profile_task_table:
+            self.profile_task = None
+        if table_name == self.profile_table:
+            self.fill_profile(profile)
+
+    def on_profile_error(self, generation, table_name, error):
+        if generation != self.stats_generation:
+            return
+        if table_name == self.profile_task_table:
+            self.profile_task = None
+        if table_name != self.profile_table:
+            return
+        if "interrupted" in str(error):
+            self.profile_label.config(text="数据分析已取消")
+            return
+        self.profile_label.config(text="")
+        messagebox.showerror("错误", f"分析数据失败: {str(error)}")
+
+    def fill_profile(self, profile):
+        for item in self.profile_tree.get_children():
+            self.profile_tree.delete(item)
+        rows = profile["rows"]
+        for col in profile["columns"]:
+            approximate = "" if col["exact"] else "≈"
+            self.profile_tree.insert(
+                "",
+                tk.END,
+                values=(
+                    col["name"],
+                    f"{col['nulls']:,} ({col['null_ratio']:.1%})",
+                    f"{approximate}{col['distinct']:,}",
+                    _short(col["min"]),
+                    _short(col["max"]),
+                    ", ".join(
+                        f"{_short(value, 16)} ×{approximate}{count:,}"
+                        for value, count in col["top"]
+                    ),
+                    " ".join(f"{bucket}:{n:,}" for bucket, n in col["lengths"].items()),
+                    " ".join(f"{kind}:{n:,}" for kind, n in col["types"].items()),
+                ),
+            )
+        self.profile_label.config(
+            text=f"{rows:,} 行，扫描耗时 {profile['seconds']:.2f} 秒"
+            "（≈ 为估算值；长度分布为文本和BLOB的字符数或字节数）"
+        )
+
+
+def _short(value, width=30):
+    """数据概况中显示的值，过长的文本截断，BLOB 只显示大小"""
+    if value is None:
+        return ""
+    if isinstance(value, bytes):
+        return f"<BLOB {len(value)} 字节>"
+    text = str(value).replace("\n", " ")
+    return text if len(text) <= width else text[: width - 1] + "…"
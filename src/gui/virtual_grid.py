@@ -0,0 +1,298 @@
+"""
+虚拟化结果表格组件
+只为可见区域的行创建Treeview条目，滚动时从分页数据源按需读取
+"""
+
+import time
+import tkinter as tk
+from tkinter import ttk
+
+
+class VirtualGrid:
+    DEFAULT_ROW_HEIGHT = 20
+    DEFAULT_HEADER_HEIGHT = 25
+
+    def __init__(self, parent):
+        self.source = None
+        self.offset = 0
+        # 当前条目实际显示的起始行号（异步数据未到达时可能落后于 offset）
+        self.shown_offset = 0
+        self.slots = []
+        self.row_height = self.DEFAULT_ROW_HEIGHT
+        self.header_height = self.DEFAULT_HEADER_HEIGHT
+        # 选中行按结果中的行号记录，滚动复用条目时据此恢复选中状态
+        self._selected_rows = set()
+        self._programmatic_selection = ()
+        # 显示前对行进行修饰的回调 (行号, 键, 行) -> (显示值, 标记)，用于叠加待提交的修改
+        self.decorate = None
+        # 追加在数据源末尾显示的行的回调 () -> [(显示值, 标记)]，用于显示待添加的记录
+        self.extra_rows = None
+        # 点击列标题的回调 (列名)，用于排序
+        self.on_heading = None
+
+        self.frame = ttk.Frame(parent)
+        self.frame.rowconfigure(0, weight=1)
+        self.frame.columnconfigure(0, weight=1)
+
+        self.tree = ttk.Treeview(self.frame, show="headings")
+        self.tree.grid(row=0, column=0, sticky=tk.NSEW)
+        self.tree.tag_configure("modified", background="#fff2cc")
+        self.tree.tag_configure("deleted", foreground="#999999", background="#f4cccc")
+        self.tree.tag_configure("inserted", background="#d9ead3")
+
+        self.v_scroll = ttk.Scrollbar(
+            self.frame, orient=tk.VERTICAL, command=self.on_scrollbar
+        )
+        self.v_scroll.grid(row=0, column=1, sticky=tk.NS)
+
+        self.h_scroll = ttk.Scrollbar(
+            self.frame, orient=tk.HORIZONTAL, command=self.tree.xview
+        )
+        self.h_scroll.grid(row=1, column=0, sticky=tk.EW)
+        self.tree.configure(xscrollcommand=self.h_scroll.set)
+
+        self.tree.bind("<Configure>", lambda event: self.refresh())
+        self.tree.bind("<<TreeviewSelect>>", self.on_select)
+        self.tree.bind("<MouseWheel>", self.on_mousewheel)
+        self.tree.bind("<Button-4>", lambda event: self.scroll_by(-3))
+        self.tree.bind("<Button-5>", lambda event: self.scroll_by(3))
+        self.tree.bind("<Up>", self.on_key_up)
+        self.tree.bind("<Down>", self.on_key_down)
+        self.tree.bind("<Prior>", lambda event: self.scroll_page(-1))
+        self.tree.bind("<Next>", lambda event: self.scroll_page(1))
+        self.tree.bind("<Control-Home>", lambda event: self.scroll_to(0))
+        self.tree.bind("<Control-End>", lambda event: self.scroll_to(self.row_count()))
+
+    def set_source(self, columns, source):
+        """设置新的数据源并显示第一屏"""
+        self.clear()
+        self.source = source
+        # 异步数据源在页面到达后通知刷新
+        if getattr(source, "on_ready", False) is None:
+            source.on_ready = self.refresh
+        self.tree["columns"] = columns
+        for col in columns:
+            self.tree.heading(
+                col, text=col, command=lambda name=col: self.heading_clicked(name)
+            )
+            self.tree.column(col, width=100)
+        self.refresh()
+
+    def heading_clicked(self, column):
+        if self.on_heading is not None:
+            self.on_heading(column)
+
+    def set_sort_marks(self, order_by):
+        """在列标题上用 ▲/▼ 标出排序列和方向，order_by 为 (列名, 是否降序)"""
+        marks = {
+            column: " ▼" if descending else " ▲" for column, descending in order_by
+        }
+        for col in self.tree["columns"]:
+            self.tree.heading(col, text=col + marks.get(col, ""))
+
+    def clear(self):
+        """清空表格并关闭数据源"""
+        if self.source is not None:
+            self.source.close()
+            self.source = None
+        for item in self.slots:
+            self.tree.delete(item)
+        self.slots = []
+        self.offset = 0
+        self.shown_offset = 0
+        self._selected_rows = set()
+        self.tree["columns"] = ()
+        self.v_scroll.set(0, 1)
+
+    def row_count(self):
+        if self.source is None:
+            return 0
+        return self.source.row_count() + len(self.pending_rows())
+
+    def pending_rows(self):
+        return self.extra_rows() if self.extra_rows is not None else []
+
+    def source_index(self, index):
+        """第 index 行是否来自数据源（而不是追加显示的行）"""
+        return index < self.source.row_count()
+
+    def visible_count(self):
+        """根据控件高度计算能完整显示的行数"""
+        if self.slots:
+            bbox = self.tree.bbox(self.slots[0])
+            if bbox:
+                self.header_height = bbox[1]
+                self.row_height = bbox[3] or self.row_height
+        height = self.tree.winfo_height()
+        if height <= 1:
+            height = (
+                int(self.tree.cget("height")) * self.row_height + self.header_height
+            )
+        return max(1, (height - self.header_height) // self.row_height)
+
+    def refresh(self):
+        """按当前偏移重新填充可见条目"""
+        if self.source is None:
+            return
+        extra = self.pending_rows()
+        source_total = self.source.row_count()
+        total = source_total + len(extra)
+        visible = self.visible_count()
+        self.offset = max(0, min(self.offset, total - visible))
+        rows = []
+        if self.offset < source_total:
+            rows = self.source.fetch(self.offset, visible)
+            if rows is None:
+                # 页面尚在后台读取，保留当前内容，到达后会再次刷新
+                return
+
+        started = time.perf_counter()
+        entries = []
+        for index, row in enumerate(rows):
+            tags = ()
+            if self.decorate is not None:
+                row_index = self.offset + index
+                row, tags = self.decorate(row_index, self.source.key_at(row_index), row)
+            entries.append((row, tags))
+        # 读到数据源末尾后接着显示追加的行
+        if self.offset + len(rows) >= source_total:
+            start = max(0, self.offset - source_total)
+            entries.extend(extra[start : start + visible - len(rows)])
+        rows = [row for row, _ in entries]
+
+        while len(self.slots) > len(entries):
+            self.tree.delete(self.slots.pop())
+        for index, (row, tags) in enumerate(entries):
+            if index < len(self.slots):
+                self.tree.item(self.slots[index], values=row, tags=tags)
+            else:
+                self.slots.append(self.tree.insert("", tk.END, values=row, tags=tags))
+        self.shown_offset = self.offset
+        if self.source.profiler is not None:
+            self.source.profiler.add_render(len(rows), time.perf_counter() - started)
+
+        selected = [
+            item
+            for index, item in enumerate(self.slots)
+            if self.offset + index in self._selected_rows
+        ]
+        if tuple(self.tree.selection()) != tuple(selected):
+            self._programmatic_selection = tuple(selected)
+            self.tree.selection_set(selected)
+
+        if total:
+            self.v_scroll.set(self.offset / total, (self.offset + len(rows)) / total)
+        else:
+            self.v_scroll.set(0, 1)
+
+    def scroll_to(self, offset):
+        offset = max(0, min(int(offset), self.row_count() - self.visible_count()))
+        if offset != self.offset:
+            self.offset = offset
+            self.refresh()
+        return "break"
+
+    def show_index(self, index):
+        """选中第 index 行并滚动到使其显示在可见区域中部"""
+        self._selected_rows = {index}
+        self.offset = max(0, index - self.visible_count() // 2)
+        self.refresh()
+
+    def scroll_by(self, rows):
+        return self.scroll_to(self.offset + rows)
+
+    def scroll_page(self, pages):
+        return self.scroll_by(pages * max(1, self.visible_count() - 1))
+
+    def on_scrollbar(self, *args):
+        """纵向滚动条回调"""
+        if args[0] == "moveto":
+            self.scroll_to(float(args[1]) * self.row_count())
+        elif args[0] == "scroll":
+            amount = int(args[1])
+            if args[2] == "pages":
+                self.scroll_page(amount)
+            else:
+                self.scroll_by(amount)
+
+    def on_mousewheel(self, event):
+        if abs(event.delta) >= 120:
+            steps = -event.delta // 120
+        else:
+            steps = -1 if event.delta > 0 else 1
+        return self.scroll_by(steps * 3)
+
+    def on_key_up(self, event):
+        focus = self.tree.focus()
+        if self.slots and focus == self.slots[0] and self.offset > 0:
+            self.scroll_by(-1)
+            self.tree.focus(self.slots[0])
+            self._select_focused()
+            return "break"
+
+    def on_key_down(self, event):
+        focus = self.tree.focus()
+        if self.slots and focus == self.slots[-1]:
+            self.scroll_by(1)
+            self.tree.focus(self.slots[-1])
+            self._select_focused()
+            return "break"
+
+    def _select_focused(self):
+        focus = self.tree.focus()
+        if focus in self.slots:
+            self._selected_rows = {self.shown_offset + self.slots.index(focus)}
+            self.refresh()
+
+    def on_select(self, event):
+        """记录用户选中的行号"""
+        selection = tuple(self.tree.selection())
+        if selection == self._programmatic_selection:
+            return
+        self._programmatic_selection = ()
+        self._selected_rows = {
+            self.shown_offset + self.slots.index(item)
+            for item in selection
+            if item in self.slots
+        }
+
+    def clear_selection(self):
+        self._selected_rows = set()
+        self.refresh()
+
+    def selected_indexes(self):
+        """选中行在结果中的行号（升序）"""
+        return sorted(self._selected_rows)
+
+    def selected_rows(self):
+        """选中行的原始值（未经Treeview转换为字符串）"""
+        if self.source is None:
+            return []
+        rows = []
+        for index in self.selected_indexes():
+            if self.source_index(index):
+                rows.extend(self.source.fetch(index, 1) or [])
+        return rows
+
+    def selected_keys(self):
+        """选中行的键（rowid 或主键值），数据源没有键时为 None"""
+        if self.source is None:
+            return []
+        return [
+            self.source.key_at(index)
+            for index in self.selected_indexes()
+            if self.source_index(index)
+        ]
+
+    def selected_items(self):
+        """已读取的选中行，每项为 (行号, 键, 原始值)，追加显示的行不在其中"""
+        if self.source is None:
+            return []
+        items = []
+        for index in self.selected_indexes():
+            if not self.source_index(index):
+                continue
+            rows = self.source.fetch(index, 1)
+            if rows:
+                items.append((index, self.source.key_at(index), rows[0]))
+        return items
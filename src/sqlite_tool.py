@@ -5,18 +5,25 @@ SQLite3 桌面工具
 - 查看数据库结构
 - 查询和修改数据
 - 执行SQL语句
+- 全文检索所有表
 """
 
 import tkinter as tk
-from tkinter import ttk, filedialog, messagebox
+from tkinter import ttk, filedialog, messagebox, simpledialog
 import os
 from datetime import datetime
-from src.utils import SQLiteUtils
-from src.utils import export_db_to_csv, export_db_to_xlsx
-from src.gui import StructureTab, QueryTab, SQLTab
+from src.utils import SQLiteUtils, PERFORMANCE_PROFILES
+from src.utils import export_db_to_csv, export_db_to_xlsx, export_db_to_columnar
+from src.utils import import_csv
+from src.gui import StructureTab, QueryTab, SQLTab, SearchTab, ProfileTab
 
 
 class SQLiteTool:
+    # 后台查询结果的轮询间隔（毫秒）
+    POLL_INTERVAL_MS = 50
+    # 并行导出最多使用的进程数
+    EXPORT_MAX_WORKERS = 4
+
     def __init__(self, root):
         self.root = root
         self.root.title("SQLite3 工具")
@@ -24,10 +31,15 @@ class SQLiteTool:
 
         # 逻辑层
         self.logic = SQLiteUtils()
+        # 表列表对应的 (结构目录, schema_version)
+        self.shown_schema = None
 
         # 创建界面
         self.setup_ui()
 
+        # 定时取回后台查询结果
+        self.poll_worker()
+
     def setup_ui(self):
         # 菜单栏
         self.create_menu()
@@ -49,6 +61,10 @@ class SQLiteTool:
         self.sql_tab = SQLTab(
             notebook, self.logic, self.update_status, self.refresh_database_structure
         )
+        self.search_tab = SearchTab(
+            notebook, self.logic, self.update_status, self.query_tab.show_row
+        )
+        self.profile_tab = ProfileTab(notebook, self.logic, self.update_status)
 
         # 状态栏
         self.create_status_bar(main_frame)
@@ -59,6 +75,31 @@ class SQLiteTool:
         # 只显示当前数据库信息
         self.db_info_label = ttk.Label(toolbar, text="未连接数据库")
         self.db_info_label.pack(side=tk.LEFT, padx=(0, 10))
+        self.update_db_info()
+
+    def update_db_info(self):
+        """
+        在工具栏显示当前数据库、性能配置和文件实际的日志模式。
+        打开数据库时只应用配置中的连接级设置，日志模式保持文件原样，因此单独显示
+        """
+        if not self.logic.current_db_path:
+            self.db_info_label.config(text="未连接数据库")
+            return
+        self.db_info_label.config(
+            text=f"当前数据库: {os.path.basename(self.logic.current_db_path)} | "
+            f"性能配置: {self.logic.profile} | 日志模式: {self.logic.journal_mode()}"
+        )
+
+    def change_profile(self):
+        """切换性能配置"""
+        try:
+            self.logic.apply_profile(self.profile_var.get())
+            self.update_db_info()
+            self.update_status(f"已切换性能配置: {self.logic.profile}")
+        except Exception as e:
+            # 切换失败时配置保持不变，菜单中的选中项随之恢复
+            self.profile_var.set(self.logic.profile)
+            messagebox.showerror("错误", f"切换性能配置失败: {str(e)}")
 
     def create_menu(self):
         menubar = tk.Menu(self.root)
@@ -68,11 +109,73 @@ class SQLiteTool:
         file_menu.add_command(label="导入数据库", command=self.import_database)
         file_menu.add_command(label="导出数据库", command=self.export_database)
         file_menu.add_separator()
+        file_menu.add_command(label="导入CSV/TSV", command=self.import_csv)
         file_menu.add_command(label="导出为CSV", command=self.export_csv)
         file_menu.add_command(label="导出为XLSX", command=self.export_xlsx)
+        file_menu.add_command(
+            label="导出为Parquet", command=lambda: self.export_columnar("parquet")
+        )
+        file_menu.add_command(
+            label="导出为Arrow IPC", command=lambda: self.export_columnar("arrow")
+        )
+        self.parallel_export_var = tk.BooleanVar(value=False)
+        file_menu.add_checkbutton(
+            label="多进程并行导出", variable=self.parallel_export_var
+        )
+        file_menu.add_separator()
+        profile_menu = tk.Menu(file_menu, tearoff=0)
+        self.profile_var = tk.StringVar(value=self.logic.profile)
+        for profile in PERFORMANCE_PROFILES:
+            profile_menu.add_radiobutton(
+                label=profile,
+                value=profile,
+                variable=self.profile_var,
+                command=self.change_profile,
+            )
+        file_menu.add_cascade(label="性能配置", menu=profile_menu)
         menubar.add_cascade(label="文件", menu=file_menu)
         self.root.config(menu=menubar)
 
+    def import_csv(self):
+        if not self.logic.conn:
+            messagebox.showwarning("警告", "请先打开一个数据库")
+            return
+        file_path = filedialog.askopenfilename(
+            title="选择要导入的CSV/TSV文件",
+            filetypes=[
+                ("CSV文件", "*.csv"),
+                ("TSV文件", "*.tsv"),
+                ("所有文件", "*.*"),
+            ],
+        )
+        if not file_path:
+            return
+        table_name = simpledialog.askstring(
+            "导入CSV",
+            "导入到表（已存在时追加数据）:",
+            initialvalue=os.path.splitext(os.path.basename(file_path))[0],
+            parent=self.root,
+        )
+        if not table_name:
+            return
+
+        def progress(rows):
+            self.update_status(f"正在导入: 已写入 {rows} 行")
+            self.root.update_idletasks()
+
+        try:
+            self.logic.release_sources()
+            stats = import_csv(
+                self.logic.conn, file_path, table_name, progress=progress
+            )
+            self.refresh_database_structure()
+            self.update_status(
+                f"已导入 {stats['rows']} 行到表 {stats['table']}，"
+                f"{stats['rows_per_second']:.0f} 行/秒"
+            )
+        except Exception as e:
+            messagebox.showerror("错误", f"导入CSV失败: {str(e)}")
+
     def export_csv(self):
         if not self.logic.current_db_path:
             messagebox.showwarning("警告", "请先打开一个数据库")
@@ -83,14 +186,13 @@ class SQLiteTool:
         output_dir = filedialog.askdirectory(title="选择导出CSV的文件夹")
         if not output_dir:
             return
-        try:
-            export_db_to_csv(db_path, os.path.join(output_dir, db_name))
-            self.update_status(f"已导出为CSV: {os.path.join(output_dir, db_name)}")
-            messagebox.showinfo(
-                "成功", f"已导出为CSV: {os.path.join(output_dir, db_name)}"
-            )
-        except Exception as e:
-            messagebox.showerror("错误", f"导出CSV失败: {str(e)}")
+        output_dir = os.path.join(output_dir, db_name)
+        workers = self.export_workers()
+        self.run_export(
+            "CSV",
+            lambda: export_db_to_csv(db_path, output_dir, workers=workers),
+            f"已导出为CSV: {output_dir}",
+        )
 
     def export_xlsx(self):
         if not self.logic.current_db_path:
@@ -107,12 +209,58 @@ class SQLiteTool:
         )
         if not output_path:
             return
+        workers = self.export_workers()
+        self.run_export(
+            "XLSX",
+            lambda: export_db_to_xlsx(db_path, output_path, workers=workers),
+            f"已导出为XLSX: {output_path}",
+        )
+
+    def export_columnar(self, file_format):
+        if not self.logic.current_db_path:
+            messagebox.showwarning("警告", "请先打开一个数据库")
+            return
+        db_path = self.logic.current_db_path
+
+        db_name = os.path.splitext(os.path.basename(db_path))[0]
+        output_dir = filedialog.askdirectory(title=f"选择导出{file_format}的文件夹")
+        if not output_dir:
+            return
+        output_dir = os.path.join(output_dir, db_name)
+        self.run_export(
+            file_format,
+            lambda: export_db_to_columnar(db_path, output_dir, file_format),
+            f"已导出为{file_format}: {output_dir}",
+        )
+
+    def run_export(self, label, export, message):
+        """
+        在统计线程中执行导出，界面在导出期间保持响应。
+        完成或失败后由 poll_worker 回到界面线程，在状态栏和对话框中报告
+        """
+
+        def done(stats):
+            self.update_status(
+                f"{message}，共 {stats['rows']} 行，{stats['rows_per_second']:.0f} 行/秒"
+            )
+            messagebox.showinfo("成功", message)
+
+        def failed(e):
+            self.update_status(f"导出{label}失败")
+            messagebox.showerror("错误", f"导出{label}失败: {str(e)}")
+
         try:
-            export_db_to_xlsx(db_path, output_path)
-            self.update_status(f"已导出为XLSX: {output_path}")
-            messagebox.showinfo("成功", f"已导出为XLSX: {output_path}")
+            self.logic.get_stats_worker().submit(lambda logic: export(), done, failed)
         except Exception as e:
-            messagebox.showerror("错误", f"导出XLSX失败: {str(e)}")
+            failed(e)
+            return
+        self.update_status(f"正在导出{label}...")
+
+    def export_workers(self):
+        """导出使用的进程数：最多 EXPORT_MAX_WORKERS 个，并给界面留出一个核心"""
+        if self.parallel_export_var.get():
+            return max(1, min(self.EXPORT_MAX_WORKERS, (os.cpu_count() or 1) - 1))
+        return 1
 
     def create_status_bar(self, parent):
         self.status_bar = ttk.Label(parent, text="就绪", relief=tk.SUNKEN)
@@ -123,6 +271,21 @@ class SQLiteTool:
             text=f"{datetime.now().strftime('%H:%M:%S')} - {message}"
         )
 
+    def poll_worker(self):
+        """执行后台任务的回调，并在状态栏显示正在运行查询的进度"""
+        worker = self.logic.worker
+        if worker is not None:
+            worker.poll()
+            progress = worker.progress()
+            if progress is not None:
+                elapsed, steps = progress
+                self.update_status(
+                    f"正在执行... 已用时 {elapsed:.1f} 秒，虚拟机步数 {steps}"
+                )
+        if self.logic.stats_worker is not None:
+            self.logic.stats_worker.poll()
+        self.root.after(self.POLL_INTERVAL_MS, self.poll_worker)
+
     def create_database(self):
         file_path = filedialog.asksaveasfilename(
             title="新建数据库",
@@ -136,9 +299,7 @@ class SQLiteTool:
         if file_path:
             try:
                 self.logic.create_database(file_path)
-                self.db_info_label.config(
-                    text=f"当前数据库: {os.path.basename(file_path)}"
-                )
+                self.update_db_info()
                 self.refresh_database_structure()
                 self.update_status(f"已创建数据库: {os.path.basename(file_path)}")
             except Exception as e:
@@ -156,9 +317,7 @@ class SQLiteTool:
         if file_path:
             try:
                 self.logic.open_database_file(file_path)
-                self.db_info_label.config(
-                    text=f"当前数据库: {os.path.basename(file_path)}"
-                )
+                self.update_db_info()
                 self.refresh_database_structure()
                 self.update_status(f"已打开数据库: {os.path.basename(file_path)}")
             except Exception as e:
@@ -185,10 +344,10 @@ class SQLiteTool:
             )
             if target_file:
                 try:
-                    self.logic.import_database(source_file, target_file)
-                    self.db_info_label.config(
-                        text=f"当前数据库: {os.path.basename(target_file)}"
+                    self.logic.import_database(
+                        source_file, target_file, progress=self.backup_progress
                     )
+                    self.update_db_info()
                     self.refresh_database_structure()
                     self.update_status(f"已导入数据库: {os.path.basename(target_file)}")
                 except Exception as e:
@@ -209,23 +368,34 @@ class SQLiteTool:
         )
         if target_file:
             try:
-                self.logic.export_database(target_file)
+                self.logic.export_database(target_file, progress=self.backup_progress)
                 self.update_status(f"已导出数据库: {os.path.basename(target_file)}")
             except Exception as e:
                 messagebox.showerror("错误", f"导出数据库失败: {str(e)}")
 
+    def backup_progress(self, status, remaining, total):
+        """在线备份的进度回调，在状态栏显示已复制的页数"""
+        self.update_status(f"正在复制数据库: {total - remaining}/{total} 页")
+        self.root.update_idletasks()
+
     def refresh_database_structure(self):
         """刷新数据库结构，通知所有标签页更新"""
         try:
+            # 更新查询标签页的数据库连接
+            if hasattr(self.logic, "conn"):
+                self.query_tab.set_conn(self.logic.conn)
+
+            # 连接（目录对象随每次打开新建）和 schema_version 都未变化时表列表不变，无需重新填充
+            shown = (self.logic.catalog, self.logic.schema_version())
+            if shown == self.shown_schema:
+                return
             tables = self.logic.get_tables()
 
             # 通知各个标签页更新表列表
             self.structure_tab.refresh_tables(tables)
             self.query_tab.refresh_tables(tables)
-
-            # 更新查询标签页的数据库连接
-            if hasattr(self.logic, "conn"):
-                self.query_tab.set_conn(self.logic.conn)
+            self.search_tab.refresh_tables(tables)
+            self.shown_schema = shown
 
             self.update_status(f"已加载 {len(tables)} 个表")
         except Exception as e:
@@ -1,2 +1,33 @@
-from .export_utils import export_db_to_csv, export_db_to_xlsx
-from .sqlite_utils import SQLiteUtils
+from .sqlite_utils import SQLiteUtils, PERFORMANCE_PROFILES
+from .schema_catalog import SchemaCatalog
+from .change_buffer import ChangeBuffer
+from .script_runner import split_statements, run_script, ScriptError
+from .result_cache import ResultCache
+from .result_set import ResultSet
+from .query_plan import explain_query_plan, suggest_indexes
+from .profiler import Profiler
+from .table_query import TableQuery, FILTER_OPERATORS, NO_VALUE_OPERATORS
+from .table_stats import TableStats, estimate_row_count, table_sizes, format_size
+from .search_index import SearchIndex
+from .column_profile import profile_table, HyperLogLog
+from .row_source import RowSource, ListRowSource, QueryRowSource, TableRowSource
+from .query_worker import QueryWorker, AsyncRowSource, open_async_source
+from .import_utils import import_csv
+
+# 导出函数在第一次访问时才导入 export_utils，导入本包时不加载导出相关的依赖
+_LAZY_EXPORTS = {
+    "export_db_to_csv": ".export_utils",
+    "export_db_to_xlsx": ".export_utils",
+    "export_db_to_columnar": ".export_utils",
+}
+
+
+def __getattr__(name):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+
+    value = getattr(import_module(module, __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,69 @@
+"""
+待提交修改缓冲区
+批量编辑时先记录添加、修改、删除，提交时由 SQLiteUtils.apply_changes 在一个事务中执行
+"""
+
+from typing import Optional, List, Dict, Any, Tuple
+
+
+class ChangeBuffer:
+    def __init__(self, table_name: str, columns: List[str]):
+        self.table_name = table_name
+        self.columns = columns
+        # 待添加的记录：列名 -> 值
+        self.inserts: List[Dict[str, Any]] = []
+        # 待修改的记录：键 -> {列名: 新值}，同一行的多次修改会合并
+        self.updates: Dict[tuple, Dict[str, Any]] = {}
+        # 待删除的记录的键
+        self.deletes: set = set()
+        # 键 -> 该行在结果中的行号，提交后据此决定从哪一页开始重新读取
+        self.indexes: Dict[tuple, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.inserts) + len(self.updates) + len(self.deletes)
+
+    def add_insert(self, values: Dict[str, Any]):
+        self.inserts.append(values)
+
+    def add_update(self, key: tuple, index: int, values: Dict[str, Any]):
+        if key in self.deletes:
+            return
+        self.updates.setdefault(key, {}).update(values)
+        self.indexes[key] = index
+
+    def add_delete(self, key: tuple, index: int):
+        self.updates.pop(key, None)
+        self.deletes.add(key)
+        self.indexes[key] = index
+
+    def clear(self):
+        self.inserts = []
+        self.updates = {}
+        self.deletes = set()
+        self.indexes = {}
+
+    def first_index(self, keys) -> Optional[int]:
+        """给定键中行号最小的一个"""
+        indexes = [self.indexes[key] for key in keys if key in self.indexes]
+        return min(indexes) if indexes else None
+
+    def summary(self) -> str:
+        return (
+            f"待添加 {len(self.inserts)} 条，待修改 {len(self.updates)} 条，"
+            f"待删除 {len(self.deletes)} 条"
+        )
+
+    def patch(self, key: Optional[tuple], row: tuple) -> Tuple[tuple, Tuple[str, ...]]:
+        """返回叠加待提交修改后的显示值和标记（modified/deleted）"""
+        if key is None:
+            return row, ()
+        if key in self.deletes:
+            return row, ("deleted",)
+        changes = self.updates.get(key)
+        if not changes:
+            return row, ()
+        patched = tuple(
+            changes[name] if name in changes else value
+            for name, value in zip(self.columns, row)
+        )
+        return patched, ("modified",)
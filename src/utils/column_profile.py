@@ -0,0 +1,195 @@
+"""
+列数据概况
+一次流式扫描整张表，同时统计每列的空值数、不同值个数、最小值和最大值、
+最常见的值、存储类型和文本长度分布。数据按批读取后逐列处理，不必每列各执行一次查询
+"""
+
+import math
+import sqlite3
+import time
+from collections import Counter
+from typing import Optional, List, Dict, Any, Iterable, Union
+from .sql_helpers import quote_identifier
+
+# HyperLogLog 的精度：2^12 个寄存器，标准误差约 1.6%
+HLL_PRECISION = 12
+
+# 不同值个数不超过此数时精确计数；超过后个数改用 HyperLogLog 估算，常见值改为近似统计
+EXACT_DISTINCT_LIMIT = 10000
+
+# 超过上限后保留计数最多的值的个数
+TOP_CANDIDATES = 1000
+
+# 结果中列出的常见值个数
+TOP_K = 5
+
+# 每批读取的行数
+PROFILE_BATCH_SIZE = 5000
+
+_MASK64 = (1 << 64) - 1
+
+# Python 类型 -> SQLite 存储类型
+_STORAGE_CLASSES = {int: "integer", float: "real", str: "text", bytes: "blob"}
+
+
+class HyperLogLog:
+    """
+    HyperLogLog 基数估算，内存固定为 2^precision 字节。
+    只接受文本和BLOB：它们的 hash() 为 SipHash，分布均匀，不必在Python中再混合；
+    整数的 hash() 是其本身，应先转换为文本。hash() 每次启动不同，结果只在本进程内有效
+    """
+
+    def __init__(self, precision: int = HLL_PRECISION):
+        self.precision = precision
+        self.registers = bytearray(1 << precision)
+
+    def update(self, values: Iterable[Union[str, bytes]]):
+        registers = self.registers
+        shift = 64 - self.precision
+        mask = (1 << shift) - 1
+        for z in map(hash, values):
+            z &= _MASK64
+            index = z >> shift
+            rank = shift - (z & mask).bit_length() + 1
+            if rank > registers[index]:
+                registers[index] = rank
+
+    def count(self) -> int:
+        registers = self.registers
+        m = len(registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0**-rank for rank in registers)
+        zeros = registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # 基数较小时改用线性计数
+            estimate = m * math.log(m / zeros)
+        return int(round(estimate))
+
+
+def _as_text(values: Iterable[Any]) -> Iterable[Union[str, bytes]]:
+    """供 HyperLogLog 使用的文本形式（整数 1 与文本 '1' 因此被视为同一个值）"""
+    return (
+        value if type(value) is str or type(value) is bytes else repr(value)
+        for value in values
+    )
+
+
+def length_bucket_label(bucket: int) -> str:
+    """长度分布按2的幂分桶：桶 b 包含长度 2^(b-1) 到 2^b - 1"""
+    if bucket <= 1:
+        return str(bucket)
+    return f"{1 << (bucket - 1)}-{(1 << bucket) - 1}"
+
+
+class ColumnProfile:
+    """单列的统计量，按批累积"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.nulls = 0
+        self.types: Counter = Counter()
+        # 各存储类型的最小值和最大值，不同类型之间按SQLite的规则比较
+        self.minimums: Dict[str, Any] = {}
+        self.maximums: Dict[str, Any] = {}
+        # 文本和BLOB的长度分布（桶号 -> 个数）
+        self.lengths: Counter = Counter()
+        self.values: Counter = Counter()
+        # 不同值过多后改用 HyperLogLog，values 只保留计数最多的值
+        self.hll: Optional[HyperLogLog] = None
+
+    def add_batch(self, values: tuple):
+        present = [value for value in values if value is not None]
+        self.nulls += len(values) - len(present)
+        if not present:
+            return
+        types = Counter(map(type, present))
+        for kind, count in types.items():
+            storage = _STORAGE_CLASSES.get(kind, "text")
+            self.types[storage] += count
+            same = (
+                present
+                if len(types) == 1
+                else [value for value in present if type(value) is kind]
+            )
+            low, high = min(same), max(same)
+            if storage not in self.minimums or low < self.minimums[storage]:
+                self.minimums[storage] = low
+            if storage not in self.maximums or high > self.maximums[storage]:
+                self.maximums[storage] = high
+            if kind is str or kind is bytes:
+                self.lengths.update(map(int.bit_length, map(len, same)))
+                if self.hll is not None:
+                    self.hll.update(same)
+            elif self.hll is not None:
+                self.hll.update(map(repr, same))
+
+        self.values.update(present)
+        if len(self.values) > EXACT_DISTINCT_LIMIT:
+            if self.hll is None:
+                self.hll = HyperLogLog()
+                self.hll.update(_as_text(self.values))
+            self.values = Counter(dict(self.values.most_common(TOP_CANDIDATES)))
+
+    def _extreme(self, extremes: Dict[str, Any], order: tuple) -> Any:
+        # 整数和实数同属数值，比较大小时合并
+        numbers = [extremes[kind] for kind in ("integer", "real") if kind in extremes]
+        merged = dict(extremes)
+        if numbers:
+            merged["number"] = (min if order[0] == "number" else max)(numbers)
+        for kind in order:
+            if kind in merged:
+                return merged[kind]
+        return None
+
+    def result(self, rows: int) -> Dict[str, Any]:
+        exact = self.hll is None
+        return {
+            "name": self.name,
+            "nulls": self.nulls,
+            "null_ratio": self.nulls / rows if rows else 0.0,
+            "distinct": len(self.values) if exact else self.hll.count(),
+            "exact": exact,
+            # SQLite 的排序：数值 < 文本 < BLOB
+            "min": self._extreme(self.minimums, ("number", "text", "blob")),
+            "max": self._extreme(self.maximums, ("blob", "text", "number")),
+            "top": self.values.most_common(TOP_K),
+            "types": dict(self.types),
+            "lengths": {
+                length_bucket_label(bucket): count
+                for bucket, count in sorted(self.lengths.items())
+            },
+        }
+
+
+def profile_table(
+    conn: sqlite3.Connection, table_name: str, columns: Optional[List[str]] = None
+) -> Dict[str, Any]:
+    """
+    扫描一次表，返回 {table, rows, seconds, columns}，columns 中每列为
+    {name, nulls, null_ratio, distinct, exact, min, max, top, types, lengths}。
+    exact 为 False 时 distinct 是 HyperLogLog 估算值，top 的计数为近似值
+    """
+    started = time.perf_counter()
+    select_list = (
+        ", ".join(quote_identifier(name) for name in columns) if columns else "*"
+    )
+    cursor = conn.execute(f"SELECT {select_list} FROM {quote_identifier(table_name)}")
+    profiles = [ColumnProfile(description[0]) for description in cursor.description]
+    rows = 0
+    try:
+        while True:
+            batch = cursor.fetchmany(PROFILE_BATCH_SIZE)
+            if not batch:
+                break
+            rows += len(batch)
+            # 按列转置后整列处理，计数和比较大多在C中完成
+            for profile, values in zip(profiles, zip(*batch)):
+                profile.add_batch(values)
+    finally:
+        cursor.close()
+    return {
+        "table": table_name,
+        "rows": rows,
+        "seconds": time.perf_counter() - started,
+        "columns": [profile.result(rows) for profile in profiles],
+    }
@@ -1,47 +1,590 @@
+import collections
+import csv
+import itertools
 import os
+import re
+import shutil
 import sqlite3
-import pandas as pd
-from typing import Optional
+import time
+from typing import Optional, Dict, Any, List, Tuple
+from .sqlite_utils import connect_readonly
+from .sql_helpers import quote_identifier, cursor_batches, rowid_alias
 
+# pandas、openpyxl 和 pyarrow 导入很慢，在第一次导出时才由 _require_* 导入，
+# 导入本模块（以及启动图形界面）不会加载它们
+pd = None
+Workbook = None
+pa = None
+pq = None
 
-def export_db_to_csv(db_path: str, output_dir: Optional[str] = None):
+# 流式导出每批读取的行数，峰值内存只与它有关
+EXPORT_BATCH_SIZE = 10000
+# 导出文件的写缓冲大小
+WRITE_BUFFER_SIZE = 1024 * 1024
+# 并行导出时，rowid 跨度超过该值的表按 rowid 范围拆分为多个分块
+PARALLEL_CHUNK_ROWS = 500000
+# 每个表最多拆分的分块数，rowid 稀疏的表不会产生大量空分块
+PARALLEL_MAX_CHUNKS = 256
+
+# 列式导出每个行组（Parquet row group / Arrow record batch）的行数
+COLUMNAR_BATCH_SIZE = 65536
+
+# Excel 单个工作表的最大行数（含表头）
+EXCEL_MAX_ROWS = 1048576
+EXCEL_SHEET_NAME_LENGTH = 31
+_SHEET_NAME_INVALID = re.compile(r"[\[\]:*?/\\]")
+# xlsx 中不允许的控制字符，与 openpyxl 的 ILLEGAL_CHARACTERS_RE 相同
+_ILLEGAL_CHARACTERS = re.compile(r"[\000-\010]|[\013-\014]|[\016-\037]")
+
+# 并行导出的任务：(表名, (rowid 别名, 起始, 结束))，范围为 None 表示整表
+ExportTask = Tuple[str, Optional[Tuple[str, int, int]]]
+
+
+def _require_pandas():
+    """pandas 只用于可选的快速路径"""
+    global pd
+    if pd is None:
+        try:
+            import pandas
+        except ImportError:
+            raise ImportError("使用 pandas 导出需要先安装 pandas") from None
+        pd = pandas
+    return pd
+
+
+def _require_openpyxl():
+    global Workbook
+    if Workbook is None:
+        try:
+            from openpyxl import Workbook as workbook_class
+        except ImportError:
+            raise ImportError("导出XLSX需要先安装 openpyxl") from None
+        Workbook = workbook_class
+    return Workbook
+
+
+def _require_pyarrow():
+    """列式导出需要 pyarrow"""
+    global pa, pq
+    if pa is None:
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("列式导出需要先安装 pyarrow") from None
+        pa, pq = pyarrow, pyarrow.parquet
+    return pa
+
+
+def _export_stats(tables: int, rows: int, started: float) -> Dict[str, Any]:
+    seconds = time.perf_counter() - started
+    return {
+        "tables": tables,
+        "rows": rows,
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds > 0 else float(rows),
+    }
+
+
+def _select_chunk(
+    table: str, bounds: Optional[Tuple[str, int, int]]
+) -> Tuple[str, tuple]:
+    sql = f"SELECT * FROM {quote_identifier(table)}"
+    if bounds is None:
+        return sql, ()
+    rowid, start, stop = bounds
+    # 与整表扫描相同的 rowid 顺序，分块拼接后与串行导出一致
+    return f"{sql} WHERE {rowid} >= ? AND {rowid} < ? ORDER BY {rowid}", (start, stop)
+
+
+def _write_csv_rows(cursor: sqlite3.Cursor, f, batch_size: int, header: bool) -> int:
+    writer = csv.writer(f, lineterminator=os.linesep)
+    if header:
+        writer.writerow([description[0] for description in cursor.description])
+    rows_written = 0
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        writer.writerows(rows)
+        rows_written += len(rows)
+    return rows_written
+
+
+def write_table_csv(
+    conn: sqlite3.Connection,
+    table: str,
+    csv_path: str,
+    batch_size: int = EXPORT_BATCH_SIZE,
+) -> int:
+    """
+    以 fetchmany 分批读取表数据并直接写入csv文件，返回写入的行数。
+    """
+    cursor = conn.cursor()
+    cursor.execute(f"SELECT * FROM {quote_identifier(table)}")
+    with open(
+        csv_path, "w", encoding="utf-8-sig", newline="", buffering=WRITE_BUFFER_SIZE
+    ) as f:
+        return _write_csv_rows(cursor, f, batch_size, header=True)
+
+
+def plan_export_tasks(
+    conn: sqlite3.Connection, tables: List[str], chunk_rows: int = PARALLEL_CHUNK_ROWS
+) -> List[List[ExportTask]]:
+    """
+    为每个表生成导出任务。rowid 跨度超过 chunk_rows 的表按 rowid 范围切成
+    等宽的分块（最多 PARALLEL_MAX_CHUNKS 块），WITHOUT ROWID 表和小表作为一个整体任务。
+    只读取 min(rowid) 和 max(rowid)（各一次 b-tree 查找），不扫描表统计行数。
+    rowid、_rowid_ 和 oid 都被同名用户列占用的表也作为一个整体任务
+    """
+    plan = []
+    for table in tables:
+        name = quote_identifier(table)
+        rowid = rowid_alias(conn, table)
+        if rowid is None:
+            plan.append([(table, None)])
+            continue
+        # min 和 max 写在同一个 SELECT 中时 SQLite 不做极值优化，会扫描整表
+        low, high = conn.execute(
+            f"SELECT (SELECT min({rowid}) FROM {name}), "
+            f"(SELECT max({rowid}) FROM {name})"
+        ).fetchone()
+        if low is None or high - low < chunk_rows:
+            plan.append([(table, None)])
+            continue
+        chunks = min(-(-(high - low + 1) // chunk_rows), PARALLEL_MAX_CHUNKS)
+        step = -(-(high - low + 1) // chunks)
+        plan.append(
+            [
+                (table, (rowid, start, min(start + step, high + 1)))
+                for start in range(low, high + 1, step)
+            ]
+        )
+    return plan
+
+
+def _csv_chunk_worker(
+    db_path: str, task: ExportTask, path: str, batch_size: int, first: bool
+) -> int:
+    """并行导出进程：第一个分块带BOM和表头，后续分块只包含数据行"""
+    conn = connect_readonly(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(*_select_chunk(*task))
+        encoding = "utf-8-sig" if first else "utf-8"
+        with open(
+            path, "w", encoding=encoding, newline="", buffering=WRITE_BUFFER_SIZE
+        ) as f:
+            return _write_csv_rows(cursor, f, batch_size, header=first)
+    finally:
+        conn.close()
+
+
+def _fetch_chunk_worker(db_path: str, task: ExportTask) -> Tuple[List[str], list]:
+    """并行导出进程：读取一个分块的全部行"""
+    conn = connect_readonly(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute(*_select_chunk(*task))
+        columns = [description[0] for description in cursor.description]
+        return columns, cursor.fetchall()
+    finally:
+        conn.close()
+
+
+def _ordered_results(executor, func, arguments, window: int):
+    """按提交顺序逐个产出 func(*args) 的结果，同时最多有 window 个任务已提交未取走"""
+    pending = collections.deque()
+    for args in arguments:
+        if len(pending) >= window:
+            yield pending.popleft().result()
+        pending.append(executor.submit(func, *args))
+    while pending:
+        yield pending.popleft().result()
+
+
+def _list_tables(db_path: str) -> Tuple[List[str], List[List[ExportTask]]]:
+    conn = connect_readonly(db_path)
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+        tables = [row[0] for row in cursor.fetchall()]
+        return tables, plan_export_tasks(conn, tables)
+    finally:
+        conn.close()
+
+
+def _export_csv_parallel(
+    db_path: str, output_dir: str, batch_size: int, workers: int
+) -> Tuple[int, int]:
+    tables, plan = _list_tables(db_path)
+    total_rows = 0
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        jobs = []
+        for tasks in plan:
+            csv_path = os.path.join(output_dir, f"{tasks[0][0]}.csv")
+            if len(tasks) == 1:
+                paths = [csv_path]
+            else:
+                paths = [f"{csv_path}.part{i}" for i in range(len(tasks))]
+            futures = [
+                executor.submit(
+                    _csv_chunk_worker, db_path, task, path, batch_size, i == 0
+                )
+                for i, (task, path) in enumerate(zip(tasks, paths))
+            ]
+            jobs.append((csv_path, paths, futures))
+        # 按表和分块的固定顺序拼接，输出与串行导出逐字节相同
+        for csv_path, paths, futures in jobs:
+            total_rows += sum(future.result() for future in futures)
+            if len(paths) == 1:
+                continue
+            with open(csv_path, "wb") as out:
+                for path in paths:
+                    with open(path, "rb") as part:
+                        shutil.copyfileobj(part, out, WRITE_BUFFER_SIZE)
+                    os.remove(path)
+    return len(tables), total_rows
+
+
+def export_db_to_csv(
+    db_path: str,
+    output_dir: Optional[str] = None,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    engine: str = "stream",
+    workers: int = 1,
+) -> Dict[str, Any]:
     """
     将数据库中所有表导出为csv文件，输出到以数据库名为名的文件夹下。
+    默认流式写出，内存占用只取决于 batch_size；engine="pandas" 时使用 pandas 整表读写。
+    workers 大于1时以多进程并行导出各表及大表的分块。
+    返回导出的表数、行数、耗时和每秒行数。
     """
     if not os.path.exists(db_path):
         raise FileNotFoundError(f"数据库文件不存在: {db_path}")
+    if engine == "pandas":
+        _require_pandas()
     db_name = os.path.splitext(os.path.basename(db_path))[0]
     output_dir = output_dir or db_name
     os.makedirs(output_dir, exist_ok=True)
-    conn = sqlite3.connect(db_path)
+    started = time.perf_counter()
+    if workers > 1 and engine != "pandas":
+        table_count, total_rows = _export_csv_parallel(
+            db_path, output_dir, batch_size, workers
+        )
+        return _export_stats(table_count, total_rows, started)
+    total_rows = 0
+    conn = connect_readonly(db_path)
     try:
         cursor = conn.cursor()
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
         tables = [row[0] for row in cursor.fetchall()]
         for table in tables:
-            df = pd.read_sql_query(f'SELECT * FROM "{table}"', conn)
             csv_path = os.path.join(output_dir, f"{table}.csv")
-            df.to_csv(csv_path, index=False, encoding="utf-8-sig")
+            if engine == "pandas":
+                df = pd.read_sql_query(f"SELECT * FROM {quote_identifier(table)}", conn)
+                df.to_csv(csv_path, index=False, encoding="utf-8-sig")
+                total_rows += len(df)
+            else:
+                total_rows += write_table_csv(conn, table, csv_path, batch_size)
     finally:
         conn.close()
+    return _export_stats(len(tables), total_rows, started)
+
+
+def sanitize_sheet_name(name: str, used: set, suffix: str = "") -> str:
+    """
+    生成合法且不重复的工作表名：替换 []:*?/\\ 等非法字符，
+    截断到31个字符（保留 suffix），与已用名称（不区分大小写）冲突时追加序号。
+    """
+    base = _SHEET_NAME_INVALID.sub("_", name).strip("'") or "Sheet"
+    candidate = base[: EXCEL_SHEET_NAME_LENGTH - len(suffix)] + suffix
+    number = 2
+    while candidate.lower() in used:
+        extra = f"{suffix}~{number}"
+        candidate = base[: EXCEL_SHEET_NAME_LENGTH - len(extra)] + extra
+        number += 1
+    used.add(candidate.lower())
+    return candidate
+
+
+def _excel_value(value):
+    if isinstance(value, str):
+        return _ILLEGAL_CHARACTERS.sub("", value)
+    if isinstance(value, bytes):
+        return str(value)
+    return value
 
 
-def export_db_to_xlsx(db_path: str, output_path: Optional[str] = None):
+def _excel_row(row):
+    for value in row:
+        if isinstance(value, (str, bytes)):
+            return [_excel_value(value) for value in row]
+    return row
+
+
+def write_table_sheets(
+    workbook, table: str, columns: List[str], batches, used: set
+) -> int:
+    """
+    把分批到达的行流式写入 write-only 工作簿。超过 Excel 行数上限时
+    续写到 “表名_2”、“表名_3” 等新工作表，每个工作表都带表头。返回写入的行数。
+    """
+    sheet = None
+    sheet_rows = EXCEL_MAX_ROWS
+    sheet_count = 0
+    rows_written = 0
+    for batch in batches:
+        for row in batch:
+            if sheet_rows >= EXCEL_MAX_ROWS:
+                sheet_count += 1
+                suffix = f"_{sheet_count}" if sheet_count > 1 else ""
+                sheet = workbook.create_sheet(sanitize_sheet_name(table, used, suffix))
+                sheet.append(columns)
+                sheet_rows = 1
+            sheet.append(_excel_row(row))
+            sheet_rows += 1
+        rows_written += len(batch)
+    if sheet is None:
+        workbook.create_sheet(sanitize_sheet_name(table, used)).append(columns)
+    return rows_written
+
+
+def export_db_to_xlsx(
+    db_path: str,
+    output_path: Optional[str] = None,
+    workers: int = 1,
+    batch_size: int = EXPORT_BATCH_SIZE,
+    engine: str = "stream",
+) -> Dict[str, Any]:
     """
     将数据库中所有表导出为一个xlsx文件，每个表为一个sheet。
+    默认使用 openpyxl 的 write-only 模式从游标流式写出，内存占用恒定；
+    超过 Excel 行数上限的表拆分到多个工作表，工作表名会被清理为合法名称。
+    workers 大于1时由多个进程并行读取各表及其分块，再按固定顺序写入工作簿。
+    engine="pandas" 时使用 pandas 整表读写。返回导出的表数、行数、耗时和每秒行数。
     """
     if not os.path.exists(db_path):
         raise FileNotFoundError(f"数据库文件不存在: {db_path}")
+    if engine == "pandas":
+        _require_pandas()
+    _require_openpyxl()
     db_name = os.path.splitext(os.path.basename(db_path))[0]
     output_path = output_path or f"{db_name}.xlsx"
-    conn = sqlite3.connect(db_path)
+    started = time.perf_counter()
+    total_rows = 0
+    used_names: set = set()
+
+    if engine == "pandas":
+        conn = connect_readonly(db_path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+            tables = [row[0] for row in cursor.fetchall()]
+            with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
+                for table in tables:
+                    df = pd.read_sql_query(
+                        f"SELECT * FROM {quote_identifier(table)}", conn
+                    )
+                    df.to_excel(
+                        writer,
+                        sheet_name=sanitize_sheet_name(table, used_names),
+                        index=False,
+                    )
+                    total_rows += len(df)
+        finally:
+            conn.close()
+        return _export_stats(len(tables), total_rows, started)
+
+    workbook = Workbook(write_only=True)
+    if workers > 1:
+        tables, plan = _list_tables(db_path)
+        from concurrent.futures import ProcessPoolExecutor
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            # 分块按表和 rowid 顺序依次读取和写入，同时最多有 workers * 2 个分块
+            # 在读取或等待写入，内存占用不随表的大小增长
+            chunks = _ordered_results(
+                executor,
+                _fetch_chunk_worker,
+                ((db_path, task) for tasks in plan for task in tasks),
+                workers * 2,
+            )
+            for table, tasks in zip(tables, plan):
+                columns, first_chunk = next(chunks)
+                batches = itertools.chain(
+                    [first_chunk], (next(chunks)[1] for _ in tasks[1:])
+                )
+                total_rows += write_table_sheets(
+                    workbook, table, columns, batches, used_names
+                )
+    else:
+        conn = connect_readonly(db_path)
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
+            tables = [row[0] for row in cursor.fetchall()]
+            for table in tables:
+                cursor.execute(f"SELECT * FROM {quote_identifier(table)}")
+                columns = [description[0] for description in cursor.description]
+                total_rows += write_table_sheets(
+                    workbook,
+                    table,
+                    columns,
+                    cursor_batches(cursor, batch_size),
+                    used_names,
+                )
+        finally:
+            conn.close()
+    workbook.save(output_path)
+    return _export_stats(len(tables), total_rows, started)
+
+
+def arrow_type_for_column(declared_type: str):
+    """按 SQLite 类型亲和性规则把声明类型映射为 Arrow 类型"""
+    _require_pyarrow()
+    declared = (declared_type or "").upper()
+    if "INT" in declared:
+        return pa.int64()
+    if "CHAR" in declared or "CLOB" in declared or "TEXT" in declared:
+        return pa.string()
+    if "BLOB" in declared:
+        return pa.binary()
+    if not declared:
+        # 未声明类型的列可能混存各种值，统一按文本导出
+        return pa.string()
+    if "REAL" in declared or "FLOA" in declared or "DOUB" in declared:
+        return pa.float64()
+    if "BOOL" in declared:
+        return pa.bool_()
+    if "DATE" in declared or "TIME" in declared:
+        # SQLite 中日期时间通常以文本保存
+        return pa.string()
+    return pa.float64()
+
+
+def _exact_types(arrow_type) -> set:
+    """可以原样交给 pa.array 的 Python 类型"""
+    if pa.types.is_integer(arrow_type):
+        return {int}
+    if pa.types.is_floating(arrow_type):
+        return {float}
+    if pa.types.is_boolean(arrow_type):
+        return {bool}
+    if pa.types.is_binary(arrow_type):
+        return {bytes}
+    return {str}
+
+
+def _coerce_value(value, arrow_type):
+    """
+    SQLite 动态类型下与声明类型不符的值，只做不改变值的转换（如 3.0 存入整数列、
+    数字存入文本列），会改变值时抛出 ValueError，不截断也不置空
+    """
+    if value is None or type(value) in _exact_types(arrow_type):
+        return value
+    if pa.types.is_integer(arrow_type):
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+    elif pa.types.is_floating(arrow_type):
+        if isinstance(value, int) and float(value) == value:
+            return float(value)
+    elif pa.types.is_boolean(arrow_type):
+        if isinstance(value, (int, float)) and value in (0, 1):
+            return bool(value)
+    elif pa.types.is_binary(arrow_type):
+        if isinstance(value, str):
+            return value.encode("utf-8")
+    elif isinstance(value, bytes):
+        try:
+            return value.decode("utf-8")
+        except UnicodeDecodeError:
+            pass
+    else:
+        return str(value)
+    raise ValueError(f"值 {value!r} 无法无损转换为 {arrow_type}")
+
+
+def _arrow_batch(schema, rows: list, table: str):
+    arrays = []
+    for index, field in enumerate(schema):
+        values = [row[index] for row in rows]
+        kinds = set(map(type, values))
+        kinds.discard(type(None))
+        # pa.array 会把整数列中的 3.7 静默截断为 3，类型不完全一致时先逐个检查转换
+        if not kinds <= _exact_types(field.type):
+            try:
+                values = [_coerce_value(value, field.type) for value in values]
+            except ValueError as e:
+                raise ValueError(
+                    f"表 {table} 的列 {field.name} 含有与声明类型不符的数据，"
+                    f"为避免改变数据已停止导出: {e}"
+                ) from None
+        arrays.append(pa.array(values, type=field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def table_arrow_schema(conn: sqlite3.Connection, table: str):
+    """根据 PRAGMA table_info 中的声明类型生成 Arrow schema"""
+    _require_pyarrow()
+    cursor = conn.execute(f"PRAGMA table_info({quote_identifier(table)})")
+    return pa.schema(
+        [
+            pa.field(name, arrow_type_for_column(declared_type))
+            for _, name, declared_type, _, _, _ in cursor.fetchall()
+        ]
+    )
+
+
+def export_db_to_columnar(
+    db_path: str,
+    output_dir: Optional[str] = None,
+    file_format: str = "parquet",
+    batch_size: int = COLUMNAR_BATCH_SIZE,
+    compression: str = "zstd",
+) -> Dict[str, Any]:
+    """
+    将数据库中所有表导出为列式文件（file_format 为 "parquet" 或 "arrow"），
+    每个表一个文件。列类型取自表结构的声明类型，数据按 fetchmany 分批流式写成
+    Parquet 行组或 Arrow IPC 记录批。与声明类型不符、又不能无损转换的值（如整数列中的 3.7）
+    会使导出以 ValueError 失败，而不是被截断或置空。返回导出的表数、行数、耗时和每秒行数。
+    """
+    if not os.path.exists(db_path):
+        raise FileNotFoundError(f"数据库文件不存在: {db_path}")
+    _require_pyarrow()
+    if file_format not in ("parquet", "arrow"):
+        raise ValueError(f"不支持的列式格式: {file_format}")
+    db_name = os.path.splitext(os.path.basename(db_path))[0]
+    output_dir = output_dir or db_name
+    os.makedirs(output_dir, exist_ok=True)
+    started = time.perf_counter()
+    total_rows = 0
+    # 与CSV/XLSX导出相同，用只读连接读取，不修改源数据库
+    conn = connect_readonly(db_path)
     try:
         cursor = conn.cursor()
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
         tables = [row[0] for row in cursor.fetchall()]
-        with pd.ExcelWriter(output_path, engine="openpyxl") as writer:
-            for table in tables:
-                df = pd.read_sql_query(f'SELECT * FROM "{table}"', conn)
-                df.to_excel(writer, sheet_name=table, index=False)
+        for table in tables:
+            schema = table_arrow_schema(conn, table)
+            path = os.path.join(output_dir, f"{table}.{file_format}")
+            if file_format == "parquet":
+                writer = pq.ParquetWriter(path, schema, compression=compression)
+                write = writer.write_batch
+            else:
+                options = pa.ipc.IpcWriteOptions(compression=compression)
+                writer = pa.ipc.new_file(path, schema, options=options)
+                write = writer.write_batch
+            try:
+                cursor = conn.cursor()
+                cursor.execute(f"SELECT * FROM {quote_identifier(table)}")
+                for rows in cursor_batches(cursor, batch_size):
+                    write(_arrow_batch(schema, rows, table))
+                    total_rows += len(rows)
+            finally:
+                writer.close()
     finally:
         conn.close()
+    return _export_stats(len(tables), total_rows, started)
@@ -0,0 +1,130 @@
+"""
+语句性能记录
+通过 set_trace_callback 记录连接执行的每条语句，通过 set_progress_handler 统计虚拟机步数，
+并由数据源和表格分别报告读取行数、读取耗时和界面渲染耗时
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Optional, List, Dict, Any, Callable
+
+# 进度回调的间隔（虚拟机指令数），步数按此粒度统计
+PROFILE_STEPS = 1000
+
+
+class Profiler:
+    def __init__(self, max_entries: int = 10000):
+        self._lock = threading.Lock()
+        self._entries: "deque[Dict[str, Any]]" = deque(maxlen=max_entries)
+        self._serial = 0
+        # 连接标签 -> 该连接上正在执行（最近开始）的语句记录
+        self._current: Dict[str, Dict[str, Any]] = {}
+        # 最近一次读取了数据的记录，界面渲染耗时计入它
+        self._last_fetch: Optional[Dict[str, Any]] = None
+        self._origin = time.perf_counter()
+
+    def attach(
+        self,
+        conn: sqlite3.Connection,
+        label: str,
+        chain: Optional[Callable[[], int]] = None,
+        steps: int = PROFILE_STEPS,
+    ):
+        """
+        在连接上安装跟踪和进度回调（必须在创建该连接的线程中调用）。
+        连接已有自己的进度回调时通过 chain 传入，会在统计后继续调用它。
+        """
+
+        def on_progress():
+            with self._lock:
+                entry = self._current.get(label)
+                if entry is not None:
+                    entry["vm_steps"] += steps
+                    entry["ended"] = time.perf_counter()
+            return chain() if chain else 0
+
+        conn.set_trace_callback(lambda sql: self._on_statement(label, sql))
+        conn.set_progress_handler(on_progress, steps)
+
+    @staticmethod
+    def detach(conn: sqlite3.Connection, chain: Optional[Callable[[], int]] = None):
+        conn.set_trace_callback(None)
+        conn.set_progress_handler(chain, PROFILE_STEPS)
+
+    def _on_statement(self, label: str, sql: str):
+        # 跟踪回调只在语句开始时调用。结束时间只由该语句自己的活动（进度回调、
+        # 读取完成或 finish）记录，不能取下一条语句的开始时间，否则中间的空闲时间会计入
+        now = time.perf_counter()
+        with self._lock:
+            self._serial += 1
+            entry = {
+                "id": self._serial,
+                "connection": label,
+                "thread": threading.current_thread().name,
+                "sql": sql,
+                "started": now,
+                "ended": None,
+                "vm_steps": 0,
+                "rows": 0,
+                "fetch_seconds": 0.0,
+                "render_seconds": 0.0,
+                "rendered_rows": 0,
+            }
+            self._entries.append(entry)
+            self._current[label] = entry
+
+    def add_fetch(self, label: str, rows: int, seconds: float):
+        """报告在连接上读取了 rows 行、耗时 seconds（Python 端转换行的时间也在其中）"""
+        with self._lock:
+            entry = self._current.get(label)
+            if entry is None:
+                return
+            entry["rows"] += rows
+            entry["fetch_seconds"] += seconds
+            entry["ended"] = time.perf_counter()
+            self._last_fetch = entry
+
+    def finish(self, label: str):
+        """报告连接上最近开始的语句已执行完毕（用于不读取结果的语句）"""
+        with self._lock:
+            entry = self._current.get(label)
+            if entry is not None:
+                entry["ended"] = time.perf_counter()
+
+    def add_render(self, rows: int, seconds: float):
+        """报告界面把 rows 行写入表格控件的耗时"""
+        with self._lock:
+            if self._last_fetch is not None:
+                self._last_fetch["render_seconds"] += seconds
+                self._last_fetch["rendered_rows"] += rows
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """
+        所有记录的快照；wall_seconds 为语句开始到它自己的最后一次活动（步数、读取完成或
+        finish）。不足一个进度间隔且没有报告结束的语句无法测得，wall_seconds 为 None
+        """
+        with self._lock:
+            result = []
+            for entry in self._entries:
+                item = dict(entry)
+                ended = entry["ended"]
+                item["wall_seconds"] = (
+                    max(0.0, ended - entry["started"]) if ended is not None else None
+                )
+                item["started"] = entry["started"] - self._origin
+                del item["ended"]
+                result.append(item)
+            return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._current.clear()
+            self._last_fetch = None
+
+    def export_json(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"statements": self.entries()}, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,301 @@
+"""
+查询计划分析
+解析 EXPLAIN QUERY PLAN 的结果，标出全表扫描和临时B树，并根据 WHERE/ORDER BY 推荐覆盖索引
+"""
+
+import re
+import shutil
+import sqlite3
+import subprocess
+from typing import Optional, List, Dict, Any, Sequence, Tuple
+from .sql_helpers import quote_identifier
+
+# 不会作为表别名出现的关键字
+_NOT_ALIAS = set(
+    "WHERE JOIN ON LEFT RIGHT FULL INNER OUTER CROSS NATURAL USING GROUP ORDER "
+    "LIMIT HAVING WINDOW UNION EXCEPT INTERSECT INDEXED NOT AS".split()
+)
+_IDENTIFIER = r'(?:"(?:[^"]|"")+"|\[[^\]]+\]|`[^`]+`|\w+)'
+_TABLE_REF = re.compile(
+    rf"\b(?:FROM|JOIN)\s+({_IDENTIFIER})(?:\s+(?:AS\s+)?({_IDENTIFIER}))?", re.I
+)
+_COMPARISON = re.compile(
+    rf"(?:({_IDENTIFIER})\s*\.\s*)?({_IDENTIFIER})\s*"
+    r"(==|=|<=|>=|<>|!=|<|>|\bIS\b|\bIN\b|\bBETWEEN\b|\bLIKE\b|\bGLOB\b)",
+    re.I,
+)
+_COLUMN_REF = re.compile(rf"^\s*(?:({_IDENTIFIER})\s*\.\s*)?({_IDENTIFIER})", re.I)
+_CLAUSE_END = r"(?=\bGROUP\s+BY\b|\bORDER\s+BY\b|\bLIMIT\b|\bHAVING\b|\bWINDOW\b|$)"
+_EQUALITY = {"=", "==", "IS", "IN"}
+_RANGE = {"<", ">", "<=", ">=", "BETWEEN"}
+
+
+def _unquote(name: str) -> str:
+    if name[:1] in '"[`':
+        return name[1:-1].replace('""', '"')
+    return name
+
+
+def _strip_literals(sql: str) -> str:
+    """去掉注释并把字符串常量替换为占位符，避免其中的关键字干扰解析"""
+    sql = re.sub(r"--[^\n]*|/\*.*?\*/", " ", sql, flags=re.S)
+    return re.sub(r"'(?:[^']|'')*'", "?", sql)
+
+
+def classify_plan_detail(detail: str) -> Optional[str]:
+    """full_scan：全表扫描；temp_btree：临时B树排序/去重；auto_index：自动建立的临时索引"""
+    upper = detail.upper()
+    if upper.startswith("SCAN ") and " USING " not in upper:
+        name = upper[5:].split()[0] if upper[5:].split() else ""
+        if name not in ("CONSTANT", "SUBQUERY") and "VIRTUAL TABLE" not in upper:
+            return "full_scan"
+    if "USE TEMP B-TREE" in upper:
+        return "temp_btree"
+    if "AUTOMATIC" in upper and "INDEX" in upper:
+        return "auto_index"
+    return None
+
+
+def explain_query_plan(
+    conn: sqlite3.Connection, sql: str, params: Sequence[Any] = ()
+) -> List[Dict[str, Any]]:
+    """返回计划节点列表，每项含 id、parent、detail 和 warning（见 classify_plan_detail）"""
+    sql = sql.strip().rstrip(";")
+    cursor = conn.execute(f"EXPLAIN QUERY PLAN {sql}", tuple(params))
+    return [
+        {
+            "id": row[0],
+            "parent": row[1],
+            "detail": row[3],
+            "warning": classify_plan_detail(row[3]),
+        }
+        for row in cursor.fetchall()
+    ]
+
+
+def _table_aliases(sql: str) -> Dict[str, str]:
+    """别名（或表名）-> 表名，键为小写"""
+    aliases: Dict[str, str] = {}
+    for match in _TABLE_REF.finditer(sql):
+        table = _unquote(match.group(1))
+        if table.startswith("("):
+            continue
+        aliases[table.lower()] = table
+        alias = match.group(2)
+        if alias and alias.upper() not in _NOT_ALIAS:
+            aliases[_unquote(alias).lower()] = table
+    return aliases
+
+
+def _conditions(sql: str) -> List[Tuple[Optional[str], str, str]]:
+    """WHERE 和 JOIN ... ON 中的 (限定名, 列名, 运算符)"""
+    parts = re.findall(rf"\bWHERE\b(.*?){_CLAUSE_END}", sql, re.I | re.S)
+    parts += re.findall(
+        r"\bON\b(.*?)(?=\bJOIN\b|\bWHERE\b|\bGROUP\b|\bORDER\b|\bLIMIT\b|$)",
+        sql,
+        re.I | re.S,
+    )
+    result = []
+    for part in parts:
+        for match in _COMPARISON.finditer(part):
+            qualifier = _unquote(match.group(1)) if match.group(1) else None
+            result.append((qualifier, _unquote(match.group(2)), match.group(3).upper()))
+    return result
+
+
+def _order_columns(sql: str, clause: str) -> List[Tuple[Optional[str], str]]:
+    match = re.search(
+        rf"\b{clause}\s+BY\b(.*?)(?=\bLIMIT\b|\bHAVING\b|\bORDER\s+BY\b|\bWINDOW\b|$)",
+        sql,
+        re.I | re.S,
+    )
+    if not match:
+        return []
+    columns = []
+    for item in match.group(1).split(","):
+        ref = _COLUMN_REF.match(item)
+        if ref:
+            qualifier = _unquote(ref.group(1)) if ref.group(1) else None
+            columns.append((qualifier, _unquote(ref.group(2))))
+    return columns
+
+
+def _select_columns(sql: str) -> List[Tuple[Optional[str], str]]:
+    match = re.search(r"\bSELECT\s+(?:DISTINCT\s+)?(.*?)\bFROM\b", sql, re.I | re.S)
+    if not match or "*" in match.group(1):
+        return []
+    columns = []
+    for item in match.group(1).split(","):
+        ref = re.fullmatch(
+            rf"\s*(?:({_IDENTIFIER})\s*\.\s*)?({_IDENTIFIER})(?:\s+(?:AS\s+)?\w+)?\s*",
+            item,
+            re.I,
+        )
+        if ref:
+            qualifier = _unquote(ref.group(1)) if ref.group(1) else None
+            columns.append((qualifier, _unquote(ref.group(2))))
+    return columns
+
+
+def suggest_indexes(
+    sql: str,
+    plan: List[Dict[str, Any]],
+    table_columns: Dict[str, List[str]],
+    existing_indexes: Dict[str, List[List[str]]],
+) -> List[Dict[str, Any]]:
+    """
+    对计划中全表扫描的表，以及有临时B树排序的单表查询，推荐索引：
+    等值条件列在前，其次一个范围条件列，再是 ORDER BY/GROUP BY 列，
+    查询列数不多时追加 SELECT 中的其余列使索引成为覆盖索引。
+    table_columns/existing_indexes 来自表结构目录，只推荐真实存在的列，
+    已有索引以推荐列为前缀时不再推荐。
+    """
+    clean = _strip_literals(sql)
+    aliases = _table_aliases(clean)
+    targets: Dict[str, str] = {}
+    for node in plan:
+        if node["warning"] == "full_scan":
+            words = node["detail"].split()
+            name = words[1] if len(words) > 1 else ""
+            table = aliases.get(_unquote(name).lower())
+            if table:
+                targets[table] = "全表扫描"
+    tables = list(dict.fromkeys(aliases.values()))
+    if len(tables) == 1 and any(node["warning"] == "temp_btree" for node in plan):
+        targets.setdefault(tables[0], "使用临时B树排序")
+
+    suggestions = []
+    conditions = _conditions(clean)
+    order = _order_columns(clean, "GROUP") + _order_columns(clean, "ORDER")
+    selected = _select_columns(clean)
+    for table, reason in targets.items():
+        known = {name.lower(): name for name in table_columns.get(table, [])}
+
+        def resolve(qualifier: Optional[str], column: str) -> Optional[str]:
+            if qualifier is not None and aliases.get(qualifier.lower()) != table:
+                return None
+            if qualifier is None and len(tables) > 1:
+                # 未加限定的列只在能唯一确定所属表时使用
+                owners = [
+                    t
+                    for t in tables
+                    if column.lower()
+                    in (name.lower() for name in table_columns.get(t, []))
+                ]
+                if owners != [table]:
+                    return None
+            return known.get(column.lower())
+
+        equality: List[str] = []
+        ranges: List[str] = []
+        for qualifier, column, operator in conditions:
+            name = resolve(qualifier, column)
+            if name is None:
+                continue
+            if operator in _EQUALITY and name not in equality:
+                equality.append(name)
+            elif operator in _RANGE and name not in ranges:
+                ranges.append(name)
+        columns = list(equality)
+        for name in ranges[:1]:
+            if name not in columns:
+                columns.append(name)
+        for qualifier, column in order:
+            name = resolve(qualifier, column)
+            if name and name not in columns:
+                columns.append(name)
+        if not columns and any(
+            "DISTINCT" in node["detail"].upper()
+            for node in plan
+            if node["warning"] == "temp_btree"
+        ):
+            # SELECT DISTINCT 按查询列建索引即可避免临时B树
+            columns = [name for name in (resolve(q, c) for q, c in selected) if name]
+        if not columns:
+            continue
+        covering = list(columns)
+        for qualifier, column in selected:
+            name = resolve(qualifier, column)
+            if name and name not in covering:
+                covering.append(name)
+        if len(covering) <= 6:
+            columns = covering
+
+        lowered = [name.lower() for name in columns]
+        if any(
+            [name.lower() for name in index[: len(columns)]] == lowered
+            for index in existing_indexes.get(table, [])
+        ):
+            continue
+        index_name = "idx_" + "_".join([table] + columns)
+        index_name = re.sub(r"\W", "_", index_name)
+        suggestions.append(
+            {
+                "table": table,
+                "columns": columns,
+                "reason": reason,
+                "sql": f"CREATE INDEX {quote_identifier(index_name)} "
+                f"ON {quote_identifier(table)} "
+                f"({', '.join(quote_identifier(name) for name in columns)})",
+            }
+        )
+    return suggestions
+
+
+def verify_suggestion(
+    conn: sqlite3.Connection, sql: str, suggestion: Dict[str, Any]
+) -> bool:
+    """
+    在内存数据库中复制表结构并建立推荐的索引，检查新的查询计划是否使用它。
+    不修改当前数据库；没有统计信息，结果只作参考。
+    """
+    schema = conn.execute(
+        "SELECT sql FROM sqlite_master WHERE type IN ('table', 'index', 'view') "
+        "AND sql IS NOT NULL AND name NOT LIKE 'sqlite_%'"
+    ).fetchall()
+    scratch = sqlite3.connect(":memory:")
+    try:
+        for (statement,) in schema:
+            try:
+                scratch.execute(statement)
+            except sqlite3.Error:
+                # 虚拟表等依赖扩展的对象跳过
+                pass
+        scratch.execute(suggestion["sql"])
+        index_name = suggestion["sql"].split('"')[1]
+        params = ()
+        placeholders = sql.count("?")
+        if placeholders:
+            params = (None,) * placeholders
+        plan = explain_query_plan(scratch, sql, params)
+        return any(index_name in node["detail"] for node in plan)
+    except sqlite3.Error:
+        return False
+    finally:
+        scratch.close()
+
+
+def expert_recommendations(
+    db_path: str, sql: str, timeout: float = 30
+) -> Optional[str]:
+    """
+    调用 sqlite3 命令行的 .expert 推荐索引。
+    找不到命令行程序或它不支持 .expert 时返回 None。
+    """
+    cli = shutil.which("sqlite3")
+    if not cli:
+        return None
+    script = f".expert\n{sql.strip().rstrip(';')};\n"
+    try:
+        completed = subprocess.run(
+            [cli, "-readonly", db_path],
+            input=script,
+            capture_output=True,
+            text=True,
+            timeout=timeout,
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if completed.returncode != 0 or not completed.stdout.strip():
+        return None
+    return completed.stdout.strip()
@@ -0,0 +1,420 @@
+"""
+后台查询线程
+在独立线程中用独立连接执行语句，结果放入队列，由界面线程定时取回
+"""
+
+import itertools
+import queue
+import sqlite3
+import threading
+import time
+from collections import deque
+from typing import Optional, Callable, Any, Dict, List, Tuple
+from .row_source import RowSource
+
+
+class QueryWorker:
+    # 进度回调的间隔（SQLite虚拟机指令数）
+    PROGRESS_STEPS = 1000
+
+    def __init__(self, open_logic: Callable[[], Any]):
+        """open_logic 在后台线程中调用，返回该线程专用的 SQLiteUtils"""
+        self.open_logic = open_logic
+        self.logic = None
+        self._open_error: Optional[Exception] = None
+        # 普通任务（以及切换连接、退出等控制消息）按提交顺序执行；
+        # 低优先级任务（如统计总行数）只在没有普通任务时执行
+        self._tasks: "deque[Optional[tuple]]" = deque()
+        self._idle_tasks: "deque[tuple]" = deque()
+        self._queue_ready = threading.Condition()
+        self._results: "queue.Queue[tuple]" = queue.Queue()
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.current_task: Optional[int] = None
+        self.current_low_priority = False
+        # 正在执行的低优先级任务被普通任务打断，结束后重新排队
+        self._preempted = False
+        self.tracked = False
+        self.started_at = 0.0
+        self.steps = 0
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(
+        self,
+        func: Callable[[Any], Any],
+        callback: Optional[Callable[[Any], None]] = None,
+        error_callback: Optional[Callable[[Exception], None]] = None,
+        track: bool = False,
+        low_priority: bool = False,
+    ) -> int:
+        """
+        提交任务，func(logic) 在后台线程执行。
+        callback/error_callback 在界面线程调用 poll() 时执行。
+        track 为 True 的任务会在 progress() 中报告耗时和虚拟机步数。
+        low_priority 为 True 的任务排在所有普通任务之后；它执行期间提交普通任务时
+        先中断它，普通任务完成后再重新执行
+        """
+        task_id = next(self._ids)
+        task = (task_id, func, callback, error_callback, track, low_priority)
+        if low_priority:
+            with self._queue_ready:
+                self._idle_tasks.append(task)
+                self._queue_ready.notify()
+            return task_id
+        self._put(task)
+        with self._lock:
+            if (
+                self.current_task is not None
+                and self.current_low_priority
+                and self.logic is not None
+            ):
+                self._preempted = True
+                self.logic.conn.interrupt()
+        return task_id
+
+    def _put(self, task: Optional[tuple]):
+        with self._queue_ready:
+            self._tasks.append(task)
+            self._queue_ready.notify()
+
+    def _next_task(self) -> Optional[tuple]:
+        with self._queue_ready:
+            while not self._tasks and not self._idle_tasks:
+                self._queue_ready.wait()
+            if self._tasks:
+                return self._tasks.popleft()
+            return self._idle_tasks.popleft()
+
+    def cancel(self, task_id: Optional[int] = None) -> bool:
+        """
+        中断正在执行的任务（task_id 为空时中断当前任何任务）。
+        task_id 对应的任务还在排队时直接移除，它的 error_callback 收到“interrupted”错误
+        """
+        if task_id is not None:
+            with self._queue_ready:
+                for tasks in (self._tasks, self._idle_tasks):
+                    for task in tasks:
+                        if task is not None and task[0] == task_id:
+                            tasks.remove(task)
+                            self._results.put(
+                                (task[3], sqlite3.OperationalError("interrupted"))
+                            )
+                            return True
+        with self._lock:
+            if self.current_task is None or self.logic is None:
+                return False
+            if task_id is not None and task_id != self.current_task:
+                return False
+            self.logic.conn.interrupt()
+            return True
+
+    def progress(self) -> Optional[Tuple[float, int]]:
+        """正在执行的跟踪任务的 (已用秒数, 虚拟机步数)，空闲时返回 None"""
+        with self._lock:
+            if self.current_task is None or not self.tracked:
+                return None
+            return time.perf_counter() - self.started_at, self.steps
+
+    def poll(self, max_results: int = 100):
+        """在界面线程中调用，执行已完成任务的回调"""
+        for _ in range(max_results):
+            try:
+                callback, value = self._results.get_nowait()
+            except queue.Empty:
+                break
+            if callback:
+                callback(value)
+
+    def reopen(self, open_logic: Callable[[], Any]):
+        """
+        切换到另一个数据库：中断当前任务，排在之前的普通任务执行完后改用新连接。
+        低优先级任务属于原来的数据库，直接丢弃
+        """
+        with self._queue_ready:
+            self._idle_tasks.clear()
+        self.cancel()
+        self._put(("reopen", open_logic))
+
+    def close(self):
+        with self._queue_ready:
+            self._idle_tasks.clear()
+        self.cancel()
+        self._put(None)
+
+    def _on_progress(self) -> int:
+        self.steps += self.PROGRESS_STEPS
+        return 0
+
+    def _open(self, open_logic: Callable[[], Any]):
+        if self.logic is not None:
+            self.logic.close()
+        with self._lock:
+            self.logic = None
+        try:
+            logic = open_logic()
+        except Exception as e:
+            self._open_error = e
+            return
+        self._open_error = None
+        if logic.profiler is not None:
+            # 性能记录占用进度回调，由它继续调用取消和进度统计所需的回调
+            logic.profiler.attach(
+                logic.conn,
+                logic.profile_label,
+                chain=self._on_progress,
+                steps=self.PROGRESS_STEPS,
+            )
+        else:
+            logic.conn.set_progress_handler(self._on_progress, self.PROGRESS_STEPS)
+        with self._lock:
+            self.logic = logic
+
+    def _run(self):
+        self._open(self.open_logic)
+        while True:
+            task = self._next_task()
+            if task is None:
+                break
+            if task[0] == "reopen":
+                self._open(task[1])
+                continue
+            task_id, func, callback, error_callback, track, low_priority = task
+            with self._lock:
+                self.current_task = task_id
+                self.current_low_priority = low_priority
+                self._preempted = False
+                self.tracked = track
+                self.started_at = time.perf_counter()
+                self.steps = 0
+            try:
+                if self.logic is None:
+                    raise self._open_error or Exception("数据库连接已关闭")
+                value = func(self.logic)
+            except Exception as e:
+                with self._lock:
+                    preempted = self._preempted and "interrupted" in str(e)
+                if preempted:
+                    # 让普通任务先执行，之后从头重新执行
+                    with self._queue_ready:
+                        self._idle_tasks.appendleft(task)
+                else:
+                    self._results.put((error_callback, e))
+            else:
+                self._results.put((callback, value))
+            finally:
+                with self._lock:
+                    self.current_task = None
+        if self.logic is not None:
+            self.logic.close()
+
+
+class AsyncRowSource(RowSource):
+    """
+    后台线程中数据源的界面侧代理。
+    缺页时向后台线程请求并返回 None，页面到达后调用 on_ready 通知界面刷新。
+    总行数：任意SQL的结果不预先统计（那需要把查询再完整执行一遍），行数随读到的页增长，
+    读到末尾时确定；表数据源在后台以低优先级统计，翻页请求优先，关闭时取消
+    """
+
+    def __init__(
+        self,
+        worker: QueryWorker,
+        remote: RowSource,
+        first_page: Tuple[List[tuple], List[tuple]],
+        on_ready: Optional[Callable[[], None]] = None,
+        max_pages: int = 16,
+    ):
+        super().__init__(remote.columns, remote.page_size, max_pages)
+        self.worker = worker
+        self.remote = remote
+        self.key_columns = remote.key_columns
+        self.profiler = remote.profiler
+        self.on_ready = on_ready
+        self._pending = set()
+        # invalidate 后递增，丢弃之前发出的请求返回的旧数据
+        self._generation = 0
+        # 正在排队或执行的统计总行数任务
+        self._count_task: Optional[int] = None
+        first_page, first_keys = first_page
+        self._store_page(0, first_page, first_keys)
+        self._loaded_rows = len(first_page)
+        if len(first_page) < self.page_size:
+            self._count = len(first_page)
+        else:
+            self._request_count()
+
+    def _request_count(self):
+        self._cancel_count()
+        if self.remote.expensive_count:
+            return
+        remote = self.remote
+        generation = self._generation
+        self._count_task = self.worker.submit(
+            lambda logic: remote.row_count(),
+            lambda count: self._on_count(count, generation),
+            lambda error: self._on_count_error(generation),
+            low_priority=True,
+        )
+
+    def _cancel_count(self):
+        if self._count_task is not None:
+            self.worker.cancel(self._count_task)
+            self._count_task = None
+
+    @property
+    def count_known(self) -> bool:
+        return self._count is not None
+
+    @property
+    def loaded_rows(self) -> int:
+        """已读到的行数（总行数已知时即为总行数）"""
+        return self._count if self._count is not None else self._loaded_rows
+
+    def row_count(self) -> int:
+        if self._count is not None:
+            return self._count
+        # 总数未知时至少还有一页未读
+        return self._loaded_rows + self.page_size
+
+    def _count_rows(self) -> int:
+        # row_count 已改为按读到的页给出，不会走到这里；总数由后台统计或读到末尾时确定
+        return self.row_count()
+
+    def _load_page(self, page_no: int) -> List[tuple]:
+        # 界面线程不能同步读取，缺页只能经 fetch 向后台线程请求
+        raise RuntimeError("AsyncRowSource 只能通过 fetch 异步读取页面")
+
+    def fetch(self, offset: int, limit: int) -> Optional[List[tuple]]:
+        end = min(offset + limit, self.row_count())
+        offset = max(offset, 0)
+        if end <= offset:
+            return []
+        first_page = offset // self.page_size
+        last_page = (end - 1) // self.page_size
+        missing = [
+            no for no in range(first_page, last_page + 1) if no not in self._pages
+        ]
+        # 预读前后各一页作为缓冲
+        for no in (first_page - 1, last_page + 1):
+            if no >= 0 and no * self.page_size < self.row_count():
+                self._request(no)
+        if missing:
+            for no in missing:
+                self._request(no)
+            return None
+        rows: List[tuple] = []
+        for no in range(first_page, last_page + 1):
+            self._pages.move_to_end(no)
+            rows.extend(self._pages[no])
+        start = offset - first_page * self.page_size
+        return rows[start : start + (end - offset)]
+
+    def _request(self, page_no: int):
+        if page_no in self._pages or page_no in self._pending:
+            return
+        self._pending.add(page_no)
+        remote = self.remote
+        generation = self._generation
+        self.worker.submit(
+            lambda logic: remote.fetch_page(page_no),
+            lambda page: self._on_page(page_no, page, generation),
+            lambda error: self._pending.discard(page_no),
+        )
+
+    def _on_page(
+        self, page_no: int, page: Tuple[List[tuple], List[tuple]], generation: int
+    ):
+        if generation != self._generation:
+            return
+        rows, keys = page
+        self._pending.discard(page_no)
+        self._store_page(page_no, rows, keys)
+        if self._count is None:
+            if len(rows) < self.page_size:
+                # 读到了末尾，不再需要统计
+                self._cancel_count()
+                self._count = page_no * self.page_size + len(rows)
+            else:
+                self._loaded_rows = max(
+                    self._loaded_rows, page_no * self.page_size + len(rows)
+                )
+        if self.on_ready:
+            self.on_ready()
+
+    def _on_count(self, count: int, generation: int):
+        if generation != self._generation:
+            return
+        self._count_task = None
+        self._count = count
+        if self.on_ready:
+            self.on_ready()
+
+    def _on_count_error(self, generation: int):
+        if generation == self._generation:
+            self._count_task = None
+
+    def replace_rows(self, rows: Dict[tuple, tuple]):
+        super().replace_rows(rows)
+        remote = self.remote
+        self.worker.submit(lambda logic: remote.replace_rows(rows))
+        if self.on_ready:
+            self.on_ready()
+
+    def invalidate(self, from_page: int = 0):
+        """丢弃本地和后台的缓存页，重新统计总行数，需要显示时再读取"""
+        self._generation += 1
+        self._pending.clear()
+        for page_no in [no for no in self._pages if no >= from_page]:
+            del self._pages[page_no]
+            self._keys.pop(page_no, None)
+        # 新的总行数到达前沿用原来的行数，避免滚动位置跳动
+        self._loaded_rows = max(0, self.row_count() - self.page_size)
+        self._count = None
+        remote = self.remote
+        self.worker.submit(lambda logic: remote.invalidate(from_page))
+        self._request_count()
+        if self.on_ready:
+            self.on_ready()
+
+    def release(self):
+        remote = self.remote
+        self.worker.submit(lambda logic: remote.release())
+
+    def close(self):
+        self._cancel_count()
+        remote = self.remote
+        self.worker.submit(lambda logic: remote.close())
+        self._pages.clear()
+        self._keys.clear()
+        self.on_ready = None
+
+
+def open_async_source(
+    worker: QueryWorker,
+    open_remote: Callable[[Any], Any],
+    callback: Callable[[Dict[str, Any]], None],
+    error_callback: Callable[[Exception], None],
+) -> int:
+    """
+    在后台线程中执行 open_remote(logic)，它返回分页数据源或 {"columns", "source"}/{"affected_rows"}。
+    查询结果在界面线程中包装为 AsyncRowSource，以 {"columns", "source"} 交给 callback。
+    """
+
+    def run(logic):
+        result = open_remote(logic)
+        if isinstance(result, RowSource):
+            result = {"columns": result.columns, "source": result}
+        if "source" in result:
+            remote = result["source"]
+            result["first_page"] = remote.fetch_page(0)
+        return result
+
+    def done(result):
+        if "source" in result:
+            result["source"] = AsyncRowSource(
+                worker, result["source"], result.pop("first_page")
+            )
+        callback(result)
+
+    return worker.submit(run, done, error_callback, track=True)
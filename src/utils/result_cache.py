@@ -0,0 +1,96 @@
+"""
+查询结果缓存
+以规范化的SQL文本和参数为键，按数据版本校验，LRU淘汰并限制总内存
+"""
+
+import re
+import sys
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Tuple, Sequence
+
+from .result_set import ResultSet
+
+# 默认的缓存内存上限（字节）
+DEFAULT_CACHE_BYTES = 64 * 1024 * 1024
+
+# 字符串和带引号的标识符原样保留；引号外连续的注释和空白整体替换为一个空格，
+# 行注释与其后的内容之间总会留下分隔，不会把注释后面的SQL并入注释
+_TOKENS = re.compile(
+    r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\"|`(?:[^`]|``)*`|\[[^\]]*\])"
+    r"|(?:\s|--[^\n]*|/\*.*?(?:\*/|\Z))+",
+    re.S,
+)
+
+
+def normalize_sql(sql: str) -> str:
+    """
+    去掉引号外的注释、合并连续空白，再去掉首尾空白和末尾分号，
+    使只有排版或注释不同的语句共用缓存
+    """
+    sql = _TOKENS.sub(lambda m: m.group(1) or " ", sql)
+    return sql.strip().rstrip(";").strip()
+
+
+def estimate_size(columns: List[str], rows: Sequence[tuple]) -> int:
+    """估算结果占用的内存：ResultSet 直接取各列缓冲区的大小，元组列表按前 100 行的平均值推算"""
+    size = sum(sys.getsizeof(name) for name in columns)
+    if isinstance(rows, ResultSet):
+        return size + rows.nbytes()
+    size += sys.getsizeof(rows)
+    if not rows:
+        return size
+    sample = rows[:100]
+    sample_size = sum(
+        sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row)
+        for row in sample
+    )
+    return size + sample_size * len(rows) // len(sample)
+
+
+class ResultCache:
+    def __init__(self, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self.used_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        # 键 -> (数据版本, 结果, 估算大小)
+        self._entries: "OrderedDict[tuple, Tuple[Any, Dict[str, Any], int]]" = (
+            OrderedDict()
+        )
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: tuple, version: Any) -> Optional[Dict[str, Any]]:
+        """返回与当前数据版本一致的缓存结果，版本不同的条目直接丢弃"""
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        if entry[0] != version:
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key: tuple, version: Any, result: Dict[str, Any]):
+        """加入缓存，超过上限时淘汰最久未使用的条目；单个结果超过上限时不缓存"""
+        size = estimate_size(result["columns"], result["rows"])
+        if key in self._entries:
+            self._remove(key)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (version, result, size)
+        self.used_bytes += size
+        while self.used_bytes > self.max_bytes:
+            self._remove(next(iter(self._entries)))
+
+    def _remove(self, key: tuple):
+        _, _, size = self._entries.pop(key)
+        self.used_bytes -= size
+
+    def clear(self):
+        self._entries.clear()
+        self.used_bytes = 0
@@ -0,0 +1,302 @@
+"""
+紧凑的查询结果
+读取到的数据按列存放：整数列和实数列存入 array（每个值 8 字节），文本列编码为 UTF-8
+后拼接成一个字节缓冲区并记录每个值的结束偏移，BLOB 和混合类型的列保留原对象。
+行在访问时才组装为元组，一百万行的结果只占元组列表的一小部分内存
+"""
+
+import sqlite3
+import sys
+from abc import ABC, abstractmethod
+from array import array
+from collections.abc import Sequence
+from itertools import accumulate, chain, islice
+from operator import itemgetter
+from typing import Any, Iterable, Iterator, List, Optional, Set, Union
+
+# 从游标每批读取的行数，也是按行遍历时每次组装的行数
+FETCH_BATCH_SIZE = 5000
+
+_NONE = type(None)
+
+
+def _as_slice(rows: range) -> slice:
+    # 步长为负且取到开头时 range 的 stop 为 -1，作为切片会被当成最后一行
+    return slice(rows.start, rows.stop if rows.stop >= 0 else None, rows.step)
+
+
+class _Column(ABC):
+    """列缓冲区的基类：nulls 为每行一个字节的空值标记，没有空值时为 None"""
+
+    def __init__(self, leading_nulls: int = 0):
+        self.nulls: Optional[bytearray] = (
+            bytearray(b"\x01") * leading_nulls if leading_nulls else None
+        )
+
+    @abstractmethod
+    def __len__(self) -> int: ...
+
+    @abstractmethod
+    def extend(self, values: List[Any], kinds: Set[type], has_null: bool) -> bool:
+        """追加一批值（kinds 为其中非空值的类型），类型不符时不做修改并返回 False"""
+
+    @abstractmethod
+    def values(self, rows: range) -> List[Any]:
+        """rows 中各行的值"""
+
+    def nbytes(self) -> int:
+        return len(self.nulls) if self.nulls is not None else 0
+
+    def _extend_nulls(self, values: List[Any], has_null: bool, size: int):
+        if has_null:
+            if self.nulls is None:
+                self.nulls = bytearray(size)
+            self.nulls += bytes([value is None for value in values])
+        elif self.nulls is not None:
+            self.nulls += bytes(len(values))
+
+    def _apply_nulls(self, values: List[Any], rows: range) -> List[Any]:
+        if self.nulls is not None:
+            mask = self.nulls[_as_slice(rows)]
+            if 1 in mask:
+                return [None if null else value for value, null in zip(values, mask)]
+        return values
+
+
+class _NullColumn(_Column):
+    """到目前为止只有 NULL 的列，只记录行数"""
+
+    def __init__(self, length: int = 0):
+        super().__init__()
+        self.length = length
+
+    def __len__(self) -> int:
+        return self.length
+
+    def extend(self, values: List[Any], kinds: Set[type], has_null: bool) -> bool:
+        if kinds:
+            return False
+        self.length += len(values)
+        return True
+
+    def values(self, rows: range) -> List[Any]:
+        return [None] * len(rows)
+
+
+class _NumberColumn(_Column):
+    """整数列（array('q')）或实数列（array('d')），NULL 处存 0"""
+
+    def __init__(self, typecode: str, kind: type, leading_nulls: int = 0):
+        super().__init__(leading_nulls)
+        self.kind = kind
+        self.data = array(typecode, [0]) * leading_nulls
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def extend(self, values: List[Any], kinds: Set[type], has_null: bool) -> bool:
+        if kinds and kinds != {self.kind}:
+            return False
+        size = len(self.data)
+        try:
+            self.data.extend(
+                [0 if value is None else value for value in values]
+                if has_null
+                else values
+            )
+        except OverflowError:
+            # 超出64位的整数（如自定义函数的返回值），array 可能已追加了一部分
+            del self.data[size:]
+            return False
+        self._extend_nulls(values, has_null, size)
+        return True
+
+    def values(self, rows: range) -> List[Any]:
+        return self._apply_nulls(self.data[_as_slice(rows)].tolist(), rows)
+
+    def nbytes(self) -> int:
+        return len(self.data) * self.data.itemsize + super().nbytes()
+
+
+class _TextColumn(_Column):
+    """文本列：UTF-8 字节缓冲区加偏移，第 i 个值为 buffer[offsets[i]:offsets[i + 1]]"""
+
+    def __init__(self, leading_nulls: int = 0):
+        super().__init__(leading_nulls)
+        self.offsets = array("q", [0]) * (leading_nulls + 1)
+        self.buffer = bytearray()
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def extend(self, values: List[Any], kinds: Set[type], has_null: bool) -> bool:
+        if kinds and kinds != {str}:
+            return False
+        try:
+            encoded = list(
+                map(
+                    str.encode,
+                    (
+                        ["" if value is None else value for value in values]
+                        if has_null
+                        else values
+                    ),
+                )
+            )
+        except UnicodeEncodeError:
+            # 含有无法编码的代理字符，改为保留原对象
+            return False
+        size = len(self)
+        self.offsets.extend(
+            islice(accumulate(chain((self.offsets[-1],), map(len, encoded))), 1, None)
+        )
+        self.buffer += b"".join(encoded)
+        self._extend_nulls(values, has_null, size)
+        return True
+
+    def values(self, rows: range) -> List[Any]:
+        offsets, buffer = self.offsets, self.buffer
+        if rows.step == 1:
+            bounds = offsets[rows.start : max(rows.start, rows.stop) + 1]
+            texts = [buffer[a:b].decode() for a, b in zip(bounds, bounds[1:])]
+        else:
+            texts = [buffer[offsets[i] : offsets[i + 1]].decode() for i in rows]
+        return self._apply_nulls(texts, rows)
+
+    def nbytes(self) -> int:
+        offsets = len(self.offsets) * self.offsets.itemsize
+        return len(self.buffer) + offsets + super().nbytes()
+
+
+class _ObjectColumn(_Column):
+    """BLOB 或混合类型的列，按原对象存放"""
+
+    def __init__(self, values: Iterable[Any] = ()):
+        super().__init__()
+        self.data = list(values)
+
+    def __len__(self) -> int:
+        return len(self.data)
+
+    def extend(self, values: List[Any], kinds: Set[type], has_null: bool) -> bool:
+        self.data.extend(values)
+        return True
+
+    def values(self, rows: range) -> List[Any]:
+        return self.data[_as_slice(rows)]
+
+    def nbytes(self) -> int:
+        data = self.data
+        size = sys.getsizeof(data)
+        if not data:
+            return size
+        # None 是共享的单例，不计入
+        sample = data[:100]
+        sample_size = sum(sys.getsizeof(value) for value in sample if value is not None)
+        return size + sample_size * len(data) // len(sample)
+
+
+def _typed_column(kinds: Set[type], leading_nulls: int) -> _Column:
+    """按第一批非空值的类型选择列缓冲区"""
+    if kinds == {int}:
+        return _NumberColumn("q", int, leading_nulls)
+    if kinds == {float}:
+        return _NumberColumn("d", float, leading_nulls)
+    if kinds == {str}:
+        return _TextColumn(leading_nulls)
+    return _ObjectColumn([None] * leading_nulls)
+
+
+class ResultSet(Sequence):
+    """
+    按列存放的只读结果集，接口与元组列表相同：len()、下标、切片（返回元组列表）和遍历。
+    每列先按第一批非空值的类型选择缓冲区，之后出现其他类型时整列改为保留原对象
+    """
+
+    def __init__(self, columns: List[str], rows: Iterable[tuple] = ()):
+        self.columns = list(columns)
+        self._length = 0
+        self._buffers: List[_Column] = [_NullColumn() for _ in self.columns]
+        self._getters = [itemgetter(index) for index in range(len(self.columns))]
+        self.extend(rows)
+
+    @classmethod
+    def from_cursor(
+        cls, cursor: sqlite3.Cursor, batch_size: int = FETCH_BATCH_SIZE
+    ) -> "ResultSet":
+        """按批读取游标的全部结果，不会同时持有全部行的元组"""
+        result = cls([description[0] for description in cursor.description])
+        while True:
+            batch = cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            result._append_batch(batch)
+        return result
+
+    def extend(self, rows: Iterable[tuple]):
+        iterator = iter(rows)
+        while True:
+            batch = list(islice(iterator, FETCH_BATCH_SIZE))
+            if not batch:
+                break
+            self._append_batch(batch)
+
+    def _append_batch(self, batch: List[tuple]):
+        # 按列取出后整列追加，取值、类型判断和写入大多在C中完成
+        # （itemgetter 逐列取值比 zip(*batch) 转置快一倍）
+        for index, getter in enumerate(self._getters):
+            values = list(map(getter, batch))
+            kinds = set(map(type, values))
+            has_null = _NONE in kinds
+            kinds.discard(_NONE)
+            column = self._buffers[index]
+            if not column.extend(values, kinds, has_null):
+                if isinstance(column, _NullColumn):
+                    column = _typed_column(kinds, len(column))
+                else:
+                    column = _ObjectColumn(column.values(range(len(column))))
+                self._buffers[index] = column
+                if not column.extend(values, kinds, has_null):
+                    column = _ObjectColumn(column.values(range(len(column))))
+                    column.extend(values, kinds, has_null)
+                    self._buffers[index] = column
+        self._length += len(batch)
+
+    def __len__(self) -> int:
+        return self._length
+
+    def __getitem__(self, index: Union[int, slice]) -> Any:
+        if isinstance(index, slice):
+            rows = range(*index.indices(self._length))
+            return list(zip(*(column.values(rows) for column in self._buffers)))
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("结果集行号超出范围")
+        rows = range(index, index + 1)
+        return tuple(column.values(rows)[0] for column in self._buffers)
+
+    def __iter__(self) -> Iterator[tuple]:
+        for start in range(0, self._length, FETCH_BATCH_SIZE):
+            yield from self[start : start + FETCH_BATCH_SIZE]
+
+    def __repr__(self) -> str:
+        return f"<ResultSet {self._length} 行 × {len(self.columns)} 列>"
+
+    def column_kinds(self) -> List[str]:
+        """每列的存放方式：integer、real、text、object 或 null（全部为空）"""
+        kinds = []
+        for column in self._buffers:
+            if isinstance(column, _NumberColumn):
+                kinds.append("integer" if column.kind is int else "real")
+            elif isinstance(column, _TextColumn):
+                kinds.append("text")
+            elif isinstance(column, _NullColumn):
+                kinds.append("null")
+            else:
+                kinds.append("object")
+        return kinds
+
+    def nbytes(self) -> int:
+        """各列缓冲区占用的字节数（对象列按抽样估算）"""
+        return sys.getsizeof(self) + sum(column.nbytes() for column in self._buffers)
@@ -0,0 +1,313 @@
+"""
+结果集分页数据源
+按页从数据库读取结果行，内存中只保留最近访问的若干页
+"""
+
+import re
+import sqlite3
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Optional, List, Sequence, Any, Dict, Tuple
+
+_LEADING_COMMENTS = re.compile(r"^\s*(?:(?:--[^\n]*\n?)|(?:/\*.*?\*/)|\s)*", re.S)
+
+
+def is_wrappable_query(sql: str) -> bool:
+    """判断语句能否作为子查询包装（用于 LIMIT/OFFSET 重新定位和 COUNT）"""
+    body = _LEADING_COMMENTS.sub("", sql, count=1)
+    keyword = body.split(None, 1)[0].upper() if body.strip() else ""
+    return keyword in ("SELECT", "WITH", "VALUES")
+
+
+class RowSource(ABC):
+    """分页行数据源基类，维护一个按页的LRU缓存。子类实现 _count_rows 和 _load_page"""
+
+    def __init__(self, columns: List[str], page_size: int = 200, max_pages: int = 8):
+        self.columns = columns
+        self.page_size = page_size
+        self.max_pages = max_pages
+        self._pages: "OrderedDict[int, List[tuple]]" = OrderedDict()
+        # 每页各行的键（rowid 或主键值），与 _pages 同步淘汰；没有键的数据源为空
+        self._keys: Dict[int, List[tuple]] = {}
+        # 键对应的列（已转义），为空表示结果行无法按键定位
+        self.key_columns: List[str] = []
+        # 语句性能记录（见 Profiler），表格据此报告渲染耗时
+        self.profiler = None
+        self._count: Optional[int] = None
+
+    @property
+    def expensive_count(self) -> bool:
+        """统计总行数是否需要把整个查询再执行一遍（此时不应预先统计）"""
+        return False
+
+    def row_count(self) -> int:
+        if self._count is None:
+            self._count = self._count_rows()
+        return self._count
+
+    def fetch(self, offset: int, limit: int) -> List[tuple]:
+        """返回 [offset, offset + limit) 范围内的行（总行数未知时读到结果末尾为止）"""
+        end = offset + limit
+        if self._count is not None:
+            end = min(end, self._count)
+        rows: List[tuple] = []
+        index = max(offset, 0)
+        while index < end:
+            page_no = index // self.page_size
+            page = self._get_page(page_no)
+            start = index - page_no * self.page_size
+            chunk = page[start : start + (end - index)]
+            if not chunk:
+                break
+            rows.extend(chunk)
+            index += len(chunk)
+        return rows
+
+    def _get_page(self, page_no: int) -> List[tuple]:
+        page = self._pages.get(page_no)
+        if page is not None:
+            self._pages.move_to_end(page_no)
+            return page
+        page = self._load_page(page_no)
+        self._store_page(page_no, page)
+        return page
+
+    def _store_page(
+        self, page_no: int, rows: List[tuple], keys: Optional[List[tuple]] = None
+    ):
+        self._pages[page_no] = rows
+        if keys is not None:
+            self._keys[page_no] = keys
+        while len(self._pages) > self.max_pages:
+            evicted, _ = self._pages.popitem(last=False)
+            self._keys.pop(evicted, None)
+
+    def fetch_page(self, page_no: int) -> Tuple[List[tuple], List[tuple]]:
+        """返回第 page_no 页的行及各行的键"""
+        rows = self._get_page(page_no)
+        return rows, self._keys.get(page_no, [])
+
+    def key_at(self, index: int) -> Optional[tuple]:
+        """第 index 行的键；数据源没有键或该行所在页未缓存时返回 None"""
+        page_no = index // self.page_size
+        keys = self._keys.get(page_no)
+        start = index - page_no * self.page_size
+        if keys is None or not 0 <= start < len(keys):
+            return None
+        return keys[start]
+
+    @abstractmethod
+    def _count_rows(self) -> int:
+        """统计总行数"""
+
+    @abstractmethod
+    def _load_page(self, page_no: int) -> List[tuple]:
+        """读取第 page_no 页的行，有键的数据源同时调用 _store_page 记录各行的键"""
+
+    def replace_rows(self, rows: Dict[tuple, tuple]):
+        """用按键重新读取的行替换已缓存页中的对应行"""
+        for page_no, keys in self._keys.items():
+            page = self._pages.get(page_no)
+            if page is None or not any(key in rows for key in keys):
+                continue
+            self._pages[page_no] = [
+                rows.get(key, row) for key, row in zip(keys, page)
+            ] + page[len(keys) :]
+
+    def invalidate(self, from_page: int = 0):
+        """丢弃从 from_page 开始的缓存页，之后访问时重新读取；总行数重新统计"""
+        for page_no in [no for no in self._pages if no >= from_page]:
+            del self._pages[page_no]
+            self._keys.pop(page_no, None)
+        self._count = None
+        self.release()
+
+    def release(self):
+        """释放占用的游标，之后访问时会按需重新打开"""
+        pass
+
+    def close(self):
+        self.release()
+        self._pages.clear()
+        self._keys.clear()
+
+
+class ListRowSource(RowSource):
+    """已全部读入内存的结果（用于无法包装为子查询的语句，如 PRAGMA）"""
+
+    def __init__(self, columns: List[str], rows: Sequence[tuple], page_size: int = 200):
+        super().__init__(columns, page_size)
+        self._rows = rows
+        self._count = len(rows)
+
+    def fetch(self, offset: int, limit: int) -> List[tuple]:
+        return list(self._rows[max(offset, 0) : offset + limit])
+
+    def _count_rows(self) -> int:
+        return len(self._rows)
+
+    def _load_page(self, page_no: int) -> List[tuple]:
+        start = page_no * self.page_size
+        return list(self._rows[start : start + self.page_size])
+
+
+class QueryRowSource(RowSource):
+    """
+    基于SQL查询的分页数据源。
+    顺序翻页时沿用同一个游标继续 fetchmany，跳转时用 LIMIT/OFFSET 重新定位。
+    """
+
+    # 向前跳转的距离在此页数以内时直接沿游标读取，而不是重新执行查询
+    SKIP_AHEAD_PAGES = 4
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        sql: str,
+        params: Sequence[Any] = (),
+        count_sql: Optional[str] = None,
+        page_size: int = 200,
+        max_pages: int = 8,
+        cursor: Optional[sqlite3.Cursor] = None,
+        profiler=None,
+        profile_label: str = "",
+    ):
+        self.conn = conn
+        self.profile_label = profile_label
+        self.sql = sql.strip().rstrip(";").strip()
+        self.params = tuple(params)
+        self.count_sql = count_sql
+        self._cursor = cursor
+        self._cursor_pos = 0
+        if self._cursor is None:
+            self._cursor = conn.cursor()
+            self._cursor.execute(self.sql, self.params)
+        columns = [description[0] for description in self._cursor.description]
+        super().__init__(columns, page_size, max_pages)
+        self.profiler = profiler
+        # 立即读取第一页，保证首屏显示不依赖总行数
+        self._get_page(0)
+
+    @property
+    def expensive_count(self) -> bool:
+        return not self.count_sql
+
+    def _count_rows(self) -> int:
+        if self.count_sql:
+            cursor = self.conn.cursor()
+            cursor.execute(self.count_sql, self.params)
+            return cursor.fetchone()[0]
+        cursor = self.conn.cursor()
+        cursor.execute(f"SELECT COUNT(*) FROM ({self.sql})", self.params)
+        return cursor.fetchone()[0]
+
+    def _load_page(self, page_no: int) -> List[tuple]:
+        started = time.perf_counter()
+        rows = self._read_page(page_no)
+        if self.profiler is not None:
+            self.profiler.add_fetch(
+                self.profile_label, len(rows), time.perf_counter() - started
+            )
+        return rows
+
+    def _read_page(self, page_no: int) -> List[tuple]:
+        start = page_no * self.page_size
+        if (
+            self._cursor is not None
+            and self._cursor_pos <= start
+            and (start - self._cursor_pos <= self.SKIP_AHEAD_PAGES * self.page_size)
+        ):
+            while self._cursor_pos < start:
+                skipped = self._cursor.fetchmany(start - self._cursor_pos)
+                if not skipped:
+                    break
+                self._cursor_pos += len(skipped)
+        else:
+            self.release()
+            self._cursor = self.conn.cursor()
+            self._cursor.execute(
+                f"SELECT * FROM ({self.sql}) LIMIT -1 OFFSET ?", self.params + (start,)
+            )
+            self._cursor_pos = start
+        rows = self._cursor.fetchmany(self.page_size)
+        self._cursor_pos += len(rows)
+        if len(rows) < self.page_size:
+            # 结果已读完，顺便得到准确的总行数
+            if self._count is None and self._cursor_pos == start + len(rows):
+                self._count = self._cursor_pos
+            self.release()
+        return rows
+
+    def release(self):
+        if self._cursor is not None:
+            self._cursor.close()
+            self._cursor = None
+
+
+class TableRowSource(RowSource):
+    """
+    整表分页数据源，使用 SQLiteUtils.get_table_page 的键集分页。
+    已知各页起始令牌时直接按键定位，远距离跳转时先只扫描键列求出令牌。
+    query（TableQuery）指定显示的列、筛选条件和排序。
+    """
+
+    def __init__(
+        self,
+        logic,
+        table_name: str,
+        page_size: int = 200,
+        max_pages: int = 8,
+        query=None,
+    ):
+        self.logic = logic
+        self.table_name = table_name
+        self.query = query
+        # 页号 -> 该页的起始令牌
+        self._tokens: Dict[int, Any] = {0: None}
+        first = logic.get_table_page(table_name, None, page_size, query)
+        super().__init__(first["columns"], page_size, max_pages)
+        self.key_columns = logic.get_key_columns(table_name)
+        self._store(0, first)
+
+    def _count_rows(self) -> int:
+        return self.logic.count_rows(self.table_name, self.query)
+
+    def _store(self, page_no: int, page: Dict[str, Any]):
+        self._store_page(page_no, page["rows"], page["keys"])
+        if page["next_token"] is not None:
+            self._tokens[page_no + 1] = page["next_token"]
+        elif self._count is None:
+            self._count = page_no * self.page_size + len(page["rows"])
+
+    def invalidate(self, from_page: int = 0):
+        # from_page 的起始令牌是上一页最后一行的键，即使该行已删除也仍能定位
+        for page_no in [no for no in self._tokens if no > from_page]:
+            del self._tokens[page_no]
+        super().invalidate(from_page)
+
+    def _load_page(self, page_no: int) -> List[tuple]:
+        if page_no not in self._tokens:
+            nearest = max(no for no in self._tokens if no < page_no)
+            if page_no - nearest <= QueryRowSource.SKIP_AHEAD_PAGES:
+                for no in range(nearest, page_no):
+                    page = self.logic.get_table_page(
+                        self.table_name, self._tokens[no], self.page_size, self.query
+                    )
+                    self._store(no, page)
+                    if page["next_token"] is None:
+                        return []
+            else:
+                token = self.logic.get_page_token(
+                    self.table_name, page_no * self.page_size, self.query
+                )
+                if token is None:
+                    return []
+                self._tokens[page_no] = token
+        page = self.logic.get_table_page(
+            self.table_name, self._tokens[page_no], self.page_size, self.query
+        )
+        if page["next_token"] is not None:
+            self._tokens[page_no + 1] = page["next_token"]
+        self._keys[page_no] = page["keys"]
+        return page["rows"]
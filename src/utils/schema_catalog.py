@@ -0,0 +1,139 @@
+"""
+数据库结构目录
+缓存表、列、索引、外键和主键信息，PRAGMA schema_version 变化时才重新读取
+"""
+
+import sqlite3
+from typing import Optional, List, Dict, Any, Callable
+from .sql_helpers import quote_identifier
+
+
+class SchemaCatalog:
+    """
+    每张表的信息在首次访问时读取并缓存。
+    schema_version 在任何连接修改结构时都会递增，每次访问前比较一次即可判断缓存是否有效，
+    检查本身只读取文件头，开销与表的数量无关。
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        self._version: Optional[int] = None
+        # 名称 -> 对象类型（table/view），按 sqlite_master 中的顺序
+        self._objects: Optional[Dict[str, str]] = None
+        # (类别, 表名) -> 缓存值
+        self._cache: Dict[tuple, Any] = {}
+
+    def version(self) -> int:
+        """返回当前的 schema_version，与缓存时不同则清空缓存"""
+        version = self.conn.execute("PRAGMA schema_version").fetchone()[0]
+        if version != self._version:
+            self._version = version
+            self._objects = None
+            self._cache.clear()
+        return version
+
+    def invalidate(self):
+        self._version = None
+        self._objects = None
+        self._cache.clear()
+
+    def _get(self, kind: str, name: str, load: Callable[[], Any]) -> Any:
+        self.version()
+        key = (kind, name)
+        if key not in self._cache:
+            self._cache[key] = load()
+        return self._cache[key]
+
+    def cached(self, kind: str, name: str, load: Callable[[], Any]) -> Any:
+        """按 (kind, name) 缓存派生信息（如分页键），结构变化时一并失效"""
+        return self._get(kind, name, load)
+
+    def objects(self) -> Dict[str, str]:
+        self.version()
+        if self._objects is None:
+            cursor = self.conn.execute(
+                "SELECT name, type FROM sqlite_master WHERE type IN ('table', 'view')"
+            )
+            self._objects = {name: object_type for name, object_type in cursor}
+        return self._objects
+
+    def tables(self) -> List[str]:
+        return [name for name, kind in self.objects().items() if kind == "table"]
+
+    def object_type(self, name: str) -> Optional[str]:
+        return self.objects().get(name)
+
+    def columns(self, table_name: str) -> List[Dict[str, Any]]:
+        def load():
+            cursor = self.conn.execute(
+                f"PRAGMA table_info({quote_identifier(table_name)})"
+            )
+            return [
+                {
+                    "cid": col[0],
+                    "name": col[1],
+                    "data_type": col[2],
+                    "not_null": col[3],
+                    "default_value": col[4],
+                    "pk": col[5],
+                }
+                for col in cursor.fetchall()
+            ]
+
+        return self._get("columns", table_name, load)
+
+    def primary_key(self, table_name: str) -> List[str]:
+        """主键列名，按在主键中的顺序；没有声明主键时为空列表"""
+
+        def load():
+            pk_columns = sorted(
+                (col for col in self.columns(table_name) if col["pk"]),
+                key=lambda col: col["pk"],
+            )
+            return [col["name"] for col in pk_columns]
+
+        return self._get("primary_key", table_name, load)
+
+    def indexes(self, table_name: str) -> List[Dict[str, Any]]:
+        def load():
+            result = []
+            cursor = self.conn.execute(
+                f"PRAGMA index_list({quote_identifier(table_name)})"
+            )
+            for index in cursor.fetchall():
+                name, unique, origin, partial = index[1], index[2], index[3], index[4]
+                index_columns = self.conn.execute(
+                    f"PRAGMA index_info({quote_identifier(name)})"
+                ).fetchall()
+                result.append(
+                    {
+                        "name": name,
+                        "unique": bool(unique),
+                        "origin": origin,
+                        "partial": bool(partial),
+                        "columns": [col[2] for col in index_columns],
+                    }
+                )
+            return result
+
+        return self._get("indexes", table_name, load)
+
+    def foreign_keys(self, table_name: str) -> List[Dict[str, Any]]:
+        def load():
+            cursor = self.conn.execute(
+                f"PRAGMA foreign_key_list({quote_identifier(table_name)})"
+            )
+            return [
+                {
+                    "id": fk[0],
+                    "seq": fk[1],
+                    "table": fk[2],
+                    "from": fk[3],
+                    "to": fk[4],
+                    "on_update": fk[5],
+                    "on_delete": fk[6],
+                }
+                for fk in cursor.fetchall()
+            ]
+
+        return self._get("foreign_keys", table_name, load)
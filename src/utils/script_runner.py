@@ -0,0 +1,183 @@
+"""
+SQL脚本执行
+用 sqlite3.complete_statement 拆分多条语句，在一个事务中逐条执行并记录每条语句的耗时和行数
+"""
+
+import re
+import sqlite3
+import time
+from typing import Optional, List, Dict, Any, Callable
+
+from .row_source import _LEADING_COMMENTS
+from .result_set import ResultSet
+
+# 自行控制事务或不能在事务中执行的语句，含有这些语句的脚本不再包装在一个事务中
+_TRANSACTION_KEYWORDS = (
+    "BEGIN",
+    "COMMIT",
+    "END",
+    "ROLLBACK",
+    "SAVEPOINT",
+    "RELEASE",
+    "VACUUM",
+)
+
+
+class ScriptError(Exception):
+    """脚本中某条语句执行失败，之前的修改已回滚；results 为失败前各语句的执行记录"""
+
+    def __init__(
+        self,
+        index: int,
+        statement: str,
+        results: List[Dict[str, Any]],
+        error: Exception,
+    ):
+        super().__init__(f"第 {index + 1} 条语句执行失败: {error}")
+        self.index = index
+        self.statement = statement
+        self.results = results
+
+
+def _first_keyword(statement: str) -> str:
+    body = _LEADING_COMMENTS.sub("", statement, count=1)
+    match = re.match(r"[A-Za-z]+", body)
+    return match.group(0).upper() if match else ""
+
+
+def split_statements(sql: str) -> List[str]:
+    """
+    按分号拆分为完整的语句，字符串、注释和触发器中的分号不会被误拆。
+    末尾没有分号的语句也作为一条语句返回，只含注释或空白的部分被忽略。
+    """
+    statements: List[str] = []
+    current = ""
+    for part in sql.split(";"):
+        current += part + ";"
+        if sqlite3.complete_statement(current):
+            if _first_keyword(current):
+                statements.append(current.strip())
+            current = ""
+    # split 在末尾多加了一个分号
+    current = current[:-1]
+    if _first_keyword(current):
+        statements.append(current.strip())
+    return statements
+
+
+def controls_transaction(statements: List[str]) -> bool:
+    return any(
+        _first_keyword(statement) in _TRANSACTION_KEYWORDS for statement in statements
+    )
+
+
+# WITH 语句的主体可能是 INSERT/UPDATE/DELETE，含有这些关键字时视为写操作
+_WRITE_KEYWORDS = re.compile(r"\b(?:INSERT|UPDATE|DELETE|REPLACE)\b", re.I)
+
+
+def is_read_only(statement: str) -> bool:
+    """
+    保守地判断语句是否只读：SELECT、VALUES、EXPLAIN，以及不含写操作关键字的 WITH。
+    PRAGMA 等其他语句一律视为可能写入
+    """
+    keyword = _first_keyword(statement)
+    if keyword in ("SELECT", "VALUES", "EXPLAIN"):
+        return True
+    return keyword == "WITH" and not _WRITE_KEYWORDS.search(statement)
+
+
+def run_script(
+    conn: sqlite3.Connection,
+    sql: str,
+    fast: bool = False,
+    progress: Optional[Callable[[int, int], None]] = None,
+) -> Dict[str, Any]:
+    """
+    执行多条语句。脚本不自行控制事务时全部语句在一个事务中执行，任何一条失败则整体回滚。
+    fast 为 True 时用 executescript 一次执行，只记录总耗时和修改的行数。
+    返回 statements（每条语句的 sql、seconds、rows_affected、rows_returned）、总耗时 seconds，
+    最后一条查询语句的结果放在 columns/rows 中。
+    progress(已完成语句数, 总语句数) 在每条语句执行后调用。
+    """
+    statements = split_statements(sql)
+    wrap = not controls_transaction(statements)
+    if conn.in_transaction:
+        conn.commit()
+    # 关闭 sqlite3 模块的隐式事务，事务完全由这里或脚本自身的 BEGIN/COMMIT 控制
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None
+    try:
+        return _run_statements(conn, sql, statements, wrap, fast, progress)
+    finally:
+        conn.isolation_level = isolation_level
+
+
+def _run_statements(
+    conn: sqlite3.Connection,
+    sql: str,
+    statements: List[str],
+    wrap: bool,
+    fast: bool,
+    progress: Optional[Callable[[int, int], None]],
+) -> Dict[str, Any]:
+    started = time.perf_counter()
+    result: Dict[str, Any] = {"statements": []}
+
+    if fast:
+        changes = conn.total_changes
+        script = ";\n".join(statement.rstrip(";") for statement in statements)
+        try:
+            conn.executescript(f"BEGIN;\n{script};\nCOMMIT;" if wrap else script)
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.rollback()
+            raise ScriptError(0, sql, [], e) from e
+        seconds = time.perf_counter() - started
+        result["statements"].append(
+            {
+                "sql": f"executescript（{len(statements)} 条语句）",
+                "seconds": seconds,
+                "rows_affected": conn.total_changes - changes,
+                "rows_returned": None,
+            }
+        )
+        result["seconds"] = seconds
+        return result
+
+    log = result["statements"]
+    cursor = conn.cursor()
+    try:
+        if wrap:
+            conn.execute("BEGIN")
+        for index, statement in enumerate(statements):
+            statement_started = time.perf_counter()
+            try:
+                cursor.execute(statement)
+                rows_returned = None
+                if cursor.description:
+                    rows = ResultSet.from_cursor(cursor)
+                    rows_returned = len(rows)
+                    result["columns"] = rows.columns
+                    result["rows"] = rows
+            except sqlite3.Error as e:
+                raise ScriptError(index, statement, log, e) from e
+            log.append(
+                {
+                    "sql": statement,
+                    "seconds": time.perf_counter() - statement_started,
+                    "rows_affected": cursor.rowcount if cursor.rowcount >= 0 else None,
+                    "rows_returned": rows_returned,
+                }
+            )
+            if progress:
+                progress(index + 1, len(statements))
+        if conn.in_transaction:
+            conn.commit()
+    except BaseException:
+        if conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    result["seconds"] = time.perf_counter() - started
+    return result
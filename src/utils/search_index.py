@@ -0,0 +1,326 @@
+"""
+全文检索索引
+索引存放在数据库旁边的附属文件（<数据库>-search）中，不修改原数据库。
+每个源行在 FTS5 表中对应一行，内容为该行各文本列的值；trigram 分词支持任意子串检索，
+检索只需查一次索引，不必逐表 LIKE 扫描
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+from typing import List, Dict, Any
+from .sql_helpers import quote_identifier, like_escape
+
+# 依次尝试的分词器：trigram（SQLite 3.34+）支持子串检索，unicode61 只支持词和词前缀
+TOKENIZERS = ("trigram", "unicode61")
+
+# trigram 分词检索的最短字符数，更短的词改为扫描索引内容
+MIN_TRIGRAM_LENGTH = 3
+
+# 同步时每批读取的源行数（查询已有摘要时每个键占一个参数）
+SYNC_BATCH_SIZE = 500
+
+
+def _snippet(content: str, term: str, width: int = 30) -> str:
+    """content 中 term 附近的片段，匹配部分用 [] 标出"""
+    position = content.lower().find(term.lower())
+    if position < 0:
+        return content[: width * 2]
+    start = max(0, position - width)
+    end = position + len(term)
+    snippet = (
+        content[start:position]
+        + "["
+        + content[position:end]
+        + "]"
+        + content[end : end + width]
+    )
+    return ("…" if start > 0 else "") + snippet
+
+
+def _digest(content: str) -> int:
+    """行内容的64位摘要，用于判断行是否变化"""
+    digest = hashlib.blake2b(content.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big", signed=True)
+
+
+def _file_fingerprint(db_path: str) -> str:
+    """数据库文件及其 WAL 文件的大小和修改时间，未变化说明自上次同步以来没有提交"""
+    parts = []
+    for path in (db_path, db_path + "-wal"):
+        try:
+            stat = os.stat(path)
+            parts.append([stat.st_size, stat.st_mtime_ns])
+        except OSError:
+            parts.append(None)
+    return json.dumps(parts)
+
+
+def is_text_column(declared_type: str) -> bool:
+    """按SQLite的类型亲和性规则判断列是否为文本列（未声明类型的列也可能存放文本）"""
+    declared_type = (declared_type or "").upper()
+    if not declared_type:
+        return True
+    if "INT" in declared_type:
+        return False
+    return any(name in declared_type for name in ("CHAR", "CLOB", "TEXT"))
+
+
+class SearchIndex:
+    """
+    一个连接对应一个附属索引文件，连接只能在创建它的线程中使用。
+    search_tables 记录已编入索引的表、列和同步时的文件指纹；
+    search_rows 记录每个源行的键和内容摘要，其 id 即 FTS 表中的 rowid
+    """
+
+    def __init__(self, index_path: str):
+        self.index_path = index_path
+        self.conn = sqlite3.connect(index_path)
+        # WAL 模式下后台同步写入时界面线程仍可检索
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.execute("PRAGMA synchronous = NORMAL")
+        self.tokenizer = self._create_schema()
+
+    def _create_schema(self) -> str:
+        conn = self.conn
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_meta (name TEXT PRIMARY KEY, value TEXT)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_tables ("
+            "tbl TEXT PRIMARY KEY, columns TEXT, key_columns TEXT, fingerprint TEXT)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS search_rows ("
+            "id INTEGER PRIMARY KEY, tbl TEXT NOT NULL, key TEXT NOT NULL, "
+            "digest INTEGER NOT NULL, UNIQUE (tbl, key))"
+        )
+        row = conn.execute(
+            "SELECT value FROM search_meta WHERE name = 'tokenizer'"
+        ).fetchone()
+        if row is not None:
+            conn.commit()
+            return row[0]
+        for tokenizer in TOKENIZERS:
+            try:
+                conn.execute(
+                    "CREATE VIRTUAL TABLE search_fts "
+                    f"USING fts5(content, tokenize='{tokenizer}')"
+                )
+            except sqlite3.OperationalError as e:
+                if "no such module" in str(e):
+                    raise Exception("当前SQLite未编译FTS5，无法使用全文检索")
+                continue
+            conn.execute(
+                "INSERT INTO search_meta (name, value) VALUES ('tokenizer', ?)",
+                (tokenizer,),
+            )
+            conn.commit()
+            return tokenizer
+        raise Exception("当前SQLite不支持FTS5分词器，无法使用全文检索")
+
+    def indexed_tables(self) -> Dict[str, List[str]]:
+        """已编入索引的 表名 -> 文本列"""
+        return {
+            table: json.loads(columns)
+            for table, columns in self.conn.execute(
+                "SELECT tbl, columns FROM search_tables ORDER BY tbl"
+            )
+        }
+
+    def indexed_rows(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM search_rows").fetchone()[0]
+
+    def remove_table(self, table_name: str):
+        conn = self.conn
+        with conn:
+            conn.execute(
+                "DELETE FROM search_fts WHERE rowid IN "
+                "(SELECT id FROM search_rows WHERE tbl = ?)",
+                (table_name,),
+            )
+            conn.execute("DELETE FROM search_rows WHERE tbl = ?", (table_name,))
+            conn.execute("DELETE FROM search_tables WHERE tbl = ?", (table_name,))
+
+    def sync_table(
+        self,
+        source: sqlite3.Connection,
+        db_path: str,
+        table_name: str,
+        columns: List[str],
+        key_columns: List[str],
+    ) -> Dict[str, int]:
+        """
+        增量同步一张表：文件指纹未变时直接跳过；否则读取键列和文本列，
+        只写入摘要变化的行并删除已不存在的行。返回 {added, updated, removed, skipped}
+        """
+        counts = {"added": 0, "updated": 0, "removed": 0, "skipped": 0}
+        conn = self.conn
+        fingerprint = _file_fingerprint(db_path)
+        state = conn.execute(
+            "SELECT columns, key_columns, fingerprint FROM search_tables WHERE tbl = ?",
+            (table_name,),
+        ).fetchone()
+        if state == (json.dumps(columns), json.dumps(key_columns), fingerprint):
+            counts["skipped"] = 1
+            return counts
+        if state is not None and state[1] != json.dumps(key_columns):
+            # 键列变化后原来的键都已失效，重建该表的索引
+            self.remove_table(table_name)
+            state = None
+
+        key_count = len(key_columns)
+        select_list = ", ".join(
+            key_columns + [quote_identifier(name) for name in columns]
+        )
+        cursor = source.execute(
+            f"SELECT {select_list} FROM {quote_identifier(table_name)} "
+            f"ORDER BY {', '.join(key_columns)}"
+        )
+        fresh = state is None
+        next_id = conn.execute("SELECT IFNULL(MAX(id), 0) + 1 FROM search_rows")
+        next_id = next_id.fetchone()[0]
+        try:
+            conn.execute("BEGIN")
+            if not fresh:
+                conn.execute(
+                    "CREATE TEMP TABLE IF NOT EXISTS seen_ids (id INTEGER PRIMARY KEY)"
+                )
+                conn.execute("DELETE FROM temp.seen_ids")
+            while True:
+                batch = cursor.fetchmany(SYNC_BATCH_SIZE)
+                if not batch:
+                    break
+                entries = []
+                for row in batch:
+                    content = "\n".join(
+                        str(value) for value in row[key_count:] if value is not None
+                    )
+                    if not content:
+                        continue
+                    try:
+                        key = json.dumps(list(row[:key_count]))
+                    except TypeError:
+                        # 键为BLOB的行无法定位，不编入索引
+                        continue
+                    entries.append((key, content, _digest(content)))
+                existing = {}
+                if not fresh and entries:
+                    placeholders = ", ".join("?" for _ in entries)
+                    existing = {
+                        key: (row_id, digest)
+                        for key, row_id, digest in conn.execute(
+                            "SELECT key, id, digest FROM search_rows "
+                            f"WHERE tbl = ? AND key IN ({placeholders})",
+                            [table_name] + [entry[0] for entry in entries],
+                        )
+                    }
+                inserts, updates = [], []
+                for key, content, digest in entries:
+                    if key in existing:
+                        row_id, old_digest = existing[key]
+                        if old_digest != digest:
+                            updates.append((row_id, content, digest))
+                    else:
+                        inserts.append((next_id, key, content, digest))
+                        next_id += 1
+                if inserts:
+                    conn.executemany(
+                        "INSERT INTO search_rows (id, tbl, key, digest) "
+                        "VALUES (?, ?, ?, ?)",
+                        [(i, table_name, key, d) for i, key, _, d in inserts],
+                    )
+                    conn.executemany(
+                        "INSERT INTO search_fts (rowid, content) VALUES (?, ?)",
+                        [(i, content) for i, _, content, _ in inserts],
+                    )
+                if updates:
+                    conn.executemany(
+                        "UPDATE search_rows SET digest = ? WHERE id = ?",
+                        [(d, i) for i, _, d in updates],
+                    )
+                    conn.executemany(
+                        "UPDATE search_fts SET content = ? WHERE rowid = ?",
+                        [(content, i) for i, content, _ in updates],
+                    )
+                if not fresh:
+                    conn.executemany(
+                        "INSERT INTO temp.seen_ids (id) VALUES (?)",
+                        [(row_id,) for row_id, _ in existing.values()],
+                    )
+                counts["added"] += len(inserts)
+                counts["updated"] += len(updates)
+            if not fresh:
+                stale = (
+                    "SELECT id FROM search_rows WHERE tbl = ? "
+                    "AND id NOT IN (SELECT id FROM temp.seen_ids)"
+                )
+                conn.execute(
+                    f"DELETE FROM search_fts WHERE rowid IN ({stale})", (table_name,)
+                )
+                removed = conn.execute(
+                    f"DELETE FROM search_rows WHERE id IN ({stale})", (table_name,)
+                )
+                counts["removed"] = removed.rowcount
+            conn.execute(
+                "INSERT OR REPLACE INTO search_tables "
+                "(tbl, columns, key_columns, fingerprint) VALUES (?, ?, ?, ?)",
+                (table_name, json.dumps(columns), json.dumps(key_columns), fingerprint),
+            )
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            cursor.close()
+        return counts
+
+    def _match_expression(self, terms: List[str]) -> str:
+        """每个词作为一个短语，多个词须同时出现；unicode61 分词时按词前缀匹配"""
+        suffix = "*" if self.tokenizer == "unicode61" else ""
+        return " ".join('"' + term.replace('"', '""') + '"' + suffix for term in terms)
+
+    def search(self, text: str, limit: int = 200) -> List[Dict[str, Any]]:
+        """
+        检索包含 text 中所有词的行（不区分大小写），按相关度排序，
+        返回 [{table, key, snippet}]，key 为源表的键值元组
+        """
+        terms = text.split()
+        if not terms:
+            return []
+        if self.tokenizer != "trigram" or all(
+            len(term) >= MIN_TRIGRAM_LENGTH for term in terms
+        ):
+            cursor = self.conn.execute(
+                "SELECT r.tbl, r.key, "
+                "snippet(search_fts, 0, '[', ']', '…', 48) "
+                "FROM search_fts JOIN search_rows AS r ON r.id = search_fts.rowid "
+                "WHERE search_fts MATCH ? ORDER BY rank LIMIT ?",
+                (self._match_expression(terms), limit),
+            )
+            rows = cursor.fetchall()
+        else:
+            # trigram 无法检索不足3个字符的词，改为扫描索引内容（仍只扫描一张表）
+            condition = " AND ".join("f.content LIKE ? ESCAPE '\\'" for _ in terms)
+            cursor = self.conn.execute(
+                "SELECT r.tbl, r.key, f.content "
+                "FROM search_fts AS f JOIN search_rows AS r ON r.id = f.rowid "
+                f"WHERE {condition} LIMIT ?",
+                [f"%{like_escape(term)}%" for term in terms] + [limit],
+            )
+            rows = [
+                (table, key, _snippet(content, terms[0]))
+                for table, key, content in cursor
+            ]
+        return [
+            {
+                "table": table,
+                "key": tuple(json.loads(key)),
+                "snippet": snippet.replace("\n", " "),
+            }
+            for table, key, snippet in rows
+        ]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,48 @@
+"""
+各模块共用的SQL辅助函数
+不依赖包内其他模块，任何模块都可以直接导入而不会产生循环导入
+"""
+
+import sqlite3
+from typing import Iterator, List, Optional
+
+
+def quote_identifier(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
+
+
+def rowid_alias(
+    conn: sqlite3.Connection, table_name: str, columns: Optional[List[str]] = None
+) -> Optional[str]:
+    """
+    表中指向真正 rowid 的别名（rowid、_rowid_ 或 oid）。与用户列同名的别名指向该列，
+    跳过；三个都被占用或表为 WITHOUT ROWID 时返回 None。columns 为小写的列名，省略时读取
+    """
+    table = quote_identifier(table_name)
+    if columns is None:
+        columns = [
+            row[1].lower() for row in conn.execute(f"PRAGMA table_info({table})")
+        ]
+    for alias in ("rowid", "_rowid_", "oid"):
+        if alias in columns:
+            continue
+        try:
+            conn.execute(f"SELECT {alias} FROM {table} LIMIT 0")
+        except sqlite3.OperationalError:
+            return None
+        return alias
+    return None
+
+
+def like_escape(value: str) -> str:
+    """转义 LIKE 模式中的 \\、% 和 _，配合 ESCAPE '\\' 使用"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def cursor_batches(cursor: sqlite3.Cursor, batch_size: int) -> Iterator[List[tuple]]:
+    """以 fetchmany 分批产出游标的全部结果"""
+    while True:
+        rows = cursor.fetchmany(batch_size)
+        if not rows:
+            break
+        yield rows
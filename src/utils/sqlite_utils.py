@@ -1,94 +1,1021 @@
+import os
+import shutil
 import sqlite3
-from typing import Optional, List, Dict, Any
+import tempfile
+import time
+import weakref
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Tuple, Union, Callable, Sequence
+from .row_source import (
+    RowSource,
+    ListRowSource,
+    QueryRowSource,
+    TableRowSource,
+    is_wrappable_query,
+)
+from .query_worker import QueryWorker
+from .sql_helpers import quote_identifier, rowid_alias
+from .schema_catalog import SchemaCatalog
+from .change_buffer import ChangeBuffer
+from .script_runner import split_statements, run_script
+from .result_cache import ResultCache, normalize_sql
+from .profiler import Profiler
+from .table_query import TableQuery
+from .table_stats import TableStats, estimate_row_count, table_sizes
+from .search_index import SearchIndex, is_text_column
+from .column_profile import profile_table
+from .result_set import ResultSet
+from .query_plan import (
+    explain_query_plan,
+    suggest_indexes,
+    verify_suggestion,
+    expert_recommendations,
+)
+
+# 在线备份每一步复制的页数，步与步之间其他连接可以继续写入
+BACKUP_PAGES_PER_STEP = 1024
+
+# 备份进度回调：(状态, 剩余页数, 总页数)
+BackupProgress = Callable[[int, int, int], None]
+
+# 性能配置。journal_mode 为 None 表示保持文件当前的日志模式。
+# 打开数据库时只应用连接级的设置，日志模式只在用户明确选择配置时切换：
+# WAL 模式会写入数据库文件，之后用其他程序打开时仍为 WAL。
+PERFORMANCE_PROFILES: Dict[str, Dict[str, Any]] = {
+    "safe": {
+        "journal_mode": None,
+        "synchronous": "FULL",
+        "mmap_size": 0,
+        "cache_size": -2000,
+        "temp_store": "DEFAULT",
+        "busy_timeout": 5000,
+    },
+    "read-heavy": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -64 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    "bulk-load": {
+        "journal_mode": "MEMORY",
+        "synchronous": "OFF",
+        "mmap_size": 256 * 1024 * 1024,
+        "cache_size": -256 * 1024,
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+}
+DEFAULT_PROFILE = "safe"
+
+# 每个连接缓存的预编译语句数（sqlite3 默认为 128），反复执行的仪表盘查询无需重新编译
+STATEMENT_CACHE_SIZE = 512
+
+# 键集分页的页令牌：按键分页时为上一页最后一行的键值，回退到 OFFSET 分页时为行偏移
+PageToken = Union[None, Tuple[Any, ...], int]
+
+
+def connect_readonly(db_path: str, **kwargs) -> sqlite3.Connection:
+    """以只读URI方式打开数据库，其余参数传给 sqlite3.connect"""
+    # urllib.request 导入较慢（会加载 http/ssl），只在这里用到
+    from urllib.request import pathname2url
+
+    uri = f"file:{pathname2url(os.path.abspath(db_path))}?mode=ro"
+    return sqlite3.connect(uri, uri=True, **kwargs)
+
+
+def backup_to_file(
+    source: sqlite3.Connection,
+    target_file: str,
+    pages: int = BACKUP_PAGES_PER_STEP,
+    progress: Optional[BackupProgress] = None,
+):
+    """
+    用SQLite在线备份API把 source 复制到 target_file，得到一致的快照（包含WAL中已提交的内容）。
+    先写入同目录下的临时文件，成功后再替换目标文件。目标文件的权限与源文件相同
+    （与 shutil.copy2 一致），源为内存数据库时按 umask 设置。
+    """
+    source_path = source.execute("PRAGMA database_list").fetchone()[2]
+    target_dir = os.path.dirname(os.path.abspath(target_file))
+    fd, temp_path = tempfile.mkstemp(suffix=".tmp", dir=target_dir)
+    os.close(fd)
+    try:
+        target = sqlite3.connect(temp_path)
+        try:
+            source.backup(target, pages=pages, progress=progress)
+        finally:
+            target.close()
+        # mkstemp 创建的文件权限为 0600，替换前改为与普通新建文件相同
+        if source_path:
+            shutil.copymode(source_path, temp_path)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(temp_path, 0o666 & ~umask)
+        os.replace(temp_path, target_file)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
 
 
 class SQLiteUtils:
     def __init__(self):
         self.conn: Optional[sqlite3.Connection] = None
         self.current_db_path: Optional[str] = None
+        # 当前打开的分页数据源，执行其他语句前需要释放它们占用的游标
+        self._sources: "weakref.WeakSet[RowSource]" = weakref.WeakSet()
+        # 最近访问的分页结果，键为 (表名, 页令牌, 每页行数, 数据版本)
+        self._page_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self.page_cache_size = 64
+        # 表结构目录，按 schema_version 失效
+        self.catalog: Optional[SchemaCatalog] = None
+        # 后台查询线程，首次需要时创建
+        self.worker: Optional[QueryWorker] = None
+        # 统计表行数和大小、同步检索索引的后台线程，与查询线程分开，耗时的任务不会阻塞查询
+        self.stats_worker: Optional[QueryWorker] = None
+        # 各表的精确行数、磁盘占用和列数据概况，按数据版本失效
+        self.table_stats = TableStats()
+        # 本线程的全文检索索引连接，首次检索时打开
+        self.search_index: Optional[SearchIndex] = None
+        # 最近一次提交索引同步时的数据版本，之后数据有变化说明索引可能已过时
+        self.search_synced_version: Optional[Tuple[int, int]] = None
+        self.profile = DEFAULT_PROFILE
+        # 当前数据库是否以只读方式打开
+        self.readonly = False
+        # 查询结果缓存，execute_sql 指定 use_cache 时才创建
+        self.result_cache: Optional[ResultCache] = None
+        # 语句性能记录，启用后每次打开连接都会安装跟踪回调
+        self.profiler: Optional[Profiler] = None
+        self.profile_label = "主连接"
 
     def create_database(self, file_path: str):
         conn = sqlite3.connect(file_path)
         conn.close()
         self.open_database_file(file_path)
 
-    def open_database_file(self, file_path: str):
+    def open_database_file(
+        self, file_path: str, profile: Optional[str] = None, readonly: bool = False
+    ):
+        """打开数据库；readonly 为 True 时以只读方式打开（后台连接同样只读）"""
         if self.conn:
+            self.close_sources()
             self.conn.close()
-        self.conn = sqlite3.connect(file_path)
+        self.close_search_index()
+        if readonly:
+            self.conn = connect_readonly(
+                file_path, cached_statements=STATEMENT_CACHE_SIZE
+            )
+        else:
+            self.conn = sqlite3.connect(
+                file_path, cached_statements=STATEMENT_CACHE_SIZE
+            )
         self.current_db_path = file_path
+        self.readonly = readonly
+        if self.profiler is not None:
+            self.profiler.attach(self.conn, self.profile_label)
+        # 打开文件不能持久地改变它，因此不切换日志模式
+        self.apply_profile(profile or self.profile, journal_mode=False)
+        self._page_cache.clear()
+        if self.result_cache is not None:
+            self.result_cache.clear()
+        self.table_stats.clear()
+        self.catalog = SchemaCatalog(self.conn)
+
+    def apply_profile(self, profile: str, journal_mode: bool = True):
+        """
+        对当前连接应用性能配置（journal_mode、synchronous、mmap_size 等）。
+        journal_mode 为 False 时不切换日志模式（打开数据库和后台连接时）；
+        需要切换但无法切换时抛出异常，当前配置保持不变
+        """
+        if profile not in PERFORMANCE_PROFILES:
+            raise ValueError(f"未知的性能配置: {profile}")
+        if not self.conn:
+            self.profile = profile
+            return
+        settings = PERFORMANCE_PROFILES[profile]
+        self.conn.execute(f"PRAGMA busy_timeout={int(settings['busy_timeout'])}")
+        if journal_mode and settings["journal_mode"]:
+            # 只读文件或被其他连接占用时无法切换：报错且不改变当前配置
+            wanted = settings["journal_mode"]
+            try:
+                mode = self.conn.execute(f"PRAGMA journal_mode={wanted}").fetchone()[0]
+            except sqlite3.OperationalError as e:
+                raise Exception(f"无法把日志模式切换为 {wanted}: {e}") from None
+            if mode.lower() != wanted.lower():
+                raise Exception(f"无法把日志模式切换为 {wanted}，当前仍为 {mode}")
+        self.profile = profile
+        self.conn.execute(f"PRAGMA synchronous={settings['synchronous']}")
+        self.conn.execute(f"PRAGMA mmap_size={int(settings['mmap_size'])}")
+        self.conn.execute(f"PRAGMA cache_size={int(settings['cache_size'])}")
+        self.conn.execute(f"PRAGMA temp_store={settings['temp_store']}")
+        self._reopen_workers()
 
-    def import_database(self, source_file: str, target_file: str):
-        import shutil
+    def journal_mode(self) -> Optional[str]:
+        """
+        数据库文件实际的日志模式。打开数据库时不切换日志模式，
+        它可能与当前性能配置中的日志模式不同，直到用户明确选择配置
+        """
+        if not self.conn:
+            return None
+        return self.conn.execute("PRAGMA journal_mode").fetchone()[0]
 
-        shutil.copy2(source_file, target_file)
-        self.open_database_file(target_file)
+    def set_profiler(self, profiler: Optional[Profiler]):
+        """启用（或以 None 关闭）语句性能记录，后台连接随之重新打开"""
+        self.profiler = profiler
+        if self.conn:
+            if profiler is not None:
+                profiler.attach(self.conn, self.profile_label)
+            else:
+                Profiler.detach(self.conn)
+        self._reopen_workers()
 
-    def export_database(self, target_file: str):
-        import shutil
+    def _record_execute(self):
+        """不返回结果的语句执行完毕，记录它的结束时间"""
+        if self.profiler is not None:
+            self.profiler.finish(self.profile_label)
 
+    def _record_fetch(self, rows: int, started: float):
+        if self.profiler is not None:
+            self.profiler.add_fetch(
+                self.profile_label, rows, time.perf_counter() - started
+            )
+
+    def import_database(
+        self,
+        source_file: str,
+        target_file: str,
+        pages: int = BACKUP_PAGES_PER_STEP,
+        progress: Optional[BackupProgress] = None,
+    ):
+        source = connect_readonly(source_file)
+        try:
+            backup_to_file(source, target_file, pages, progress)
+        finally:
+            source.close()
+        self.open_database_file(target_file)
+
+    def export_database(
+        self,
+        target_file: str,
+        pages: int = BACKUP_PAGES_PER_STEP,
+        progress: Optional[BackupProgress] = None,
+    ):
         if not self.conn or not self.current_db_path:
             raise Exception("请先打开一个数据库")
-        shutil.copy2(self.current_db_path, target_file)
+        if os.path.abspath(target_file) == os.path.abspath(self.current_db_path):
+            raise Exception("不能导出到当前打开的数据库文件")
+        self.release_sources()
+        backup_to_file(self.conn, target_file, pages, progress)
+
+    def schema_version(self) -> int:
+        """当前的 PRAGMA schema_version，任何连接修改结构后都会变化"""
+        if not self.conn:
+            return 0
+        return self.catalog.version()
 
     def get_tables(self) -> List[str]:
         if not self.conn:
             return []
-        cursor = self.conn.cursor()
-        cursor.execute("SELECT name FROM sqlite_master WHERE type='table';")
-        return [row[0] for row in cursor.fetchall()]
+        return list(self.catalog.tables())
 
     def get_table_structure(self, table_name: str) -> List[Dict[str, Any]]:
         if not self.conn:
             return []
-        cursor = self.conn.cursor()
-        cursor.execute(f"PRAGMA table_info({table_name})")
-        columns = cursor.fetchall()
-        return [
-            {
-                "cid": col[0],
-                "name": col[1],
-                "data_type": col[2],
-                "not_null": col[3],
-                "default_value": col[4],
-                "pk": col[5],
-            }
-            for col in columns
-        ]
+        return self.catalog.columns(table_name)
+
+    def get_primary_key(self, table_name: str) -> List[str]:
+        if not self.conn:
+            return []
+        return self.catalog.primary_key(table_name)
+
+    def get_indexes(self, table_name: str) -> List[Dict[str, Any]]:
+        if not self.conn:
+            return []
+        return self.catalog.indexes(table_name)
+
+    def get_foreign_keys(self, table_name: str) -> List[Dict[str, Any]]:
+        if not self.conn:
+            return []
+        return self.catalog.foreign_keys(table_name)
 
     def get_table_data(self, table_name: str, limit: int = 100) -> Dict[str, Any]:
         if not self.conn:
             return {"columns": [], "rows": []}
+        started = time.perf_counter()
         cursor = self.conn.cursor()
         cursor.execute(f"SELECT * FROM {table_name} LIMIT {limit}")
-        rows = cursor.fetchall()
-        column_names = [description[0] for description in cursor.description]
-        return {"columns": column_names, "rows": rows}
+        rows = ResultSet.from_cursor(cursor)
+        self._record_fetch(len(rows), started)
+        return {"columns": rows.columns, "rows": rows}
+
+    def data_version(self) -> Tuple[int, int]:
+        """
+        数据版本：PRAGMA data_version 反映其他连接提交的修改，
+        total_changes 反映本连接自身的修改，两者都不变说明数据未变。
+        """
+        if not self.conn:
+            return (0, 0)
+        version = self.conn.execute("PRAGMA data_version").fetchone()[0]
+        return (version, self.conn.total_changes)
+
+    def get_key_columns(self, table_name: str) -> List[str]:
+        """
+        返回用于键集分页的列：普通表使用 rowid，WITHOUT ROWID 表使用主键列，
+        两者都没有（如视图）时返回空列表，分页回退为 LIMIT/OFFSET。
+        """
+        if not self.conn:
+            return []
+        return self.catalog.cached(
+            "key_columns", table_name, lambda: self._find_key_columns(table_name)
+        )
+
+    def _find_key_columns(self, table_name: str) -> List[str]:
+        if self.catalog.object_type(table_name) not in (None, "table"):
+            return []
+        columns = [col["name"].lower() for col in self.get_table_structure(table_name)]
+        alias = rowid_alias(self.conn, table_name, columns)
+        if alias:
+            return [alias]
+        return [quote_identifier(name) for name in self.get_primary_key(table_name)]
+
+    def get_table_page(
+        self,
+        table_name: str,
+        token: PageToken = None,
+        page_size: int = 100,
+        query: Optional[TableQuery] = None,
+    ) -> Dict[str, Any]:
+        """
+        按 rowid/主键做键集分页（WHERE key > ? ORDER BY key LIMIT n）。
+        token 为 None 表示第一页，返回值中的 next_token 用于读取下一页，
+        读到末尾时 next_token 为 None。最近访问的页缓存在LRU中，数据未变时不再查询。
+        query 指定显示的列、筛选条件和排序；按其他列排序时改用 LIMIT/OFFSET 分页，
+        令牌为行偏移。
+        """
+        if not self.conn:
+            return {"columns": [], "rows": [], "keys": [], "next_token": None}
+        query_key = query.cache_key() if query is not None else None
+        cache_key = (table_name, query_key, token, page_size, self.data_version())
+        page = self._page_cache.get(cache_key)
+        if page is not None:
+            self._page_cache.move_to_end(cache_key)
+            return page
+
+        table = quote_identifier(table_name)
+        key_columns = self.get_key_columns(table_name)
+        select_list = query.select_list() if query is not None else "*"
+        condition, params = query.where() if query is not None else ("", [])
+        conditions = [condition] if condition else []
+        started = time.perf_counter()
+        cursor = self.conn.cursor()
+        if key_columns and not (query is not None and query.order_by):
+            key_list = ", ".join(key_columns)
+            sql = f"SELECT {key_list}, {select_list} FROM {table}"
+            if token is not None:
+                placeholders = ", ".join("?" for _ in key_columns)
+                conditions.append(f"({key_list}) > ({placeholders})")
+                params.extend(token)
+            if conditions:
+                sql += " WHERE " + " AND ".join(conditions)
+            sql += f" ORDER BY {key_list} LIMIT ?"
+            cursor.execute(sql, params + [page_size])
+            fetched = cursor.fetchall()
+            key_count = len(key_columns)
+            columns = [description[0] for description in cursor.description][key_count:]
+            keys = [tuple(row[:key_count]) for row in fetched]
+            rows = [tuple(row[key_count:]) for row in fetched]
+            next_token: PageToken = keys[-1] if len(rows) == page_size else None
+        else:
+            offset = token or 0
+            # 有键列时同样带出键，筛选排序后的结果仍可按键修改和删除
+            selected = ", ".join(key_columns + [select_list])
+            sql = f"SELECT {selected} FROM {table}"
+            if conditions:
+                sql += " WHERE " + " AND ".join(conditions)
+            if query is not None and query.order_by:
+                sql += f" ORDER BY {query.order_clause(key_columns)}"
+            cursor.execute(sql + " LIMIT ? OFFSET ?", params + [page_size, offset])
+            fetched = cursor.fetchall()
+            key_count = len(key_columns)
+            columns = [description[0] for description in cursor.description][key_count:]
+            keys = [tuple(row[:key_count]) for row in fetched] if key_count else []
+            rows = [tuple(row[key_count:]) for row in fetched] if key_count else fetched
+            next_token = offset + len(rows) if len(rows) == page_size else None
+        self._record_fetch(len(rows), started)
+
+        page = {
+            "columns": columns,
+            "rows": rows,
+            "keys": keys,
+            "token": token,
+            "next_token": next_token,
+        }
+        self._page_cache[cache_key] = page
+        while len(self._page_cache) > self.page_cache_size:
+            self._page_cache.popitem(last=False)
+        return page
+
+    def get_page_token(
+        self, table_name: str, offset: int, query: Optional[TableQuery] = None
+    ) -> PageToken:
+        """返回从第 offset 行开始的页令牌，只扫描键列，比读取整行便宜"""
+        if offset <= 0 or not self.conn:
+            return None
+        key_columns = self.get_key_columns(table_name)
+        if not key_columns or (query is not None and query.order_by):
+            return offset
+        key_list = ", ".join(key_columns)
+        condition, params = query.where() if query is not None else ("", [])
+        where = f" WHERE {condition}" if condition else ""
+        row = self.conn.execute(
+            f"SELECT {key_list} FROM {quote_identifier(table_name)}{where} "
+            f"ORDER BY {key_list} LIMIT 1 OFFSET ?",
+            params + [offset - 1],
+        ).fetchone()
+        return tuple(row) if row else None
 
-    def execute_query(self, table_name: str) -> Dict[str, Any]:
+    def count_rows(self, table_name: str, query: Optional[TableQuery] = None) -> int:
+        """精确行数；没有筛选条件时结果按数据版本缓存在表统计信息中"""
+        if not self.conn:
+            return 0
+        condition, params = query.where() if query is not None else ("", [])
+        version = None
+        if not condition:
+            version = self.data_version()
+            cached = self.table_stats.get(table_name, version)
+            if cached is not None and "rows" in cached:
+                return cached["rows"]
+        where = f" WHERE {condition}" if condition else ""
+        cursor = self.conn.cursor()
+        cursor.execute(
+            f"SELECT COUNT(*) FROM {quote_identifier(table_name)}{where}", params
+        )
+        count = cursor.fetchone()[0]
+        if version is not None:
+            self.table_stats.update(table_name, version, rows=count)
+        return count
+
+    def get_table_statistics(self, table_name: str) -> Dict[str, Any]:
+        """
+        立即返回表的统计信息 {rows, exact, source, bytes}：数据未变时为缓存的精确行数
+        （source 为 "count"），否则按 sqlite_stat1 或 rowid 范围估算（exact 为 False），
+        bytes 为最近一次统计的磁盘占用，从未统计时为 None
+        """
+        if not self.conn:
+            return {"rows": None, "exact": False, "source": None, "bytes": None}
+        cached = self.table_stats.get(table_name, self.data_version()) or {}
+        if "rows" in cached:
+            rows, source = cached["rows"], "count"
+        else:
+            rows, source = estimate_row_count(
+                self.conn, table_name, self.get_key_columns(table_name)
+            )
+        return {
+            "rows": rows,
+            "exact": source == "count",
+            "source": source,
+            "bytes": self.table_stats.last(table_name).get("bytes"),
+        }
+
+    def compute_table_statistics(
+        self, tables: Optional[List[str]] = None
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        统计各表的精确行数和磁盘占用（含索引，来自 dbstat），需要扫描整个数据库，
+        应在后台线程中调用。结果同时缓存在本连接的表统计信息中
+        """
+        if not self.conn:
+            return {}
+        tables = self.get_tables() if tables is None else tables
+        version = self.data_version()
+        sizes = table_sizes(self.conn)
+        result = {}
+        for table in tables:
+            result[table] = {"rows": self.count_rows(table), "bytes": sizes.get(table)}
+            self.table_stats.update(table, version, **result[table])
+        return result
+
+    def refresh_table_statistics(
+        self,
+        tables: List[str],
+        callback: Callable[[Dict[str, Dict[str, Any]]], None],
+        error_callback: Optional[Callable[[Exception], None]] = None,
+    ) -> int:
+        """
+        在统计线程中精确统计，完成后以提交时的数据版本缓存结果（期间数据有变化则自然失效），
+        再调用 callback(表名 -> 统计信息)。回调在界面线程 poll 统计线程时执行
+        """
+        version = self.data_version()
+        # 目录对象随每次打开数据库新建，据此忽略切换数据库之前提交的统计
+        catalog = self.catalog
+        tables = list(tables)
+
+        def done(stats):
+            if self.catalog is catalog:
+                for table, values in stats.items():
+                    self.table_stats.update(table, version, **values)
+            callback(stats)
+
+        return self.get_stats_worker().submit(
+            lambda logic: logic.compute_table_statistics(tables), done, error_callback
+        )
+
+    def profile_columns(self, table_name: str) -> Dict[str, Any]:
+        """
+        扫描一次表统计各列的数据概况（见 profile_table），应在后台线程中调用。
+        结果连同扫描得到的精确行数按数据版本缓存在本连接的表统计信息中
+        """
+        if not self.conn:
+            raise Exception("请先打开一个数据库")
+        version = self.data_version()
+        cached = self.table_stats.get(table_name, version)
+        if cached is not None and "profile" in cached:
+            return cached["profile"]
+        profile = profile_table(self.conn, table_name)
+        self.table_stats.update(
+            table_name, version, profile=profile, rows=profile["rows"]
+        )
+        return profile
+
+    def get_column_profile(self, table_name: str) -> Optional[Dict[str, Any]]:
+        """当前数据版本下已缓存的列数据概况，没有时返回 None"""
+        if not self.conn:
+            return None
+        cached = self.table_stats.get(table_name, self.data_version())
+        return cached.get("profile") if cached is not None else None
+
+    def refresh_column_profile(
+        self,
+        table_name: str,
+        callback: Callable[[Dict[str, Any]], None],
+        error_callback: Optional[Callable[[Exception], None]] = None,
+    ) -> int:
+        """在统计线程中统计列数据概况，完成后以提交时的数据版本缓存结果，再调用 callback(概况)"""
+        version = self.data_version()
+        catalog = self.catalog
+
+        def done(profile):
+            if self.catalog is catalog:
+                self.table_stats.update(
+                    table_name, version, profile=profile, rows=profile["rows"]
+                )
+            callback(profile)
+
+        return self.get_stats_worker().submit(
+            lambda logic: logic.profile_columns(table_name), done, error_callback
+        )
+
+    def search_index_path(self) -> Optional[str]:
+        """全文检索索引的附属文件（<数据库>-search），内存数据库没有"""
+        if not self.current_db_path or self.current_db_path == ":memory:":
+            return None
+        return f"{self.current_db_path}-search"
+
+    def has_search_index(self) -> bool:
+        """附属索引文件是否已存在（只打开数据库不会创建它）"""
+        path = self.search_index_path()
+        return path is not None and os.path.exists(path)
+
+    def get_search_index(self) -> SearchIndex:
+        """本线程使用的检索索引连接，首次需要时打开（不存在时新建附属文件）"""
+        path = self.search_index_path()
+        if path is None:
+            raise Exception("请先打开一个数据库")
+        if self.search_index is None:
+            self.search_index = SearchIndex(path)
+        return self.search_index
+
+    def close_search_index(self):
+        if self.search_index is not None:
+            self.search_index.close()
+            self.search_index = None
+        self.search_synced_version = None
+
+    def searchable_columns(self, table_name: str) -> List[str]:
+        """编入检索索引的列：文本亲和性的列和未声明类型的列（SQLite内部表没有）"""
+        if table_name.startswith("sqlite_"):
+            return []
+        return [
+            col["name"]
+            for col in self.get_table_structure(table_name)
+            if is_text_column(col["data_type"])
+        ]
+
+    def build_search_index(
+        self, tables: Optional[List[str]] = None, remove: Sequence[str] = ()
+    ) -> Dict[str, Dict[str, int]]:
+        """
+        增量同步检索索引，应在后台线程中调用。tables 为 None 时同步已编入索引的表；
+        remove 中的表、已删除的表和没有文本列或键的表从索引中移除。返回 表名 -> 同步计数
+        """
+        if not self.conn:
+            raise Exception("请先打开一个数据库")
+        index = self.get_search_index()
+        if tables is None:
+            tables = list(index.indexed_tables())
+        existing = set(self.get_tables())
+        for table in remove:
+            index.remove_table(table)
+        result = {}
+        for table in tables:
+            key_columns = self.get_key_columns(table) if table in existing else []
+            columns = self.searchable_columns(table) if key_columns else []
+            if not columns:
+                index.remove_table(table)
+                continue
+            result[table] = index.sync_table(
+                self.conn, self.current_db_path, table, columns, key_columns
+            )
+        return result
+
+    def update_search_index(
+        self,
+        tables: Optional[List[str]],
+        callback: Callable[[Dict[str, Dict[str, int]]], None],
+        error_callback: Optional[Callable[[Exception], None]] = None,
+        remove: Sequence[str] = (),
+    ) -> int:
+        """在统计线程中同步检索索引（见 build_search_index），完成后在界面线程调用 callback"""
+        self.search_synced_version = self.data_version()
+        tables = list(tables) if tables is not None else None
+        remove = list(remove)
+        return self.get_stats_worker().submit(
+            lambda logic: logic.build_search_index(tables, remove),
+            callback,
+            error_callback,
+        )
+
+    def search_index_stale(self) -> bool:
+        """自上次提交索引同步以来数据是否有变化（包括其他连接的修改）"""
+        return self.search_synced_version != self.data_version()
+
+    def search(self, text: str, limit: int = 200) -> List[Dict[str, Any]]:
+        """在检索索引中查找包含 text 的行，返回 [{table, key, snippet}]"""
+        return self.get_search_index().search(text, limit)
+
+    def get_row_position(self, table_name: str, key: Sequence[Any]) -> Optional[int]:
+        """键为 key 的行在按键排序的整表中的行号（与键集分页的顺序一致），行不存在时返回 None"""
+        if not self.conn:
+            return None
+        table = quote_identifier(table_name)
+        if not self.conn.execute(
+            f"SELECT 1 FROM {table} WHERE {self._key_condition(table_name)}",
+            list(key),
+        ).fetchone():
+            return None
+        key_list = ", ".join(self.get_key_columns(table_name))
+        placeholders = ", ".join("?" for _ in key)
+        return self.conn.execute(
+            f"SELECT COUNT(*) FROM {table} WHERE ({key_list}) < ({placeholders})",
+            list(key),
+        ).fetchone()[0]
+
+    def _key_condition(self, table_name: str) -> str:
+        """按 rowid/主键定位单行的 WHERE 条件，参数顺序与 get_key_columns 相同"""
+        key_columns = self.get_key_columns(table_name)
+        if not key_columns:
+            raise Exception(f"{table_name} 没有 rowid 或主键，无法定位记录")
+        return " AND ".join(f"{column} = ?" for column in key_columns)
+
+    def apply_changes(self, buffer: ChangeBuffer) -> Dict[str, int]:
+        """
+        在一个事务中提交缓冲区中的全部修改：修改相同列的记录合并为一次 executemany，
+        之后依次执行删除和添加。任何一条失败则整体回滚，缓冲区保持不变。
+        """
+        if not self.conn:
+            raise Exception("请先打开一个数据库")
+        table = quote_identifier(buffer.table_name)
+        condition = (
+            self._key_condition(buffer.table_name)
+            if buffer.updates or buffer.deletes
+            else ""
+        )
+        updates: Dict[Tuple[str, ...], List[List[Any]]] = {}
+        for key, values in buffer.updates.items():
+            names = tuple(values)
+            updates.setdefault(names, []).append(list(values.values()) + list(key))
+        inserts: Dict[Tuple[str, ...], List[List[Any]]] = {}
+        for values in buffer.inserts:
+            inserts.setdefault(tuple(values), []).append(list(values.values()))
+
+        self.release_sources()
+        if self.conn.in_transaction:
+            self.conn.commit()
+        counts = {"updated": 0, "deleted": 0, "inserted": 0}
+        try:
+            self.conn.execute("BEGIN")
+            for names, params in updates.items():
+                set_clause = ", ".join(
+                    f"{quote_identifier(name)} = ?" for name in names
+                )
+                cursor = self.conn.executemany(
+                    f"UPDATE {table} SET {set_clause} WHERE {condition}", params
+                )
+                counts["updated"] += cursor.rowcount
+                self._record_execute()
+            if buffer.deletes:
+                cursor = self.conn.executemany(
+                    f"DELETE FROM {table} WHERE {condition}",
+                    [list(key) for key in buffer.deletes],
+                )
+                counts["deleted"] += cursor.rowcount
+                self._record_execute()
+            for names, params in inserts.items():
+                column_list = ", ".join(quote_identifier(name) for name in names)
+                placeholders = ", ".join("?" for _ in names)
+                cursor = self.conn.executemany(
+                    f"INSERT INTO {table} ({column_list}) VALUES ({placeholders})",
+                    params,
+                )
+                counts["inserted"] += cursor.rowcount
+                self._record_execute()
+            self.conn.commit()
+        except BaseException:
+            self.conn.rollback()
+            raise
+        return counts
+
+    def submit_changes(
+        self,
+        buffer: ChangeBuffer,
+        reread: bool,
+        callback: Callable[[Dict[str, Any]], None],
+        error_callback: Optional[Callable[[Exception], None]] = None,
+    ) -> int:
+        """
+        在后台查询线程中提交缓冲区（见 apply_changes），reread 为 True 时随后按键重新读取
+        修改过的行的 buffer.columns 列。写入排在该线程释放游标之后，在它自己的连接上执行，
+        等待锁时界面不会卡住。回调在界面线程 poll 时执行，参数为 {"counts", "rows"}
+        """
+        if not self.conn:
+            raise Exception("请先打开一个数据库")
+        self.release_sources()
+        if self.conn.in_transaction:
+            self.conn.commit()
+
+        def run(logic):
+            counts = logic.apply_changes(buffer)
+            rows = {}
+            if reread:
+                rows = logic.get_rows_by_key(
+                    buffer.table_name, list(buffer.updates), buffer.columns
+                )
+            return {"counts": counts, "rows": rows}
+
+        return self.get_worker().submit(run, callback, error_callback)
+
+    def get_rows_by_key(
+        self,
+        table_name: str,
+        keys: Sequence[tuple],
+        columns: Optional[List[str]] = None,
+    ) -> Dict[tuple, tuple]:
+        """按键重新读取若干行（columns 为 None 时读取全部列），返回 键 -> 行，已不存在的键不在结果中"""
+        key_columns = self.get_key_columns(table_name)
+        if not self.conn or not key_columns or not keys:
+            return {}
+        key_list = ", ".join(key_columns)
+        key_count = len(key_columns)
+        row_values = "(" + ", ".join("?" for _ in key_columns) + ")"
+        # 每条语句的参数不超过SQLite的默认上限
+        chunk_size = max(1, 999 // key_count)
+        select_list = (
+            ", ".join(quote_identifier(name) for name in columns) if columns else "*"
+        )
+        result: Dict[tuple, tuple] = {}
+        keys = list(keys)
+        for start in range(0, len(keys), chunk_size):
+            chunk = keys[start : start + chunk_size]
+            cursor = self.conn.execute(
+                f"SELECT {key_list}, {select_list} FROM {quote_identifier(table_name)} "
+                f"WHERE ({key_list}) IN (VALUES "
+                + ", ".join(row_values for _ in chunk)
+                + ")",
+                [value for key in chunk for value in key],
+            )
+            for row in cursor:
+                result[tuple(row[:key_count])] = tuple(row[key_count:])
+        return result
+
+    def execute_query(
+        self, table_name: str, query: Optional[TableQuery] = None
+    ) -> Dict[str, Any]:
         if not self.conn:
             return {"columns": [], "rows": []}
+        started = time.perf_counter()
         cursor = self.conn.cursor()
-        cursor.execute(f"SELECT * FROM {table_name}")
-        rows = cursor.fetchall()
-        column_names = [description[0] for description in cursor.description]
-        return {"columns": column_names, "rows": rows}
+        if query is not None:
+            cursor.execute(*query.to_sql())
+        else:
+            cursor.execute(f"SELECT * FROM {table_name}")
+        rows = ResultSet.from_cursor(cursor)
+        self._record_fetch(len(rows), started)
+        return {"columns": rows.columns, "rows": rows}
+
+    def open_table_source(
+        self, table_name: str, query: Optional[TableQuery] = None
+    ) -> RowSource:
+        """以分页数据源的形式打开整张表（或 query 筛选排序后的结果），供虚拟表格按需读取"""
+        if not self.conn:
+            raise Exception("请先打开一个数据库")
+        if query is not None and query.is_plain():
+            query = None
+        source = TableRowSource(self, table_name, query=query)
+        source.profiler = self.profiler
+        self._sources.add(source)
+        return source
 
-    def execute_sql(self, sql: str) -> Dict[str, Any]:
+    def open_sql_source(self, sql: str) -> Dict[str, Any]:
+        """
+        执行SQL语句。查询语句返回 {"columns", "source"}，结果通过分页数据源按需读取；
+        其他语句返回 {"affected_rows"}。
+        """
         if not self.conn:
             raise Exception("请先打开一个数据库")
+        self.release_sources()
+        started = time.perf_counter()
         cursor = self.conn.cursor()
         cursor.execute(sql)
         if cursor.description:
-            column_names = [description[0] for description in cursor.description]
-            rows = cursor.fetchall()
-            return {"columns": column_names, "rows": rows}
+            if is_wrappable_query(sql):
+                source: RowSource = QueryRowSource(
+                    self.conn,
+                    sql,
+                    cursor=cursor,
+                    profiler=self.profiler,
+                    profile_label=self.profile_label,
+                )
+            else:
+                rows = ResultSet.from_cursor(cursor)
+                source = ListRowSource(rows.columns, rows)
+                self._record_fetch(source.row_count(), started)
+                source.profiler = self.profiler
+            self._sources.add(source)
+            return {"columns": source.columns, "source": source}
+        else:
+            self._record_execute()
+            self.conn.commit()
+            return {"affected_rows": cursor.rowcount}
+
+    def release_sources(self):
+        """释放所有分页数据源的游标，避免未完成的读取阻塞写入或DDL"""
+        for source in list(self._sources):
+            source.release()
+        if self.worker is not None:
+            self.worker.submit(lambda logic: logic.release_sources())
+
+    def close_sources(self):
+        for source in list(self._sources):
+            source.close()
+        self._sources = weakref.WeakSet()
+
+    def execute_script(self, sql: str, fast: bool = False) -> Dict[str, Any]:
+        """执行多条语句组成的脚本，返回每条语句的耗时和行数（见 run_script）"""
+        if not self.conn:
+            raise Exception("请先打开一个数据库")
+        self.release_sources()
+        return run_script(self.conn, sql, fast)
+
+    def _cache_version(self) -> tuple:
+        """结果缓存的校验版本：数据版本加上数据库文件和WAL文件的修改时间"""
+        mtimes = []
+        for path in (self.current_db_path, f"{self.current_db_path}-wal"):
+            try:
+                mtimes.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                mtimes.append(None)
+        return (self.data_version(), tuple(mtimes))
+
+    def execute_sql(
+        self, sql: str, params: Sequence[Any] = (), use_cache: bool = False
+    ) -> Dict[str, Any]:
+        """
+        执行SQL语句。use_cache 为 True 时查询结果按规范化的SQL和参数缓存，
+        数据库未变化时直接返回缓存的结果（带 "cached": True）。
+        rows 为按列存放的 ResultSet，缓存的结果与调用方共用，不应修改。
+        """
+        if not self.conn:
+            raise Exception("请先打开一个数据库")
+        cache_key = None
+        if use_cache:
+            if self.result_cache is None:
+                self.result_cache = ResultCache()
+            cache_key = (normalize_sql(sql), tuple(params))
+            version = self._cache_version()
+            cached = self.result_cache.get(cache_key, version)
+            if cached is not None:
+                return dict(cached, cached=True)
+        if len(split_statements(sql)) > 1:
+            result = self.execute_script(sql)
+            if "columns" in result:
+                return {"columns": result["columns"], "rows": result["rows"]}
+            return {
+                "affected_rows": sum(
+                    entry["rows_affected"] or 0 for entry in result["statements"]
+                )
+            }
+        self.release_sources()
+        changes = self.conn.total_changes
+        started = time.perf_counter()
+        cursor = self.conn.cursor()
+        cursor.execute(sql, params)
+        if cursor.description:
+            rows = ResultSet.from_cursor(cursor)
+            self._record_fetch(len(rows), started)
+            result = {"columns": rows.columns, "rows": rows}
+            # 只缓存没有修改数据的查询（排除 INSERT ... RETURNING 等）
+            if cache_key is not None and self.conn.total_changes == changes:
+                self.result_cache.put(cache_key, version, result)
+                return dict(result)
+            return result
         else:
+            self._record_execute()
             self.conn.commit()
             return {"affected_rows": cursor.rowcount}
 
+    def analyze_query(
+        self, sql: str, params: Sequence[Any] = (), use_expert: bool = False
+    ) -> Dict[str, Any]:
+        """
+        分析查询计划：返回 plan（计划节点）、suggestions（推荐索引，verified 表示
+        在复制的表结构上建立后查询计划确实使用了它），use_expert 时附带 .expert 的输出。
+        """
+        if not self.conn:
+            raise Exception("请先打开一个数据库")
+        if len(split_statements(sql)) > 1:
+            raise Exception("一次只能分析一条语句")
+        plan = explain_query_plan(self.conn, sql, params)
+        tables = set(self.get_tables())
+        table_columns: Dict[str, List[str]] = {}
+        existing_indexes: Dict[str, List[List[str]]] = {}
+        for table in tables:
+            if table.lower() in sql.lower():
+                table_columns[table] = [
+                    col["name"] for col in self.get_table_structure(table)
+                ]
+                existing_indexes[table] = [
+                    index["columns"] for index in self.get_indexes(table)
+                ]
+        suggestions = suggest_indexes(sql, plan, table_columns, existing_indexes)
+        for suggestion in suggestions:
+            suggestion["verified"] = verify_suggestion(self.conn, sql, suggestion)
+        expert = None
+        if use_expert and self.current_db_path:
+            expert = expert_recommendations(self.current_db_path, sql)
+        return {"plan": plan, "suggestions": suggestions, "expert": expert}
+
+    def get_worker(self) -> QueryWorker:
+        """返回当前数据库的后台查询线程，它使用自己的连接"""
+        if not self.current_db_path:
+            raise Exception("请先打开一个数据库")
+        if self.worker is None:
+            self.worker = QueryWorker(self._worker_opener())
+        return self.worker
+
+    def get_stats_worker(self) -> QueryWorker:
+        """返回统计表信息用的后台线程，它使用自己的连接"""
+        if not self.current_db_path:
+            raise Exception("请先打开一个数据库")
+        if self.stats_worker is None:
+            self.stats_worker = QueryWorker(self._worker_opener())
+        return self.stats_worker
+
+    def _reopen_workers(self):
+        for worker in (self.worker, self.stats_worker):
+            if worker is not None:
+                worker.reopen(self._worker_opener())
+
+    def _worker_opener(self):
+        db_path = self.current_db_path
+        profile = self.profile
+        profiler = self.profiler
+        readonly = self.readonly
+
+        def open_logic():
+            logic = SQLiteUtils()
+            logic.profiler = profiler
+            logic.profile_label = "后台连接"
+            logic.open_database_file(db_path, profile, readonly)
+            return logic
+
+        return open_logic
+
+    def stop_worker(self):
+        if self.worker is not None:
+            self.worker.close()
+            self.worker = None
+        if self.stats_worker is not None:
+            self.stats_worker.close()
+            self.stats_worker = None
+
     def close(self):
+        self.stop_worker()
+        self.close_search_index()
         if self.conn:
+            self.close_sources()
             self.conn.close()
             self.conn = None
+            self.catalog = None
             self.current_db_path = None
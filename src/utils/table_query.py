@@ -0,0 +1,121 @@
+"""
+表查询条件
+把选择的列、逐列的筛选条件和排序编译为参数化的 SELECT ... WHERE ... ORDER BY，
+由 SQLite 利用索引完成筛选和排序，只读取需要的列
+"""
+
+from typing import Optional, List, Any, Tuple
+from .sql_helpers import quote_identifier, like_escape
+
+# 筛选运算符 -> SQL 模板
+FILTER_OPERATORS = {
+    "=": "{column} = ?",
+    "!=": "{column} <> ?",
+    ">": "{column} > ?",
+    ">=": "{column} >= ?",
+    "<": "{column} < ?",
+    "<=": "{column} <= ?",
+    "包含": "{column} LIKE ? ESCAPE '\\'",
+    "开头为": "{column} LIKE ? ESCAPE '\\'",
+    "属于": "{column} IN ({placeholders})",
+    "为空": "{column} IS NULL",
+    "不为空": "{column} IS NOT NULL",
+}
+
+# 不需要输入值的运算符
+NO_VALUE_OPERATORS = ("为空", "不为空")
+
+
+class TableQuery:
+    """
+    columns 为要显示的列（None 表示全部），filters 为 (列名, 运算符, 值) 且以 AND 连接，
+    order_by 为 (列名, 是否降序)。值以文本绑定为参数，与列比较时按列的类型亲和性转换，
+    因此数字列上的 "> 25" 按数值比较。
+    """
+
+    def __init__(
+        self,
+        table_name: str,
+        columns: Optional[List[str]] = None,
+        filters: Optional[List[Tuple[str, str, Any]]] = None,
+        order_by: Optional[List[Tuple[str, bool]]] = None,
+    ):
+        self.table_name = table_name
+        self.columns = list(columns) if columns else None
+        self.filters = list(filters or [])
+        self.order_by = list(order_by or [])
+        for _, operator, _ in self.filters:
+            if operator not in FILTER_OPERATORS:
+                raise ValueError(f"不支持的筛选运算符: {operator}")
+
+    def is_plain(self) -> bool:
+        """没有任何条件，等同于 SELECT * FROM 表"""
+        return not (self.columns or self.filters or self.order_by)
+
+    def cache_key(self) -> tuple:
+        return (
+            tuple(self.columns) if self.columns else None,
+            tuple((c, o, str(v)) for c, o, v in self.filters),
+            tuple(self.order_by),
+        )
+
+    def referenced_columns(self) -> set:
+        """筛选和排序用到的列，这些列被修改后行可能不再满足条件或改变位置"""
+        return {column for column, _, _ in self.filters} | {
+            column for column, _ in self.order_by
+        }
+
+    def select_list(self) -> str:
+        if not self.columns:
+            return "*"
+        return ", ".join(quote_identifier(name) for name in self.columns)
+
+    def where(self) -> Tuple[str, List[Any]]:
+        """返回 (条件表达式, 参数)，没有条件时表达式为空字符串"""
+        conditions = []
+        params: List[Any] = []
+        for column, operator, value in self.filters:
+            template = FILTER_OPERATORS[operator]
+            if operator == "属于":
+                # 逗号分隔的多个值
+                values = [item.strip() for item in str(value).split(",")]
+                values = [item for item in values if item] or [""]
+                placeholders = ", ".join("?" for _ in values)
+                conditions.append(
+                    template.format(
+                        column=quote_identifier(column), placeholders=placeholders
+                    )
+                )
+                params.extend(values)
+                continue
+            conditions.append(template.format(column=quote_identifier(column)))
+            if operator == "包含":
+                params.append(f"%{like_escape(str(value))}%")
+            elif operator == "开头为":
+                params.append(f"{like_escape(str(value))}%")
+            elif operator not in NO_VALUE_OPERATORS:
+                params.append(value)
+        return " AND ".join(conditions), params
+
+    def order_clause(self, key_columns: Optional[List[str]] = None) -> str:
+        """排序列之后追加键列，使相同排序值的行顺序固定，分页不会重复或遗漏"""
+        terms = [
+            f"{quote_identifier(column)} {'DESC' if descending else 'ASC'}"
+            for column, descending in self.order_by
+        ]
+        terms += list(key_columns or [])
+        return ", ".join(terms)
+
+    def to_sql(self, limit: Optional[int] = None) -> Tuple[str, List[Any]]:
+        """完整的查询语句和参数，用于显示和一次性执行"""
+        sql = f"SELECT {self.select_list()} FROM {quote_identifier(self.table_name)}"
+        condition, params = self.where()
+        if condition:
+            sql += f" WHERE {condition}"
+        order = self.order_clause()
+        if order:
+            sql += f" ORDER BY {order}"
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(limit)
+        return sql, params
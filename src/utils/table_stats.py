@@ -0,0 +1,105 @@
+"""
+表统计信息
+行数估算（sqlite_stat1 或 rowid 范围）只需读取几页，可以立即得到；
+精确行数（COUNT(*)）和磁盘占用（dbstat）需要扫描整张表，在后台计算后按数据版本缓存
+"""
+
+import sqlite3
+from typing import Optional, List, Dict, Any, Tuple
+from .sql_helpers import quote_identifier
+
+# 表示 rowid 的键列，可以用 min/max(rowid) 估算行数
+_ROWID_ALIASES = ("rowid", "_rowid_", "oid")
+
+
+def estimate_row_count(
+    conn: sqlite3.Connection, table_name: str, key_columns: List[str]
+) -> Tuple[Optional[int], Optional[str]]:
+    """
+    返回 (估算行数, 来源)。优先使用 ANALYZE 生成的 sqlite_stat1，
+    否则按 max(rowid) - min(rowid) + 1 估算（删除过行时偏大），都不可用时返回 (None, None)。
+    """
+    try:
+        stats = conn.execute(
+            "SELECT stat FROM sqlite_stat1 WHERE tbl = ?", (table_name,)
+        ).fetchall()
+    except sqlite3.OperationalError:
+        # 没有执行过 ANALYZE
+        stats = []
+    counts = [
+        int(stat.split()[0]) for (stat,) in stats if stat and stat.split()[0].isdigit()
+    ]
+    if counts:
+        return max(counts), "sqlite_stat1"
+    if key_columns and key_columns[0] in _ROWID_ALIASES:
+        rowid = key_columns[0]
+        table = quote_identifier(table_name)
+        # 分成两个子查询才能各自只读取B树的一端
+        low, high = conn.execute(
+            f"SELECT (SELECT min({rowid}) FROM {table}), "
+            f"(SELECT max({rowid}) FROM {table})"
+        ).fetchone()
+        if low is None:
+            return 0, "rowid"
+        return high - low + 1, "rowid"
+    return None, None
+
+
+def table_sizes(conn: sqlite3.Connection) -> Dict[str, int]:
+    """
+    各表连同其索引占用的字节数，来自 dbstat 虚拟表（需要读取整个数据库文件）。
+    SQLite 未编译 dbstat 时返回空字典。
+    """
+    queries = (
+        # aggregate 列（SQLite 3.31+）让 dbstat 每个B树只返回一行
+        "SELECT m.tbl_name, SUM(s.pgsize) FROM dbstat AS s "
+        "JOIN sqlite_master AS m ON m.name = s.name "
+        "WHERE s.aggregate = TRUE GROUP BY m.tbl_name",
+        "SELECT m.tbl_name, SUM(s.pgsize) FROM dbstat AS s "
+        "JOIN sqlite_master AS m ON m.name = s.name GROUP BY m.tbl_name",
+    )
+    for sql in queries:
+        try:
+            return dict(conn.execute(sql).fetchall())
+        except sqlite3.OperationalError:
+            continue
+    return {}
+
+
+def format_size(size: Optional[int]) -> str:
+    if size is None:
+        return ""
+    for unit in ("B", "KB", "MB", "GB"):
+        if size < 1024 or unit == "GB":
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return ""
+
+
+class TableStats:
+    """表名 -> 统计信息（rows、bytes、profile），每项记录计算时的数据版本，版本变化后失效"""
+
+    def __init__(self):
+        self._entries: Dict[str, Tuple[Any, Dict[str, Any]]] = {}
+
+    def get(self, table_name: str, version: Any) -> Optional[Dict[str, Any]]:
+        entry = self._entries.get(table_name)
+        if entry is None or entry[0] != version:
+            return None
+        return entry[1]
+
+    def last(self, table_name: str) -> Dict[str, Any]:
+        """最近一次的统计值，不论数据是否已变化（用于显示大致的大小）"""
+        entry = self._entries.get(table_name)
+        return entry[1] if entry is not None else {}
+
+    def update(self, table_name: str, version: Any, **values):
+        """合并统计值；已有的条目属于其他数据版本时丢弃"""
+        entry = self._entries.get(table_name)
+        if entry is None or entry[0] != version:
+            entry = (version, {})
+            self._entries[table_name] = entry
+        entry[1].update(values)
+
+    def clear(self):
+        self._entries.clear()
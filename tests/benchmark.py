@@ -0,0 +1,397 @@
+"""
+SQLite3桌面工具性能测试
+按示例数据库的结构生成指定规模的数据库，在无界面的情况下测量常用操作的耗时和内存峰值，
+结果写入JSON文件，便于在不同版本之间比较
+
+用法示例：
+    python tests/benchmark.py --orders 1000000 --extra-columns 4 --output bench.json
+    python tests/benchmark.py --startup-only --startup-target-ms 300
+"""
+
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from create_sample_db import INDEX_LAYOUTS, create_synthetic_database  # noqa: E402
+from src.utils import SQLiteUtils, export_db_to_csv, export_db_to_xlsx  # noqa: E402
+from src.utils.sqlite_utils import quote_identifier  # noqa: E402
+from src.utils.column_profile import profile_table  # noqa: E402
+from src.utils.result_set import ResultSet  # noqa: E402
+
+try:
+    import resource
+except ImportError:  # Windows 没有 resource 模块
+    resource = None
+
+# 启动时不应加载的重量级依赖
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "pyarrow")
+
+# 启动测试中导入的模块：图形界面主程序和命令行入口
+STARTUP_MODULES = ("src.sqlite_tool", "src.cli")
+
+# 在新进程中导入模块，输出导入耗时和已加载的重量级依赖
+_STARTUP_SCRIPT = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+print(json.dumps({{
+    "import_seconds": time.perf_counter() - started,
+    "heavy_modules": [m for m in {heavy!r} if m in sys.modules],
+}}))
+"""
+
+
+def peak_rss_mb():
+    """进程迄今为止的内存峰值（MB），无法获取时返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 以 KB 为单位，macOS 以字节为单位
+    if sys.platform == "darwin":
+        peak /= 1024
+    return round(peak / 1024, 1)
+
+
+def measure(name, func, repeat):
+    """
+    执行 func 共 repeat 次，记录最短、中位数耗时和执行后的内存峰值。
+    func 返回处理的行数（没有行数时返回 None），用于计算每秒行数。
+    """
+    timings = []
+    rows = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        rows = func()
+        timings.append(time.perf_counter() - started)
+    best = min(timings)
+    result = {
+        "name": name,
+        "runs": repeat,
+        "seconds_min": round(best, 6),
+        "seconds_median": round(statistics.median(timings), 6),
+        "rows": rows,
+        "rows_per_second": round(rows / best) if rows and best > 0 else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    print(
+        f"{name:<28} {best * 1000:>10.2f} 毫秒"
+        f"  {rows if rows is not None else '-':>10} 行"
+        f"  峰值内存 {result['peak_rss_mb']} MB"
+    )
+    return result
+
+
+def measure_result_memory(name, conn, sql):
+    """
+    用 tracemalloc 比较同一查询结果存放为元组列表（fetchall）和 ResultSet 时占用的内存。
+    tracemalloc 会明显拖慢读取，因此不记录耗时
+    """
+    loaders = (
+        ("list_mb", lambda: conn.execute(sql).fetchall()),
+        ("result_set_mb", lambda: ResultSet.from_cursor(conn.execute(sql))),
+    )
+    result = {"name": name, "sql": sql}
+    for key, load in loaders:
+        gc.collect()
+        tracemalloc.start()
+        try:
+            rows = load()
+            result[key] = round(tracemalloc.get_traced_memory()[0] / 1024 / 1024, 1)
+        finally:
+            tracemalloc.stop()
+        result["rows"] = len(rows)
+        del rows
+    result["ratio"] = (
+        round(result["result_set_mb"] / result["list_mb"], 3)
+        if result["list_mb"]
+        else None
+    )
+    print(
+        f"{name:<28} 元组列表 {result['list_mb']:>8.1f} MB"
+        f"  ResultSet {result['result_set_mb']:>8.1f} MB"
+        f"  {result['rows']:>10} 行"
+    )
+    return result
+
+
+def measure_startup(module, repeat, target_ms):
+    """
+    在新的解释器进程中导入 module，测量进程总耗时（含解释器启动）和导入耗时。
+    第一次运行视为冷启动（操作系统的文件缓存无法在此清空，结果偏乐观）。
+    """
+    script = _STARTUP_SCRIPT.format(module=module, heavy=HEAVY_MODULES)
+    wall = []
+    imports = []
+    heavy = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        completed = subprocess.run(
+            [sys.executable, "-c", script],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        wall.append(time.perf_counter() - started)
+        output = json.loads(completed.stdout.strip().splitlines()[-1])
+        imports.append(output["import_seconds"])
+        heavy = output["heavy_modules"]
+    cold_ms = wall[0] * 1000
+    result = {
+        "name": f"startup ({module})",
+        "runs": repeat,
+        "cold_seconds": round(wall[0], 6),
+        "seconds_min": round(min(wall), 6),
+        "seconds_median": round(statistics.median(wall), 6),
+        "import_seconds_min": round(min(imports), 6),
+        "heavy_modules": heavy,
+        "target_ms": target_ms,
+        "passed": cold_ms <= target_ms and not heavy,
+    }
+    print(
+        f"启动 {module:<20} 冷启动 {cold_ms:>8.1f} 毫秒"
+        f"  导入 {min(imports) * 1000:>8.1f} 毫秒"
+        f"  目标 {target_ms} 毫秒  {'通过' if result['passed'] else '未通过'}"
+        + (f"  已加载 {', '.join(heavy)}" if heavy else "")
+    )
+    return result
+
+
+def run_benchmarks(db_path, work_dir, repeat, skip_xlsx):
+    logic = SQLiteUtils()
+    logic.open_database_file(db_path)
+    results = []
+    try:
+        tables = logic.get_tables()
+
+        def get_table_data():
+            return sum(len(logic.get_table_data(name)["rows"]) for name in tables)
+
+        def execute_query():
+            return len(logic.execute_query("orders")["rows"])
+
+        def execute_sql_aggregate():
+            result = logic.execute_sql(
+                "SELECT u.id, u.name, COUNT(*), SUM(o.quantity * p.price) "
+                "FROM orders o JOIN users u ON u.id = o.user_id "
+                "JOIN products p ON p.id = o.product_id "
+                "GROUP BY u.id ORDER BY 4 DESC LIMIT 100"
+            )
+            return len(result["rows"])
+
+        def execute_sql_filter():
+            result = logic.execute_sql(
+                "SELECT * FROM orders WHERE user_id = ? ORDER BY order_date", (1,)
+            )
+            return len(result["rows"])
+
+        def execute_sql_update():
+            result = logic.execute_sql(
+                "UPDATE orders SET quantity = quantity WHERE id % 100 = 0"
+            )
+            return result.get("affected_rows")
+
+        results.append(measure("get_table_data", get_table_data, repeat))
+        results.append(measure("execute_query", execute_query, repeat))
+        results.append(measure("execute_sql (聚合查询)", execute_sql_aggregate, repeat))
+        results.append(measure("execute_sql (条件查询)", execute_sql_filter, repeat))
+        results.append(measure("execute_sql (更新)", execute_sql_update, repeat))
+        results.append(
+            measure_result_memory(
+                "结果集内存 (orders)", logic.conn, "SELECT * FROM orders"
+            )
+        )
+        # 直接调用 profile_table，绕过按数据版本的缓存
+        results.append(
+            measure(
+                "profile_table (数据概况)",
+                lambda: profile_table(logic.conn, "orders")["rows"],
+                repeat,
+            )
+        )
+
+        csv_dir = os.path.join(work_dir, "csv")
+
+        def export_csv():
+            shutil.rmtree(csv_dir, ignore_errors=True)
+            return export_db_to_csv(db_path, csv_dir)["rows"]
+
+        results.append(measure("export_db_to_csv", export_csv, repeat))
+
+        if skip_xlsx:
+            results.append({"name": "export_db_to_xlsx", "skipped": "已跳过"})
+        else:
+            xlsx_path = os.path.join(work_dir, "export.xlsx")
+            try:
+                results.append(
+                    measure(
+                        "export_db_to_xlsx",
+                        lambda: export_db_to_xlsx(db_path, xlsx_path)["rows"],
+                        repeat,
+                    )
+                )
+            except ImportError as e:
+                results.append({"name": "export_db_to_xlsx", "skipped": str(e)})
+
+        backup_path = os.path.join(work_dir, "backup.db")
+
+        def backup():
+            logic.export_database(backup_path)
+
+        results.append(measure("export_database (备份)", backup, repeat))
+
+        # 全文检索：建立索引只测一次（之后文件未变时同步会直接跳过），
+        # 检索与逐表 LIKE 扫描对比
+        def build_search_index():
+            counts = logic.build_search_index(tables)
+            return sum(c["added"] + c["updated"] for c in counts.values())
+
+        results.append(measure("build_search_index (建立)", build_search_index, 1))
+        (needle,) = logic.conn.execute(
+            "SELECT email FROM users ORDER BY id LIMIT 1 "
+            "OFFSET (SELECT COUNT(*) / 2 FROM users)"
+        ).fetchone()
+
+        def search():
+            return len(logic.search(needle))
+
+        def like_scan():
+            rows = 0
+            for table in tables:
+                columns = logic.searchable_columns(table)
+                if not columns:
+                    continue
+                condition = " OR ".join(
+                    f"{quote_identifier(name)} LIKE ?" for name in columns
+                )
+                rows += logic.conn.execute(
+                    f"SELECT COUNT(*) FROM {quote_identifier(table)} "
+                    f"WHERE {condition}",
+                    [f"%{needle}%"] * len(columns),
+                ).fetchone()[0]
+            return rows
+
+        results.append(measure("search (全文检索)", search, repeat))
+        results.append(measure("search (逐表LIKE扫描)", like_scan, repeat))
+    finally:
+        logic.close()
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="SQLite3桌面工具性能测试")
+    parser.add_argument("--users", type=int, default=10000, help="用户表行数")
+    parser.add_argument("--products", type=int, default=1000, help="产品表行数")
+    parser.add_argument("--orders", type=int, default=100000, help="每个订单表的行数")
+    parser.add_argument("--tables", type=int, default=1, help="订单表个数")
+    parser.add_argument(
+        "--extra-columns", type=int, default=0, help="订单表追加的文本列数"
+    )
+    parser.add_argument("--text-width", type=int, default=16, help="生成文本的长度")
+    parser.add_argument(
+        "--indexes", choices=INDEX_LAYOUTS, default="fk", help="订单表的索引布局"
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="每项操作的执行次数")
+    parser.add_argument("--seed", type=int, default=0, help="随机数种子")
+    parser.add_argument("--skip-xlsx", action="store_true", help="跳过xlsx导出")
+    parser.add_argument(
+        "--db", help="使用已有的数据库文件，不再生成（表结构需与示例数据库一致）"
+    )
+    parser.add_argument(
+        "--startup-only", action="store_true", help="只测量启动耗时，不生成数据库"
+    )
+    parser.add_argument(
+        "--startup-target-ms",
+        type=float,
+        default=500,
+        help="冷启动耗时的目标（毫秒），超过或加载了重量级依赖时返回非零退出码",
+    )
+    parser.add_argument("--output", default="benchmark.json", help="结果JSON文件")
+    args = parser.parse_args(argv)
+
+    startup = [
+        measure_startup(module, args.repeat, args.startup_target_ms)
+        for module in STARTUP_MODULES
+    ]
+    startup_passed = all(result["passed"] for result in startup)
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "sqlite": sqlite3.sqlite_version,
+        "platform": platform.platform(),
+        "startup": startup,
+    }
+    if args.startup_only:
+        _write_report(report, args.output)
+        return 0 if startup_passed else 1
+
+    work_dir = tempfile.mkdtemp(prefix="sqlite_tools_bench_")
+    try:
+        config = {
+            key: value
+            for key, value in vars(args).items()
+            if key not in ("output", "db")
+        }
+        if args.db:
+            # 更新操作会写入数据库，因此在副本上测试
+            db_path = os.path.join(work_dir, os.path.basename(args.db))
+            shutil.copyfile(args.db, db_path)
+            config = {"db": os.path.abspath(args.db), "repeat": args.repeat}
+            generate_seconds = None
+        else:
+            db_path = os.path.join(work_dir, "bench.db")
+            started = time.perf_counter()
+            create_synthetic_database(
+                db_path,
+                users=args.users,
+                products=args.products,
+                orders=args.orders,
+                tables=args.tables,
+                extra_columns=args.extra_columns,
+                text_width=args.text_width,
+                indexes=args.indexes,
+                seed=args.seed,
+            )
+            generate_seconds = round(time.perf_counter() - started, 3)
+            print(f"已生成测试数据库，耗时 {generate_seconds} 秒")
+
+        rss_before = peak_rss_mb()
+        results = run_benchmarks(db_path, work_dir, args.repeat, args.skip_xlsx)
+        report.update(
+            {
+                "config": config,
+                "db_bytes": os.path.getsize(db_path),
+                "generate_seconds": generate_seconds,
+                "peak_rss_mb_before": rss_before,
+                "peak_rss_mb": peak_rss_mb(),
+                "results": results,
+            }
+        )
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    _write_report(report, args.output)
+    return 0 if startup_passed else 1
+
+
+def _write_report(report, path):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"结果已写入 {path}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,6 +5,49 @@ SQLite3桌面工具使用示例
 
 import sqlite3
 import os
+import random
+import string
+from datetime import datetime, timedelta
+
+# 用户表
+USERS_TABLE_SQL = """
+    CREATE TABLE users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        email TEXT UNIQUE NOT NULL,
+        age INTEGER,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+"""
+
+# 产品表
+PRODUCTS_TABLE_SQL = """
+    CREATE TABLE products (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        price REAL NOT NULL,
+        category TEXT,
+        in_stock BOOLEAN DEFAULT 1
+    )
+"""
+
+# 订单表，table 为表名，extra 为追加的列定义（以逗号开头）
+ORDERS_TABLE_SQL = """
+    CREATE TABLE {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER,
+        product_id INTEGER,
+        quantity INTEGER NOT NULL,
+        order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP{extra},
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (product_id) REFERENCES products (id)
+    )
+"""
+
+# 生成大数据库时订单表的索引布局
+INDEX_LAYOUTS = ("none", "fk", "covering")
+
+CATEGORIES = ("电子产品", "办公用品", "家居用品", "图书", "食品")
 
 
 def create_sample_database():
@@ -19,40 +62,10 @@ def create_sample_database():
     conn = sqlite3.connect(db_path)
     cursor = conn.cursor()
 
-    # 创建用户表
-    cursor.execute("""
-        CREATE TABLE users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT UNIQUE NOT NULL,
-            age INTEGER,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-    """)
-
-    # 创建产品表
-    cursor.execute("""
-        CREATE TABLE products (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            price REAL NOT NULL,
-            category TEXT,
-            in_stock BOOLEAN DEFAULT 1
-        )
-    """)
-
-    # 创建订单表
-    cursor.execute("""
-        CREATE TABLE orders (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER,
-            product_id INTEGER,
-            quantity INTEGER NOT NULL,
-            order_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id),
-            FOREIGN KEY (product_id) REFERENCES products (id)
-        )
-    """)
+    # 创建用户表、产品表和订单表
+    cursor.execute(USERS_TABLE_SQL)
+    cursor.execute(PRODUCTS_TABLE_SQL)
+    cursor.execute(ORDERS_TABLE_SQL.format(table="orders", extra=""))
 
     # 插入示例用户数据
     users_data = [
@@ -108,5 +121,107 @@ def create_sample_database():
     print("\n你现在可以使用SQLite桌面工具打开这个数据库进行操作。")
 
 
+def _random_text(rng: random.Random, width: int) -> str:
+    return "".join(rng.choices(string.ascii_letters + string.digits, k=width))
+
+
+def create_synthetic_database(
+    db_path: str,
+    users: int = 10000,
+    products: int = 1000,
+    orders: int = 100000,
+    tables: int = 1,
+    extra_columns: int = 0,
+    text_width: int = 16,
+    indexes: str = "fk",
+    seed: int = 0,
+) -> dict:
+    """
+    按示例数据库的 users/products/orders 结构生成可配置规模的数据库，用于性能测试。
+    tables 为订单表的个数（第二个起命名为 orders_2、orders_3……），
+    extra_columns 为每个订单表追加的文本列数，text_width 为生成文本的长度。
+    indexes 为订单表的索引布局：none 不建索引，fk 为外键列建索引，
+    covering 再加一个 (user_id, order_date, quantity) 的覆盖索引。
+    返回各表的行数。
+    """
+    if indexes not in INDEX_LAYOUTS:
+        raise ValueError(f"未知的索引布局: {indexes}")
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    rng = random.Random(seed)
+    start = datetime(2020, 1, 1)
+
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute("PRAGMA journal_mode=OFF")
+        conn.execute("PRAGMA synchronous=OFF")
+        cursor = conn.cursor()
+        cursor.execute(USERS_TABLE_SQL)
+        cursor.execute(PRODUCTS_TABLE_SQL)
+        cursor.executemany(
+            "INSERT INTO users (name, email, age, created_at) VALUES (?, ?, ?, ?)",
+            (
+                (
+                    _random_text(rng, text_width),
+                    f"user{i}@example.com",
+                    rng.randint(18, 80),
+                    str(start + timedelta(minutes=i)),
+                )
+                for i in range(users)
+            ),
+        )
+        cursor.executemany(
+            "INSERT INTO products (name, price, category, in_stock) "
+            "VALUES (?, ?, ?, ?)",
+            (
+                (
+                    _random_text(rng, text_width),
+                    round(rng.uniform(1, 10000), 2),
+                    rng.choice(CATEGORIES),
+                    rng.randint(0, 1),
+                )
+                for _ in range(products)
+            ),
+        )
+
+        extra_names = [f"note_{n + 1}" for n in range(extra_columns)]
+        extra = "".join(f",\n        {name} TEXT" for name in extra_names)
+        counts = {"users": users, "products": products}
+        for t in range(tables):
+            table = "orders" if t == 0 else f"orders_{t + 1}"
+            cursor.execute(ORDERS_TABLE_SQL.format(table=table, extra=extra))
+            columns = ["user_id", "product_id", "quantity", "order_date"]
+            columns += extra_names
+            placeholders = ", ".join("?" * len(columns))
+            cursor.executemany(
+                f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({placeholders})",
+                (
+                    (
+                        rng.randint(1, max(users, 1)),
+                        rng.randint(1, max(products, 1)),
+                        rng.randint(1, 10),
+                        str(start + timedelta(seconds=i * 30)),
+                    )
+                    + tuple(_random_text(rng, text_width) for _ in extra_names)
+                    for i in range(orders)
+                ),
+            )
+            if indexes in ("fk", "covering"):
+                cursor.execute(f"CREATE INDEX idx_{table}_user ON {table} (user_id)")
+                cursor.execute(
+                    f"CREATE INDEX idx_{table}_product ON {table} (product_id)"
+                )
+            if indexes == "covering":
+                cursor.execute(
+                    f"CREATE INDEX idx_{table}_user_date "
+                    f"ON {table} (user_id, order_date, quantity)"
+                )
+            counts[table] = orders
+        conn.commit()
+    finally:
+        conn.close()
+    return counts
+
+
 if __name__ == "__main__":
     create_sample_database()